@@ -49,6 +49,7 @@ class RTS:
         self.robot.setAcceleration(1) 
         self.ifConnectionCount = 0
         self.ifConfirmCount = 0
+        self.attachResolver = None
         
     # I/O Funktionen # 
 
@@ -89,19 +90,36 @@ class RTS:
             debug("Der Anschluss %s wurde bereits initialisiert, bitte verwende einen anderen Namen." % connectionName)
 
     #implemented
-    def setVacuum(self, bVacuumState, connectionName=False):
+    def setVacuum(self, bVacuumState, connectionName=False, item=False, parent=False):
         """
-            Diese Funktion setzt das Vakuum einerseits in RoboDK (über AttachClosest() und DetachAll()),
-            andererseits wird der Ausgang am realen Robotergreifer gesetzt. Wurde vor dem Aufruf dieser Funktion der Greifer
-            nicht initialisiert (über setGripperConnection(...)), muss der Anschlussname über die Variable
-            connectionName übergeben werden. Wird keine gültige Verbindung angegeben, wird ein Fehler angezeigt. 
+            Diese Funktion setzt das Vakuum einerseits in RoboDK, andererseits wird der Ausgang am realen Robotergreifer
+            gesetzt. Wurde vor dem Aufruf dieser Funktion der Greifer nicht initialisiert (über setGripperConnection(...)),
+            muss der Anschlussname über die Variable connectionName übergeben werden. Wird keine gültige Verbindung
+            angegeben, wird ein Fehler angezeigt.
+            
+            Ist das zu greifende Teil bekannt, wird es über item direkt an den Greifer gehängt bzw. beim Loslassen an
+            parent (Standard: Station) übergeben. Dadurch entfällt die Suche über die ganze Station. Ohne item wird
+            zuerst der über setAttachResolver(...) gesetzte Index abgefragt, danach AttachClosest() bzw. DetachAll()
+            verwendet.
             
         Args:
             bVacuumState (bool): Zu setzender Status des Vakuumgreifers.
             connectionName (string, optional): Anschlussname, falls der Greifer nicht über setGripperConnection(...) initialisiert wurde. Defaultwert = False.
+            item (Item, optional): Bekanntes Teil, welches angesogen bzw. losgelassen wird. Defaultwert = False.
+            parent (Item, optional): Neues Parent des losgelassenen Teils. Defaultwert = False (Station).
 
         Returns:
             Item: Gibt das angesogene oder losgelassene Teil als Objekt zurück. Nur in der Simulation nutzbar.
+            
+        .. seealso:: :func:`~RTS.setAttachResolver`
+        
+        Example:
+        
+            .. code-block:: python
+                
+                piece = RDK.Item('Jengastuck 1')
+                RTS.setVacuum(1, item=piece)                     # Teil direkt an den Greifer hängen.
+                RTS.setVacuum(0, item=piece, parent=towerFrame)  # Teil direkt am Turm-Frame ablegen.
         """
         if not self.gripper:
             debug("Initialisiere zuerst den Greifer der Simulation über RTS.setGripper(...).")
@@ -111,10 +129,33 @@ class RTS:
             if self.checkConnectionName(connectionName):
                 self.setOutput(connectionName, bVacuumState)
                 if bVacuumState:
+                    if not item and self.attachResolver:
+                        item = self.attachResolver(self.gripper)
+                    if item:
+                        item.setParentStatic(self.gripper)
+                        return item
                     return self.gripper.AttachClosest()
                 else:
+                    if item:
+                        item.setParentStatic(parent if parent else self.RDK.ActiveStation())
+                        return item
                     return self.gripper.DetachAll()
 
+    def setAttachResolver(self, resolver):
+        """
+            Setzt eine Funktion, welche beim Ansaugen ohne bekanntes Teil das zu greifende Teil bestimmt,
+            z.B. über einen vorberechneten Index der Magazinplätze. Gibt die Funktion kein Teil zurück,
+            wird AttachClosest() verwendet.
+            
+            Nur für die Simulation relevant.
+
+        Args:
+            resolver (function): Funktion resolver(gripper), welche ein Item oder None zurückgibt.
+            
+        .. seealso:: :func:`~RTS.setVacuum`
+        """
+        self.attachResolver = resolver
+
     def setOutput(self, connectionName, value):
         """
             Setzt den Anschluss auf einen bestimmten Wert. Wurde der Anschluss nicht initialisiert, wird ein Fehler ausgegeben.
@@ -0,0 +1,107 @@
+# Checkpointing für unterbrochene Turmbauten
+# Speichert den Baufortschritt nach jedem platzierten Stein und ermöglicht die Wiederaufnahme
+
+import json
+import os
+
+from jenga_piece_collection import PLACED
+
+
+class BuildCheckpoint:
+    """Persistenter Baufortschritt: platzierte Steine, aktueller Layer und Roboterzustand"""
+
+    def __init__(self, path="build_checkpoint.json"):
+        self.path = path
+
+        # Nummern der Steine, welche bereits am Tower-Frame befestigt sind
+        self.placed = []
+        self.layer = 0
+        self.robot_joints = None
+
+        # Zielplätze (0-basiert) pro Steinnummer, nach Fehlgriffen umverteilt (replace_missing)
+        self.targets = {}
+
+    def exists(self):
+        """Prüft ob ein gespeicherter Checkpoint vorhanden ist"""
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Lädt den gespeicherten Baufortschritt (leerer Zustand falls keine Datei vorhanden)"""
+        if not self.exists():
+            return self
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+        self.placed = list(state.get("placed", []))
+        self.layer = state.get("layer", 0)
+        self.robot_joints = state.get("robot_joints")
+        self.targets = {int(number): target for number, target in state.get("targets", {}).items()}
+        return self
+
+    def save(self):
+        """Schreibt den Zustand atomar (temporäre Datei + Umbenennen), damit ein Abbruch nie eine halbe Datei hinterlässt"""
+        state = {
+            "placed": self.placed,
+            "layer": self.layer,
+            "robot_joints": self.robot_joints,
+            "targets": self.targets,
+        }
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def record_placement(self, piece, tower, robot, pieces=None):
+        """Hält einen erfolgreich platzierten Stein (und die Zielplätze von `pieces`) fest und sichert sofort"""
+        if piece.number not in self.placed:
+            self.placed.append(piece.number)
+        if pieces is not None:
+            self.targets = {int(number): int(target) for number, target in zip(pieces.numbers, pieces.target)}
+        self.layer = tower.get_layer_for_piece(piece)
+        self.robot_joints = robot.Joints().list()
+        self.save()
+
+    def reconcile(self, pieces, tower):
+        """
+        Gleicht den gespeicherten Zustand mit der Station ab
+        Massgebend ist die Station: Steine am Tower-Frame gelten als platziert,
+        gespeicherte Steine ohne Tower-Frame als Parent werden erneut gebaut.
+        """
+        on_tower = set()
+        for piece in pieces:
+            if piece.piece.Parent() == tower.frame:
+                on_tower.add(piece.number)
+
+        # Reihenfolge der gespeicherten Platzierungen beibehalten, Abweichungen ergänzen
+        reconciled = [number for number in self.placed if number in on_tower]
+        reconciled += sorted(on_tower.difference(reconciled))
+
+        dropped = [number for number in self.placed if number not in on_tower]
+        self.placed = reconciled
+        return dropped
+
+    def restore_targets(self, pieces):
+        """Übernimmt die gespeicherten Zielplätze in die Sammlung (Umverteilung nach Fehlgriffen)"""
+        for number, target in self.targets.items():
+            pieces.by_number(number).target = target
+
+    def remaining(self, pieces):
+        """Liefert nur die noch nicht platzierten Steine in Baureihenfolge"""
+        placed = set(self.placed)
+        for piece in pieces:
+            # Zustand zusätzlich prüfen: Ersatzsteine nach Fehlgriffen werden vorzeitig platziert
+            if piece.number not in placed and piece.state != PLACED and piece.target >= 0:
+                yield piece
+
+    def clear(self):
+        """Entfernt den Checkpoint nach abgeschlossenem Turmbau"""
+        self.placed = []
+        self.layer = 0
+        self.robot_joints = None
+        self.targets = {}
+        if self.exists():
+            os.remove(self.path)
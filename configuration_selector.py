@@ -0,0 +1,111 @@
+# Auswahl von Orientierung und Gelenkkonfiguration für Anfahrposen
+# Nutzt die 180°-Symmetrie der Jenga-Steine und minimiert die Gelenkbewegung zur vorherigen Lage
+
+import numpy as np
+from robodk.robomath import Mat, rotz, pi
+
+from connection_pool import solve_ik_all
+
+# Anzahl Roboterachsen (SolveIK_All liefert teilweise zusätzliche Zeilen)
+AXES = 6
+
+
+def symmetric_variants(pose_fn, rotation_z):
+    """
+    Erzeugt die beiden gleichwertigen Greifposen eines Steins (Drehung um 0° und 180°)
+    pose_fn(rotation_z) liefert das Posenpaar (above, pose) für eine Drehung um die Hochachse.
+    """
+    return [pose_fn(rotation_z), pose_fn(rotation_z + pi)]
+
+
+class ConfigurationSelector:
+    """
+    Wählt aus symmetrischen Posen-Varianten und allen IK-Lösungen die schnellste Anfahrt
+
+    Bewertet wird die grösste gewichtete Achsbewegung von der Referenzlage aus (Dauer einer
+    synchronen Gelenkbewegung). Lösungen nahe an Achsgrenzen oder an der Handgelenk-
+    Singularität (Achse 5 nahe 0°) werden gemieden, solange eine andere Lösung existiert.
+    Da jede Aufnahme und Platzierung über die Home-Position führt, ist die Referenzlage
+    standardmässig die Home-Position.
+
+    Werkzeug und Referenz werden beim Erzeugen vom Roboter übernommen und müssen in RoboDK
+    bereits gesetzt sein. Mit einem Verbindungspool (connection_pool.RobolinkPool) können die
+    IK-Lösungen vieler Anfahrposen über prefetch(...) vorab parallel berechnet werden.
+    """
+
+    def __init__(self, robot, reference_joints, limit_margin=5, wrist_margin=10, weights=None, pool=None):
+        self.robot = robot
+        self.pool = pool
+        self.reference_joints = np.array(reference_joints, dtype=float)
+        self.limit_margin = limit_margin
+        self.wrist_margin = wrist_margin
+        self.weights = np.ones(AXES) if weights is None else np.array(weights, dtype=float)
+
+        lower, upper, _ = robot.JointLimits()
+        self.lower = np.array(lower.list()[:AXES], dtype=float)
+        self.upper = np.array(upper.list()[:AXES], dtype=float)
+        self.tool_pose = robot.PoseTool()
+        self.reference_pose = robot.PoseFrame()
+
+        # Gewählte Gelenkwerte pro Anfahrpose
+        self.joints = {}
+
+        # Vorab berechnete IK-Lösungen pro Pose (siehe prefetch)
+        self.solutions = {}
+
+    def prefetch(self, poses):
+        """Löst die IK vieler Posen parallel über den Verbindungspool (ohne Pool ohne Wirkung)"""
+        if self.pool is None:
+            return
+        missing = {_pose_key(pose): pose for pose in poses if _pose_key(pose) not in self.solutions}
+        results = solve_ik_all(self.pool, self.robot, list(missing.values()), self.tool_pose, self.reference_pose)
+        self.solutions.update(zip(missing, results))
+
+    def select(self, variants, previous=None):
+        """
+        Wählt aus [(above, pose), ...] die Variante mit der kürzesten Gelenkbewegung zur Anfahrpose
+        Rückgabe: (above, pose) der gewählten Variante, Gelenkwerte über joints_for(above)
+        """
+        previous = self.reference_joints if previous is None else np.array(previous, dtype=float)
+
+        best = None
+        for above, pose in variants:
+            for joints, penalty in self._solutions(above):
+                cost = (penalty, np.max(self.weights * np.abs(joints - previous)))
+                if best is None or cost < best[0]:
+                    best = (cost, above, pose, joints)
+
+        if best is None:
+            raise Exception("No reachable robot configuration for approach pose")
+
+        _, above, pose, joints = best
+        self.joints[_pose_key(above)] = joints.tolist()
+        return above, pose
+
+    def joints_for(self, pose):
+        """Gewählte Gelenkwerte für eine über select() erzeugte Anfahrpose, sonst None"""
+        return self.joints.get(_pose_key(pose))
+
+    def _solutions(self, pose):
+        """Alle IK-Lösungen innerhalb der Achsgrenzen mit Strafwert (0 = ausreichend Abstand)"""
+        solutions = self.solutions.get(_pose_key(pose))
+        if solutions is None:
+            solutions = self.robot.SolveIK_All(pose, self.tool_pose, self.reference_pose)
+        rows = np.array(solutions.rows if isinstance(solutions, Mat) else solutions, dtype=float)
+        if rows.ndim != 2 or rows.shape[0] < AXES or rows.shape[1] == 0:
+            return []
+
+        joints = rows[:AXES].T
+        within = np.all((joints >= self.lower) & (joints <= self.upper), axis=1)
+        near_limit = np.any(
+            (joints < self.lower + self.limit_margin) | (joints > self.upper - self.limit_margin), axis=1
+        )
+        near_wrist = np.abs(np.sin(np.radians(joints[:, 4]))) < np.sin(np.radians(self.wrist_margin))
+        penalty = near_limit.astype(int) + near_wrist.astype(int)
+
+        return [(joints[i], int(penalty[i])) for i in np.flatnonzero(within)]
+
+
+def _pose_key(pose):
+    """Vergleichsschlüssel einer Pose (auf 1/1000 gerundet)"""
+    return tuple(np.round(np.array(pose.rows, dtype=float), 3).ravel())
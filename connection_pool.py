@@ -0,0 +1,85 @@
+# Pool mehrerer Robolink-Verbindungen zur selben Station
+# Jede Verbindung serialisiert ihre Aufrufe über einen eigenen Socket, mehrere Verbindungen erlauben
+# parallele Planungsabfragen (IK, Posen) in Threads. Bewegungen bleiben auf der Hauptverbindung.
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from robodk.robolink import Robolink, Item
+
+
+class RobolinkPool:
+    """
+    Threadsichere Ausleihe von `size` Robolink-Sitzungen
+
+    Eine ausgeliehene Verbindung gehört bis zur Rückgabe exklusiv einem Thread (Robolink ist nicht
+    threadsicher). Items der Hauptverbindung werden über rebind(...) ohne RoboDK-Aufruf auf die
+    ausgeliehene Verbindung übertragen. Die Hauptverbindung für Bewegungen gehört nicht zum Pool.
+    """
+
+    def __init__(self, size=4, factory=Robolink):
+        if size < 1:
+            raise Exception("Connection pool needs at least one connection")
+        self.size = size
+        self._links = [factory() for _ in range(size)]
+        self._idle = queue.LifoQueue()
+        for link in self._links:
+            self._idle.put(link)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Leiht eine Verbindung aus (wartet höchstens `timeout` Sekunden) und gibt sie danach zurück"""
+        with self._lock:
+            if self._closed:
+                raise Exception("Connection pool is closed")
+        try:
+            link = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise Exception(f"No Robolink connection available within {timeout} s")
+        try:
+            yield link
+        finally:
+            self._idle.put(link)
+
+    def map(self, function, items, timeout=None):
+        """
+        Verteilt function(link, item) auf einen Thread-Pool mit je einer ausgeliehenen Verbindung
+        Rückgabe: Ergebnisse in der Reihenfolge von `items`
+        """
+        def run(item):
+            with self.connection(timeout) as link:
+                return function(link, item)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        """Trennt alle Verbindungen (nach Rückgabe aller ausgeliehenen)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._links:
+            self._idle.get().Disconnect()
+
+
+def rebind(link, item):
+    """Dasselbe Item auf einer anderen Verbindung (ohne RoboDK-Aufruf)"""
+    return Item(link, item.item, item.type)
+
+
+def solve_ik_all(pool, robot, poses, tool=None, reference=None):
+    """Alle IK-Lösungen für viele Posen parallel (Liste wie robot.SolveIK_All)"""
+    return pool.map(lambda link, pose: rebind(link, robot).SolveIK_All(pose, tool, reference), poses)
+
+
+def reachable(pool, robot, poses, tool=None, reference=None):
+    """Erreichbarkeit vieler Posen parallel: Liste von bool (mindestens eine IK-Lösung)"""
+    def check(link, pose):
+        joints = rebind(link, robot).SolveIK(pose, None, tool, reference)
+        return len(joints.list()) >= 6
+    return pool.map(check, poses)
@@ -0,0 +1,199 @@
+# Kollisions- und Auflageprüfung für Turmpläne ohne RoboDK-Kollisionserkennung
+# Prüft alle Steinpaare eines Plans als orientierte Quader (OBB) mit vektorisierten NumPy-Operationen
+
+from collections import namedtuple
+
+import numpy as np
+
+# Ergebnis einer Prüfung: überlappende Paare (i, j, Eindringtiefe) und Indizes nicht getragener Steine
+InterferenceReport = namedtuple("InterferenceReport", ["overlaps", "unsupported"])
+
+
+def plan_from_tower(tower, pieces):
+    """
+    Erzeugt Platzierungsposen (N,4,4) im Tower-Frame und Halbachsen (N,3) aus Tower.calculate_piece_position
+    Die Pose entspricht der Greiferpose auf der Steinoberseite (inkl. rotx(pi)), wie in Tower.get_placement_pose.
+    """
+    pieces = list(pieces)
+    poses = np.zeros((len(pieces), 4, 4))
+    half_extents = np.zeros((len(pieces), 3))
+
+    for i, piece in enumerate(pieces):
+        x_offset, y_offset, z, rotation_z = tower.calculate_piece_position(piece)
+        c, s = np.cos(rotation_z), np.sin(rotation_z)
+
+        # rotz(rotation_z) * rotx(pi)
+        poses[i, :3, :3] = [[c, s, 0], [s, -c, 0], [0, 0, -1]]
+        poses[i, :3, 3] = [tower.base_x + x_offset, tower.base_y + y_offset, z]
+        poses[i, 3, 3] = 1
+
+        # Lokale Achsen: X = Breite, Y = Länge, Z = Höhe (zeigt wegen rotx(pi) nach unten)
+        half_extents[i] = [piece.width / 2, piece.length / 2, piece.height / 2]
+
+    return poses, half_extents
+
+
+class InterferenceChecker:
+    """Prüft einen Turmplan auf Überlappungen und fehlende Auflage der Steine"""
+
+    def __init__(self, tolerance=0.01, ground_z=None, samples=(5, 9)):
+        # Berührende Flächen (Abstand 0) gelten bis zu dieser Toleranz nicht als Überlappung
+        self.tolerance = tolerance
+
+        # Auflageebene des Turms (None = tiefster Stein im Plan)
+        self.ground_z = ground_z
+
+        # Stützpunkte auf der Unterseite jedes Steins (Breite x Länge) für die Auflageprüfung
+        self.samples = samples
+
+    def check(self, poses, half_extents):
+        """Prüft alle Steinpaare des Plans, Rückgabe als InterferenceReport"""
+        poses = np.asarray(poses, dtype=float)
+        half_extents = np.broadcast_to(np.asarray(half_extents, dtype=float), (len(poses), 3))
+
+        # Steinmittelpunkt: Pose liegt auf der Oberseite, lokale Z-Achse zeigt in den Stein
+        rotations = poses[:, :3, :3]
+        centers = poses[:, :3, 3] + rotations[:, :, 2] * half_extents[:, 2:3]
+
+        # Achsparallele Hüllquader für die Grobphase
+        aabb_half = np.einsum("nij,nj->ni", np.abs(rotations), half_extents)
+        aabb_min = centers - aabb_half
+        aabb_max = centers + aabb_half
+
+        overlaps = self._check_overlaps(rotations, centers, half_extents, aabb_min, aabb_max)
+        unsupported = self._check_support(rotations, centers, half_extents, aabb_min, aabb_max)
+
+        return InterferenceReport(overlaps, unsupported)
+
+    def is_valid(self, poses, half_extents):
+        """Kurzform: True falls weder Überlappungen noch ungestützte Steine vorhanden sind"""
+        report = self.check(poses, half_extents)
+        return not report.overlaps and not report.unsupported
+
+    def _check_overlaps(self, rotations, centers, half_extents, aabb_min, aabb_max):
+        """Grobphase per Sort-and-Sweep entlang Z, Feinphase als Separating-Axis-Test über alle Kandidatenpaare"""
+        order = np.argsort(aabb_min[:, 2], kind="stable")
+        z_min = aabb_min[order, 2]
+        z_max = aabb_max[order, 2]
+
+        # Räumlicher Index: nur Steine, deren Z-Intervalle sich echt überschneiden, sind Kandidaten
+        end = np.searchsorted(z_min, z_max - self.tolerance, side="left")
+        a, b = _sweep_pairs(end)
+        a, b = order[a], order[b]
+
+        # Achsparallele Überschneidung in X und Y
+        mask = np.all(
+            (aabb_min[a, :2] < aabb_max[b, :2] - self.tolerance) &
+            (aabb_min[b, :2] < aabb_max[a, :2] - self.tolerance),
+            axis=1
+        )
+        a, b = a[mask], b[mask]
+        if len(a) == 0:
+            return []
+
+        depth = _sat_penetration(
+            rotations[a], centers[a], half_extents[a],
+            rotations[b], centers[b], half_extents[b]
+        )
+        hit = depth > self.tolerance
+
+        return [
+            (int(i), int(j), float(d))
+            for i, j, d in zip(np.minimum(a[hit], b[hit]), np.maximum(a[hit], b[hit]), depth[hit])
+        ]
+
+    def _check_support(self, rotations, centers, half_extents, aabb_min, aabb_max):
+        """
+        Prüft ob jeder Stein auf der Auflageebene oder auf darunterliegenden Steinen aufliegt
+        Näherung: Der Schwerpunkt muss innerhalb der Hülle der Kontaktpunkte auf der Steinunterseite liegen.
+        """
+        count = len(centers)
+        ground_z = aabb_min[:, 2].min() if self.ground_z is None else self.ground_z
+        on_ground = np.abs(aabb_min[:, 2] - ground_z) <= self.tolerance
+
+        # Stützpunkte auf der Unterseite im lokalen Steinkoordinatensystem
+        nx, ny = self.samples
+        gx, gy = np.meshgrid(np.linspace(-1, 1, nx), np.linspace(-1, 1, ny), indexing="ij")
+        local = np.stack([gx.ravel(), gy.ravel()], axis=1)  # (S,2), skaliert mit Halbachsen
+
+        # Kandidatenpaare: Oberseite von i liegt auf Höhe der Unterseite von j
+        order = np.argsort(aabb_max[:, 2], kind="stable")
+        tops = aabb_max[order, 2]
+        lo = np.searchsorted(tops, aabb_min[:, 2] - self.tolerance, side="left")
+        hi = np.searchsorted(tops, aabb_min[:, 2] + self.tolerance, side="right")
+        upper, lower_sorted = _range_pairs(lo, hi)
+        lower = order[lower_sorted]
+        keep = lower != upper
+        upper, lower = upper[keep], lower[keep]
+
+        contact = np.zeros((count, len(local)), dtype=bool)
+        if len(upper):
+            # Weltkoordinaten (XY) der Stützpunkte des oberen Steins (2x2-Rotation ausgeschrieben, schneller als einsum)
+            lx = local[None, :, 0] * half_extents[upper, 0:1]
+            ly = local[None, :, 1] * half_extents[upper, 1:2]
+            r_up = rotations[upper]
+            px = centers[upper, 0:1] + r_up[:, 0, 0:1] * lx + r_up[:, 0, 1:2] * ly
+            py = centers[upper, 1:2] + r_up[:, 1, 0:1] * lx + r_up[:, 1, 1:2] * ly
+
+            # In lokale Koordinaten des unteren Steins transformieren und gegen dessen Oberseite prüfen
+            dx = px - centers[lower, 0:1]
+            dy = py - centers[lower, 1:2]
+            r_low = rotations[lower]
+            qx = r_low[:, 0, 0:1] * dx + r_low[:, 1, 0:1] * dy
+            qy = r_low[:, 0, 1:2] * dx + r_low[:, 1, 1:2] * dy
+            inside = (
+                (np.abs(qx) <= half_extents[lower, 0:1] + self.tolerance) &
+                (np.abs(qy) <= half_extents[lower, 1:2] + self.tolerance)
+            )
+
+            # Paare sind nach oberem Stein sortiert: Kontakte gruppenweise zusammenfassen
+            groups, starts = np.unique(upper, return_index=True)
+            contact[groups] = np.logical_or.reduceat(inside, starts, axis=0)
+
+        # Schwerpunkt (lokal 0,0) muss innerhalb der Ausdehnung der Kontaktpunkte liegen
+        balanced = np.ones(count, dtype=bool)
+        for axis in range(2):
+            coords = local[None, :, axis]
+            below = np.any(contact & (coords <= 0), axis=1)
+            above = np.any(contact & (coords >= 0), axis=1)
+            balanced &= below & above
+
+        supported = on_ground | balanced
+        return [int(i) for i in np.flatnonzero(~supported)]
+
+
+def _sweep_pairs(end):
+    """Erzeugt alle Indexpaare (i, j) mit i < j < end[i] ohne Python-Schleife"""
+    count = len(end)
+    starts = np.arange(1, count + 1)
+    return _range_pairs(starts, np.maximum(end, starts))
+
+
+def _range_pairs(lo, hi):
+    """Erzeugt Paare (i, k) für alle k im Bereich lo[i] <= k < hi[i]"""
+    counts = np.maximum(hi - lo, 0)
+    first = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return first, np.repeat(lo, counts) + offsets
+
+
+def _sat_penetration(rot_a, c_a, e_a, rot_b, c_b, e_b):
+    """
+    Separating-Axis-Test für M Quaderpaare gleichzeitig
+    Rückgabe: minimale Eindringtiefe über alle 15 Achsen (<= 0 bedeutet getrennt oder berührend)
+    """
+    axes_a = np.swapaxes(rot_a, 1, 2)  # (M,3,3) Zeilen = Achsen
+    axes_b = np.swapaxes(rot_b, 1, 2)
+    cross = np.cross(axes_a[:, :, None, :], axes_b[:, None, :, :]).reshape(-1, 9, 3)
+    axes = np.concatenate([axes_a, axes_b, cross], axis=1)  # (M,15,3)
+
+    norm = np.linalg.norm(axes, axis=2)
+    degenerate = norm < 1e-9
+    axes = axes / np.where(degenerate, 1.0, norm)[:, :, None]
+
+    r_a = np.einsum("mkj,mj->mk", np.abs(np.einsum("mkd,mjd->mkj", axes, axes_a)), e_a)
+    r_b = np.einsum("mkj,mj->mk", np.abs(np.einsum("mkd,mjd->mkj", axes, axes_b)), e_b)
+    distance = np.abs(np.einsum("mkd,md->mk", axes, c_b - c_a))
+
+    margin = np.where(degenerate, np.inf, r_a + r_b - distance)
+    return margin.min(axis=1)
@@ -0,0 +1,221 @@
+# Simuliertes I/O-Modell für die RTS-Anschlüsse
+# Wertetabelle der Ein- und Ausgänge mit Sensorlatenzen, Auswertung von if/while/wait-Befehlen
+# und Zeitbilanz für die Zykluszeit (Wartezeiten bzw. nicht durchlaufene Zweige)
+
+import ast
+import operator
+
+# Vergleichsoperatoren der RTS-Bedingungen
+CONDITIONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+class SimulatedIO:
+    """
+    Wertetabelle der Anschlüsse mit verzögerten Sensorantworten
+
+    Ein Ausgang kann über respond(...) einen Eingang nach einer Latenz nachführen (z.B. Vakuumsensor
+    nach dem Einschalten des Vakuums). Der Sensorwert wird erst bei Fälligkeit berechnet, damit z.B.
+    der in der Simulation inzwischen angehängte Stein berücksichtigt wird.
+
+    Die RTS-Befehle werden wie beim Postprozessor über run_code(...) ausgewertet:
+    - waitConnection: Wartezeit bis zur Bedingung bzw. bis zum Timeout wird zu wait_time addiert
+    - ifConnection/elseIfConnection/elseConnection: nur ein Zweig ist aktiv, die Simulationszeit der
+      übrigen Zweige (die RTS-bedingt trotzdem simuliert werden) wird zu skipped_time addiert
+    - whileConnection: ist die Bedingung beim Eintritt nicht erfüllt, zählt die Schleife als übersprungen
+    Ausgänge in inaktiven Zweigen werden nicht gesetzt.
+
+    `clock` liefert die Simulationszeit in Sekunden (z.B. Robolink.SimulationTime).
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+        self.responses = {}
+        self.pending = []
+
+        # Zeitbilanz und Statistik
+        self.wait_time = 0.0
+        self.skipped_time = 0.0
+        self.waits = 0
+        self.timeouts = 0
+
+        # Offene Blöcke: [Art, aktiv, Zweig bereits gewählt, Eltern aktiv, Startzeit des Zweigs]
+        self.blocks = []
+
+    def now(self):
+        """Zeit des realen Ablaufs: Simulationszeit plus I/O-Wartezeiten minus übersprungene Zweige"""
+        return self.clock() + self.wait_time - self.skipped_time
+
+    def respond(self, output, sensor, latency, value=None):
+        """Eingang `sensor` folgt `output` nach `latency` Sekunden, value(output_wert) bestimmt den Sensorwert"""
+        self.responses.setdefault(output, []).append((sensor, latency, value or (lambda v: v)))
+
+    def set(self, name, value):
+        """Setzt einen Anschluss und plant die Sensorantworten ein"""
+        if not self.active():
+            return
+        self._settle(self.now())
+        self.values[name] = value
+        for sensor, latency, response in self.responses.get(name, []):
+            self.pending.append((self.now() + latency, sensor, value, response))
+        self.pending.sort(key=lambda event: event[0])
+
+    def get(self, name):
+        """Aktueller Wert eines Anschlusses (0 falls nie gesetzt)"""
+        self._settle(self.now())
+        return self.values.get(name, 0)
+
+    def evaluate(self, name, value, condition):
+        """Wertet eine RTS-Bedingung zum aktuellen Zeitpunkt aus"""
+        return CONDITIONS[condition](self.get(name), value)
+
+    def wait(self, name, value, condition, timeout=-1):
+        """
+        Wartet auf die Bedingung (timeout in s, -1 = unbegrenzt), die Wartezeit fliesst in wait_time ein
+        Rückgabe: Wartezeit in Sekunden
+        """
+        if not self.active():
+            return 0.0
+        now = self.now()
+        self._settle(now)
+        if self.evaluate(name, value, condition):
+            return 0.0
+
+        # Erste eingeplante Änderung, welche die Bedingung erfüllt
+        ready = None
+        for time, sensor, output_value, response in self.pending:
+            if sensor == name and CONDITIONS[condition](response(output_value), value):
+                ready = time
+                break
+
+        if ready is not None and (timeout < 0 or ready - now <= timeout):
+            waited = ready - now
+        elif timeout >= 0:
+            waited = timeout
+            self.timeouts += 1
+        else:
+            raise Exception(f"waitConnection on {name} {condition} {value} would never finish")
+
+        self.wait_time += waited
+        self.waits += 1
+        self._settle(self.now())
+        return waited
+
+    def active(self):
+        """Befehle werden nur ausgeführt, wenn alle umgebenden Zweige aktiv sind"""
+        return all(block[1] for block in self.blocks)
+
+    def _settle(self, now):
+        """Übernimmt alle bis `now` fälligen Sensorantworten in die Wertetabelle"""
+        while self.pending and self.pending[0][0] <= now:
+            _, sensor, output_value, response = self.pending.pop(0)
+            self.values[sensor] = response(output_value)
+
+    # ----------- Verzweigungen ----------- #
+
+    def _open(self, kind, condition):
+        parent = self.active()
+        active = parent and condition()
+        self.blocks.append([kind, active, active, parent, self.clock()])
+
+    def _switch(self, condition):
+        """Schliesst den aktuellen Zweig und öffnet den nächsten (elseIf/else)"""
+        block = self.blocks[-1]
+        self._close_branch(block)
+        block[1] = block[3] and not block[2] and condition()
+        block[2] = block[2] or block[1]
+        block[4] = self.clock()
+
+    def _close(self):
+        self._close_branch(self.blocks.pop())
+
+    def _close_branch(self, block):
+        # Nicht aktive Zweige wurden nur für den Postprozessor simuliert
+        if block[3] and not block[1]:
+            self.skipped_time += self.clock() - block[4]
+
+    # ----------- RTS-Befehle ----------- #
+
+    def run_code(self, code):
+        """Wertet einen RTS-Befehl aus, wie er über RDK.RunCode(...) an den Postprozessor geht"""
+        call = ast.parse(code.strip(), mode="eval").body
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+            return
+        handler = getattr(self, "_rts_" + call.func.id, None)
+        if handler is not None:
+            handler(*[ast.literal_eval(arg) for arg in call.args])
+
+    def _rts_setOutput(self, name, value):
+        self.set(name, _number(value))
+
+    def _rts_ifConnection(self, name, value, condition):
+        self._open("if", lambda: self.evaluate(name, _number(value), condition))
+
+    def _rts_elseIfConnection(self, name, value, condition):
+        self._switch(lambda: self.evaluate(name, _number(value), condition))
+
+    def _rts_elseConnection(self):
+        self._switch(lambda: True)
+
+    def _rts_endIfConnection(self):
+        self._close()
+
+    def _rts_ifConfirm(self, message):
+        # Bedienerabfrage: Bestätigung angenommen
+        self._open("if", lambda: True)
+
+    def _rts_elseConfirm(self):
+        self._switch(lambda: True)
+
+    def _rts_endIfConfirmCount(self):
+        self._close()
+
+    def _rts_whileConnection(self, name, condition, value, while_name):
+        self._open("while", lambda: self.evaluate(name, _number(value), condition))
+
+    def _rts_endWhileConnection(self, while_name):
+        self._close()
+
+    def _rts_whileEndless(self, while_name):
+        self._open("while", lambda: True)
+
+    def _rts_endWhileEndless(self, while_name):
+        self._close()
+
+    def _rts_waitConnection(self, name, value, condition, timeout):
+        self.wait(name, _number(value), condition, timeout)
+
+    def summary(self):
+        """Kurzbericht der Zeitbilanz"""
+        return (f"I/O waits {self.wait_time:.2f} s in {self.waits} waits ({self.timeouts} timeouts), "
+                f"skipped branches {self.skipped_time:.2f} s")
+
+
+def _number(value):
+    """Anschlusswert aus dem RTS-Befehl (als Text übergeben) als Zahl"""
+    text = str(value).strip()
+    if text in ("True", "False"):
+        return float(text == "True")
+    return float(text)
+
+
+class IOLinkTee:
+    """Leitet RunCode-Aufrufe der RTS-Klasse zusätzlich an das simulierte I/O-Modell weiter"""
+
+    def __init__(self, rdk, io):
+        self._rdk = rdk
+        self._io = io
+
+    def __getattr__(self, name):
+        return getattr(self._rdk, name)
+
+    def RunCode(self, code, code_is_fcn_call=False):
+        self._io.run_code(code)
+        return self._rdk.RunCode(code, code_is_fcn_call)
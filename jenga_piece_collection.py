@@ -1,45 +1,175 @@
+import numpy as np
+
+# Zustände eines Steins
+IN_MAGAZINE = 0
+HELD = 1
+PLACED = 2
+
+# Geometrietypen der Jenga-Steine: Zeile = Typ, Spalten = (Länge, Breite, Höhe)
+GEOMETRIES = np.array([
+    [75, 25.5, 15],     # Standard-Jengastück
+])
+STANDARD = 0
+
+# Anzahl Steine pro Turm-Layer
+PIECES_PER_LAYER = 3
+
+
 class JengaPiece:
-    """Repräsentiert einen einzelnen Jenga-Stein mit seinen Eigenschaften"""
-    
-    def __init__(self, rdk, number):
-        self.number = number
-        self.rdk = rdk
-        self.piece = rdk.Item(f"Jengastuck {number}")
-        
-        # Geometrische Eigenschaften des Jenga-Steins
-        self.length = 75
-        self.width = 25.5
-        self.height = 15
-        
-        if not self.piece.Valid():
-            raise Exception(f"Jenga piece {number} not found in RoboDK")
-    
+    """Repräsentiert einen einzelnen Jenga-Stein als schlanke Sicht auf die Arrays der Sammlung"""
+
+    __slots__ = ("_collection", "_index")
+
+    def __init__(self, collection, index):
+        self._collection = collection
+        self._index = index
+
+    @property
+    def number(self):
+        """Steinnummer (entspricht Name 'Jengastuck <number>' in RoboDK)"""
+        return int(self._collection.numbers[self._index])
+
+    @property
+    def rdk(self):
+        return self._collection.rdk
+
+    @property
+    def piece(self):
+        """RoboDK-Item des Steins"""
+        return self._collection.handles[self._index]
+
+    # Geometrische Eigenschaften aus der gemeinsamen Geometrietabelle
+    @property
+    def length(self):
+        return float(GEOMETRIES[self._collection.geometry[self._index], 0])
+
+    @property
+    def width(self):
+        return float(GEOMETRIES[self._collection.geometry[self._index], 1])
+
+    @property
+    def height(self):
+        return float(GEOMETRIES[self._collection.geometry[self._index], 2])
+
+    @property
+    def state(self):
+        """Zustand IN_MAGAZINE, HELD oder PLACED"""
+        return int(self._collection.state[self._index])
+
+    @state.setter
+    def state(self, value):
+        self._collection.state[self._index] = value
+
+    @property
+    def target(self):
+        """Geplanter Turmplatz (0-basiert), -1 falls kein Ziel zugewiesen"""
+        return int(self._collection.target[self._index])
+
+    @target.setter
+    def target(self, value):
+        self._collection.target[self._index] = value
+
     def attach_to_frame(self, frame):
         """Befestigt den Stein statisch an einem Frame (für Turmbau)"""
         self.piece.setParentStatic(frame)
-    
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, JengaPiece) and
+            other._collection is self._collection and
+            other._index == self._index
+        )
+
+    def __hash__(self):
+        return hash((id(self._collection), self._index))
+
     def __str__(self):
         """String-Darstellung für Debugging und Logging"""
         return f"JengaPiece({self.number})"
-    
+
     def __repr__(self):
         """Entwickler-Darstellung des Objekts"""
         return f"JengaPiece(number={self.number})"
 
 
 class JengaPieceCollection:
-    """Sammlung aller Jenga-Steine mit komfortablen Zugriffsmethoden"""
-    
-    def __init__(self, rdk, count=15):
+    """
+    Sammlung aller Jenga-Steine mit komfortablen Zugriffsmethoden
+
+    Die Daten liegen in parallelen Arrays (Nummer, RoboDK-Item, Geometrietyp, Zustand, Zielplatz),
+    die einzelnen JengaPiece-Objekte sind nur Sichten darauf. Dadurch bleibt der Speicherbedarf
+    auch bei tausenden Steinen klein und Abfragen lassen sich vektorisiert formulieren.
+    """
+
+    def __init__(self, rdk, count=15, first_number=1, geometry=STANDARD):
         """Initialisiert Sammlung mit spezifizierter Anzahl Steine"""
         self.rdk = rdk
-        # Erstellt Liste aller Jenga-Steine
-        self.pieces = [JengaPiece(rdk, i) for i in range(1, count + 1)]
-    
+
+        self.numbers = np.arange(first_number, first_number + count, dtype=np.int32)
+        self.geometry = np.full(count, geometry, dtype=np.int8)
+        self.state = np.full(count, IN_MAGAZINE, dtype=np.int8)
+
+        # Standardplan: Stein n wird auf Turmplatz n-1 gesetzt
+        self.target = np.arange(count, dtype=np.int32)
+
+        # RoboDK-Items der Steine
+        self.handles = np.empty(count, dtype=object)
+        for i, number in enumerate(self.numbers):
+            handle = rdk.Item(f"Jengastuck {number}")
+            if not handle.Valid():
+                raise Exception(f"Jenga piece {number} not found in RoboDK")
+            self.handles[i] = handle
+
     def __len__(self):
         """Unterstützt len()-Funktion für Anzahl Steine"""
-        return len(self.pieces)
-    
+        return len(self.numbers)
+
     def __iter__(self):
         """Ermöglicht Iteration über alle Steine in numerischer Reihenfolge"""
-        return iter(self.pieces)
\ No newline at end of file
+        return (JengaPiece(self, i) for i in range(len(self.numbers)))
+
+    def __getitem__(self, index):
+        """Zugriff über Index (0-basiert) in der Sammlung"""
+        if index < 0:
+            index += len(self.numbers)
+        if not 0 <= index < len(self.numbers):
+            raise IndexError(index)
+        return JengaPiece(self, index)
+
+    def by_number(self, number):
+        """Liefert den Stein mit der gegebenen Nummer"""
+        index = np.flatnonzero(self.numbers == number)
+        if len(index) == 0:
+            raise Exception(f"Jenga piece {number} not in collection")
+        return JengaPiece(self, int(index[0]))
+
+    def select(self, mask):
+        """Liefert Steine für eine boolesche Maske über die Sammlung"""
+        return [JengaPiece(self, int(i)) for i in np.flatnonzero(mask)]
+
+    def layers(self):
+        """Layer (0-basiert) des Zielplatzes jedes Steins, -1 falls kein Ziel zugewiesen"""
+        return np.where(self.target >= 0, self.target // PIECES_PER_LAYER, -1)
+
+    def unplaced_in_layer(self, layer):
+        """Alle noch nicht platzierten Steine, deren Zielplatz im gegebenen Layer liegt"""
+        return self.select((self.state != PLACED) & (self.layers() == layer))
+
+    def set_state(self, numbers, state):
+        """Setzt den Zustand mehrerer Steine über ihre Nummern"""
+        self.state[np.isin(self.numbers, numbers)] = state
+
+    def replace_missing(self, missing, substitute):
+        """
+        Ersatzstein übernimmt den Zielplatz eines fehlenden Steins (Fehlgriff im Magazin)
+        Die Zielplätze aller nachfolgenden, noch nicht platzierten Steine rücken um einen Platz auf.
+        """
+        freed = substitute.target
+        substitute.target = missing.target
+        missing.target = -1
+        if freed >= 0:
+            self.target[(self.state != PLACED) & (self.target > freed)] -= 1
+
+    def count_by_state(self):
+        """Anzahl Steine pro Zustand (IN_MAGAZINE, HELD, PLACED)"""
+        return np.bincount(self.state, minlength=3)
@@ -0,0 +1,240 @@
+# Optimierung der Zellenanordnung (Magazin- und Turm-Frame) für den TX2-40
+# Rastert Frame-Platzierungen, prüft die Erreichbarkeit aller Ziele mit vektorisierter
+# Rückwärtstransformation und bewertet jede Platzierung mit einem Zykluszeitmodell
+#
+# Aufruf (RoboDK mit Simulation.rdk muss laufen):
+#     python layout_optimizer.py --range 150 --step 25 --angle-step 15
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from robodk.robolink import Robolink
+from robodk.robomath import invH
+
+from magazine import Magazine
+from tower import Tower
+from jenga_piece_collection import JengaPieceCollection
+from robot_controller import RobotController
+from tx2_kinematics import inverse, within_limits, check_model
+from transforms import to_array, to_mat, flange_poses, rotations_z
+
+
+class CycleTimeModel:
+    """
+    Zykluszeitmodell des Pick/Place-Ablaufs aus RobotController (Home -> Anfahrpose -> Home)
+
+    Gelenkbewegungen synchron mit Trapezprofil (langsamste Achse bestimmt die Dauer),
+    Linearbewegungen mit Trapezprofil entlang der Strecke. Standardwerte entsprechen
+    robot.setSpeed(50, 50, 50, 75) und der Präzisionsgeschwindigkeit 10 mm/s. Mit
+    contact_distance wird die zweistufige Anfahrt (RobotController.use_two_stage_contact)
+    modelliert: nur die letzten contact_distance mm mit Präzisionsgeschwindigkeit.
+    """
+
+    def __init__(self, speed_joints=50, accel_joints=75, speed_linear=50, accel_linear=50, precision_speed=10,
+                 contact_distance=None, fast_speed=100):
+        self.speed_joints = speed_joints
+        self.accel_joints = accel_joints
+        self.speed_linear = speed_linear
+        self.accel_linear = accel_linear
+        self.precision_speed = precision_speed
+        self.contact_distance = contact_distance
+        self.fast_speed = fast_speed
+
+    @staticmethod
+    def _trapezoid(distance, speed, accel):
+        """Dauer einer Bewegung über distance mit Trapez- bzw. Dreiecksprofil"""
+        distance = np.abs(distance)
+        return np.where(
+            distance >= speed ** 2 / accel,
+            distance / speed + speed / accel,
+            2 * np.sqrt(distance / accel),
+        )
+
+    def joint_time(self, start, end):
+        """Dauer einer Gelenkbewegung (..., 6) -> (...)"""
+        return np.max(self._trapezoid(np.asarray(end) - np.asarray(start), self.speed_joints, self.accel_joints), axis=-1)
+
+    def linear_time(self, distance, speed=None):
+        """Dauer einer Linearbewegung über distance in mm"""
+        return self._trapezoid(distance, self.precision_speed if speed is None else speed, self.accel_linear)
+
+    def contact_time(self, depth):
+        """Anfahrpose -> Kontakt über depth mm, zweistufig falls contact_distance gesetzt"""
+        if self.contact_distance is None:
+            return self.linear_time(depth)
+        slow = np.minimum(depth, self.contact_distance)
+        return self.linear_time(depth - slow, self.fast_speed) + self.linear_time(slow)
+
+    def station_time(self, home, above_joints, depth):
+        """Home -> Anfahrpose -> Kontakt -> Anfahrpose -> Home für Gelenkwerte (..., 6) der Anfahrpose"""
+        return 2 * self.joint_time(home, above_joints) + 2 * self.contact_time(depth)
+
+
+def local_targets(above, poses):
+    """
+    Ziele relativ zum Frame mit beiden symmetrischen Varianten
+    above, poses: (S, 4, 4) in Koordinaten des Frames
+    Rückgabe: (S, 2, 2, 4, 4) für Ziel x Variante x (above, pose)
+    """
+    pair = np.stack([above, poses], axis=1)
+    flip = rotations_z(np.pi)  # Drehung um die Werkzeugachse
+    return np.stack([pair, pair @ flip], axis=1)
+
+
+def candidate_frames(pose, span, step, angle_span, angle_step):
+    """Raster von Frame-Posen um die aktuelle Pose: Verschiebung in x/y und Drehung um z"""
+    offsets = np.arange(-span, span + step / 2, step)
+    angles = np.radians(np.arange(-angle_span, angle_span + angle_step / 2, angle_step)) if angle_step else np.zeros(1)
+    dx, dy, da = np.meshgrid(offsets, offsets, angles, indexing="ij")
+    dx, dy, da = dx.ravel(), dy.ravel(), da.ravel()
+
+    # Drehung um die eigene z-Achse des Frames, Verschiebung in Parent-Koordinaten
+    c, s = np.cos(da), np.sin(da)
+    rot = np.zeros((len(da), 4, 4))
+    rot[:, 0, 0], rot[:, 0, 1], rot[:, 1, 0], rot[:, 1, 1] = c, -s, s, c
+    rot[:, 2, 2] = rot[:, 3, 3] = 1
+
+    frames = pose @ rot
+    frames[:, 0, 3] += dx
+    frames[:, 1, 3] += dy
+    return frames
+
+
+def score_frames(frames, targets, reference, tool_inv, home, model, wrist_margin=10):
+    """
+    Zykluszeitanteil einer Station für jede Frame-Platzierung (inf falls ein Ziel unerreichbar)
+    frames (C, 4, 4), targets (S, 2, 2, 4, 4) aus local_targets(...)
+    """
+    c, s = len(frames), len(targets)
+    flange = flange_poses(reference, frames[:, None, None, None] @ targets[None], tool_inv)
+    joints, valid = inverse(flange.reshape(-1, 4, 4))
+    joints = joints.reshape(c, s, 2, 2, 8, 6)
+    valid = valid.reshape(c, s, 2, 2, 8) & within_limits(joints)
+    valid &= np.abs(np.sin(np.radians(joints[..., 4]))) >= np.sin(np.radians(wrist_margin))
+
+    # Anfahr- und Kontaktpose müssen in derselben Konfiguration erreichbar sein (keine Umorientierung bei MoveL)
+    usable = valid[:, :, :, 0] & valid[:, :, :, 1]
+    depth = np.linalg.norm(targets[:, :, 0, :3, 3] - targets[:, :, 1, :3, 3], axis=-1)
+
+    times = model.station_time(home, joints[:, :, :, 0], depth[None, :, :, None])
+    times = np.where(usable, times, np.inf)
+
+    # Beste Variante und Konfiguration pro Ziel, Summe über alle Ziele
+    return times.min(axis=(2, 3)).sum(axis=1)
+
+
+def _score_chunk(args):
+    """Arbeitspaket für den Prozess-Pool"""
+    return score_frames(*args)
+
+
+def optimize_station(frames, targets, reference, tool_inv, home, model, workers=None, chunk=64):
+    """Bewertet alle Kandidaten verteilt auf einen Prozess-Pool"""
+    chunks = [frames[i:i + chunk] for i in range(0, len(frames), chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_score_chunk, [(part, targets, reference, tool_inv, home, model) for part in chunks])
+        return np.concatenate(list(results))
+
+
+def best_layout(magazine_frames, magazine_times, tower_frames, tower_times, magazine_points, tower_point,
+                clearance=60, top=50):
+    """
+    Beste Kombination aus den je `top` schnellsten Platzierungen mit Mindestabstand
+    zwischen Turmmitte und allen Magazinplätzen
+    """
+    best = None
+    for i in np.argsort(magazine_times)[:top]:
+        if not np.isfinite(magazine_times[i]):
+            break
+        slots = (magazine_frames[i] @ magazine_points.T).T[:, :2]
+        for j in np.argsort(tower_times)[:top]:
+            if not np.isfinite(tower_times[j]):
+                break
+            center = (tower_frames[j] @ tower_point)[:2]
+            if np.min(np.linalg.norm(slots - center, axis=1)) < clearance:
+                continue
+            total = magazine_times[i] + tower_times[j]
+            if best is None or total < best[0]:
+                best = (total, i, j)
+            break
+    return best
+
+
+def _describe(pose):
+    x, y, z = pose[:3, 3]
+    angle = np.degrees(np.arctan2(pose[1, 0], pose[0, 0]))
+    return f"x={x:.1f} y={y:.1f} z={z:.1f} rz={angle:.1f}"
+
+
+def main(span=150, step=25, angle_span=45, angle_step=15, clearance=60, workers=None, contact_distance=None):
+    """Optimiert die Platzierung von Magazin und Turm für die Station in RoboDK"""
+    rdk = Robolink()
+    robot_controller = RobotController(rdk)
+    magazine = Magazine(rdk)
+    tower = Tower(rdk)
+    pieces = JengaPieceCollection(rdk, 15)
+    robot = robot_controller.robot
+
+    # Kinematikmodell gegen die Station prüfen
+    check_model(robot)
+
+    # Transformation Frame-Parent -> Roboterbasis und Werkzeug
+    base_abs = robot.Parent().PoseAbs()
+    reference = to_array(invH(base_abs) * tower.frame.Parent().PoseAbs())
+    if magazine.frame.Parent() != tower.frame.Parent():
+        raise Exception("Magazine and tower frames must share the same parent frame")
+    tool_inv = to_array(invH(robot.PoseTool()))
+    home = np.array(robot_controller.t_home, dtype=float)
+    model = CycleTimeModel(contact_distance=contact_distance)
+
+    # Ziele relativ zu den Frames (beide symmetrischen Varianten), in einem Schritt über den Transformationskern
+    identity = np.eye(4)
+    slots = np.arange(1, magazine.capacity + 1)
+    magazine_targets = local_targets(*magazine.get_pick_pose_arrays(slots, frame_pose=identity))
+    tower_targets = local_targets(
+        *tower.get_placement_pose_arrays(pieces[0], np.arange(1, len(pieces) + 1), frame_pose=identity)
+    )
+
+    # Kandidaten rastern und parallel bewerten (aktuelle Platzierung liegt im Raster)
+    magazine_pose = to_array(magazine.frame.Pose())
+    tower_pose = to_array(tower.frame.Pose())
+    magazine_frames = candidate_frames(magazine_pose, span, step, angle_span, angle_step)
+    tower_frames = candidate_frames(tower_pose, span, step, angle_span, angle_step)
+    print(f"Evaluating {len(magazine_frames)} magazine and {len(tower_frames)} tower placements...")
+
+    magazine_times = optimize_station(magazine_frames, magazine_targets, reference, tool_inv, home, model, workers)
+    tower_times = optimize_station(tower_frames, tower_targets, reference, tool_inv, home, model, workers)
+
+    current = score_frames(magazine_pose[None], magazine_targets, reference, tool_inv, home, model)[0] + \
+        score_frames(tower_pose[None], tower_targets, reference, tool_inv, home, model)[0]
+
+    slot_x, slot_y = magazine.get_slot_positions(slots)
+    magazine_points = np.stack([slot_x, slot_y, np.zeros(len(slots)), np.ones(len(slots))], axis=1)
+    tower_point = np.array([tower.base_x, tower.base_y, 0, 1])
+    best = best_layout(magazine_frames, magazine_times, tower_frames, tower_times, magazine_points, tower_point,
+                       clearance)
+    if best is None:
+        raise Exception("No placement reaches all magazine and tower targets")
+
+    total, i, j = best
+    print(f"Current layout: {current:.1f} s modelled motion time per build")
+    print(f"Best layout:    {total:.1f} s modelled motion time per build")
+    print(f"  {magazine.frame.Name()}: {_describe(magazine_frames[i])}")
+    print(f"  {tower.frame.Name()}: {_describe(tower_frames[j])}")
+    return to_mat(magazine_frames[i]), to_mat(tower_frames[j])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimierung der Zellenanordnung")
+    parser.add_argument("--range", type=float, default=150, help="Verschiebung der Frames um +/- mm")
+    parser.add_argument("--step", type=float, default=25, help="Rasterweite in mm")
+    parser.add_argument("--angle-range", type=float, default=45, help="Drehung der Frames um +/- Grad")
+    parser.add_argument("--angle-step", type=float, default=15, help="Winkelraster in Grad (0 = ohne Drehung)")
+    parser.add_argument("--clearance", type=float, default=60, help="Mindestabstand Turmmitte zu Magazinplätzen in mm")
+    parser.add_argument("--contact-distance", type=float, default=None, 
+                        help="Zweistufige Anfahrt modellieren: langsamer Abschnitt in mm")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    args = parser.parse_args()
+
+    main(args.range, args.step, args.angle_range, args.angle_step, args.clearance, args.workers, args.contact_distance)
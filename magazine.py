@@ -2,6 +2,12 @@ from robodk.robolink import *
 from robodk.robomath import *
 from robodk.robodialogs import *
 
+import numpy as np
+
+from configuration_selector import symmetric_variants
+from jenga_piece_collection import IN_MAGAZINE
+from transforms import to_array, to_mat, to_mats, inverse, transform_points, gripper_targets
+
 class Magazine:
     """Verwaltet Magazin-Frame und Stein-Positionierung für Aufnahme"""
     
@@ -16,64 +22,164 @@ class Magazine:
         self.z_offset = 15              
         self.z_pick = 15                
         
+        # Zweistufige Anfahrt der Aufnahmepose (siehe RobotController.use_two_stage_contact):
+        # die letzten contact_distance mm mit slow_speed, die Strecke davor mit fast_speed (mm/s)
+        self.contact_distance = 5
+        self.fast_speed = 100
+        self.slow_speed = 10
+        
         # Magazin-Layout: 8 Steine in erster Reihe, 7 in zweiter Reihe
         self.count_first_row = 8
         self.count_second_row = 7
         
+        # Belegung der Magazinplätze: Platz -> Stein (wird über build_slot_index(...) befüllt)
+        self.slot_pieces = {}
+        self.frame_pose_inv = None
+        
+        # Optionale Auswahl der Greiforientierung (siehe ConfigurationSelector)
+        self.selector = None
+        
         if not self.frame.Valid():
             raise Exception(f"Magazine frame '{frame_name}' not found in RoboDK")
     
+    @property
+    def capacity(self):
+        """Anzahl Magazinplätze über beide Reihen"""
+        return self.count_first_row + self.count_second_row
+    
+    def get_slot_position(self, slot):
+        """Berechnet Raster-Position (x, y) eines Magazinplatzes (1-basiert) im Magazin-Frame"""
+        if slot <= self.count_first_row:
+            return self.offset_x + (slot - 1) * 25, self.offset_y_first_row
+        return self.offset_x + (slot - self.count_first_row - 1) * 25, self.offset_y_second_row
+    
+    def get_slot_positions(self, slots):
+        """Vektorisierte Variante von get_slot_position: Arrays (x, y) für viele Plätze"""
+        slots = np.asarray(slots)
+        first_row = slots <= self.count_first_row
+        column = np.where(first_row, slots - 1, slots - self.count_first_row - 1)
+        x = self.offset_x + column * 25
+        y = np.where(first_row, self.offset_y_first_row, self.offset_y_second_row)
+        return x, y
+    
+    def get_pick_pose_arrays(self, slots, rotation=0, frame_pose=None):
+        """
+        Anfahr- und Aufnahmeposen (N, 4, 4) für viele Magazinplätze in einem Schritt
+        frame_pose: Pose des Magazin-Frames als (4, 4), Standard: aktuelle Pose in RoboDK
+        """
+        if frame_pose is None:
+            frame_pose = to_array(self.frame.Pose())
+        x, y = self.get_slot_positions(slots)
+        
+        # Position oberhalb des Steins für sichere Anfahrt und direkte Aufnahmeposition
+        pick_above = gripper_targets(frame_pose, x, y, self.z_offset, rotation)
+        pick = gripper_targets(frame_pose, x, y, self.z_pick, rotation)
+        return pick_above, pick
+    
+    def get_pick_pose(self, slot):
+        """Berechnet Anfahr- und Aufnahmepose für einen einzelnen Magazinplatz"""
+        frame_pose = to_array(self.frame.Pose())
+        
+        def poses(rotation):
+            # Posen über den gemeinsamen Transformationskern, Mat nur an der Schnittstelle
+            pick_above, pick = self.get_pick_pose_arrays([slot], rotation, frame_pose)
+            return to_mat(pick_above[0]), to_mat(pick[0])
+        
+        # Stein ist um 180° symmetrisch: Orientierung mit kürzester Gelenkbewegung wählen
+        if self.selector is not None:
+            return self.selector.select(symmetric_variants(poses, 0))
+        
+        return poses(0)
+    
+    def build_slot_index(self, pieces):
+        """Legt räumlichen Index der Magazinplätze an: Platz -> dort liegender Stein (nur Steine im Magazin)"""
+        self.slot_pieces = {
+            piece.number: piece 
+            for piece in pieces 
+            if piece.number <= self.capacity and piece.state == IN_MAGAZINE
+        }
+        
+        # Inverse Frame-Pose einmalig berechnen, Abfragen benötigen danach keine RoboDK-Aufrufe
+        self.frame_pose_inv = inverse(to_array(self.frame.Pose()))
+    
+    def take_item_near(self, pose, max_distance=12.5):
+        """
+        Entnimmt Stein am nächstgelegenen Magazinplatz zur gegebenen Werkzeugpose (Welt)
+        Rückgabe: RoboDK-Item des Steins oder None
+        """
+        piece = self.take_slot(self.slot_near(pose, max_distance))
+        return piece.piece if piece is not None else None
+    
+    def slot_near(self, pose, max_distance=12.5):
+        """
+        Magazinplatz an der gegebenen Werkzeugpose (Welt) oder None
+        Der Platz wird direkt aus dem Raster berechnet (konstanter Aufwand unabhängig von der Anzahl Steine).
+        """
+        x, y, _ = transform_points(self.frame_pose_inv, to_array(pose)[:3, 3])
+        
+        # Nächstgelegene Reihe bestimmen
+        if abs(y - self.offset_y_first_row) <= abs(y - self.offset_y_second_row):
+            first_slot, count = 1, self.count_first_row
+        else:
+            first_slot, count = self.count_first_row + 1, self.count_second_row
+        
+        # Spalte aus dem 25mm-Raster
+        column = round((x - self.offset_x) / 25)
+        if not 0 <= column < count:
+            return None
+        
+        slot = first_slot + column
+        slot_x, slot_y = self.get_slot_position(slot)
+        if ((slot_x - x) ** 2 + (slot_y - y) ** 2) ** 0.5 > max_distance:
+            return None
+        
+        return slot
+    
+    def take_slot(self, slot):
+        """Entnimmt den Stein eines Platzes aus dem Belegungsmodell (None falls leer)"""
+        return self.slot_pieces.pop(slot, None)
+    
+    def put_slot(self, slot, piece):
+        """Legt einen Stein im Belegungsmodell auf einen Platz"""
+        self.slot_pieces[slot] = piece
+    
+    def is_stocked(self, slot):
+        """Platz laut Belegungsmodell belegt (ohne Index immer True)"""
+        return self.frame_pose_inv is None or slot in self.slot_pieces
+    
+    def mark_empty(self, slot):
+        """Markiert einen Platz als leer, z.B. nach einem Fehlgriff"""
+        if self.slot_pieces.pop(slot, None) is not None:
+            print(f"Magazine slot {slot} marked empty")
+    
+    def nearest_stocked_slot(self, slot):
+        """Belegter Platz mit kürzestem Abstand zum gegebenen Platz (None falls Magazin leer)"""
+        x, y = self.get_slot_position(slot)
+        best = None
+        for candidate in self.slot_pieces:
+            if candidate == slot:
+                continue
+            cx, cy = self.get_slot_position(candidate)
+            distance = (cx - x) ** 2 + (cy - y) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, candidate)
+        return best[1] if best is not None else None
+    
     def get_pick_positions(self):
         """Generiert alle Aufnahmepositionen für Steine im Magazin"""
         pick_above, pick = {}, {}
         
-        # Erste Reihe: Steine 1-8 mit 25mm Abstand
-        for i in range(self.count_first_row):
-            piece_num = i + 1
-            
-            # Position oberhalb des Steins für sichere Anfahrt
-            pick_above[f"Jenga{piece_num}above"] = (
-                self.frame.Pose() * 
-                transl(
-                    self.offset_x + i * 25,
-                    self.offset_y_first_row, 
-                    self.z_offset
-                    ) * 
-                rotx(pi)  # 180° Rotation für korrekte Greifer-Orientierung
-            )
-            
-            # Direkte Aufnahmeposition des Steins
-            pick[f"Jenga{piece_num}"] = (
-                self.frame.Pose() * 
-                transl(self.offset_x + i * 25, 
-                       self.offset_y_first_row, 
-                       self.z_pick
-                       ) * 
-                rotx(pi)
-            )
-        
-        # Zweite Reihe: Steine 9-15 mit identischem Raster
-        for i in range(self.count_second_row):
-            piece_num = i + 9
-            
-            # Position oberhalb des Steins
-            pick_above[f"Jenga{piece_num}above"] = (
-                self.frame.Pose() * 
-                transl(self.offset_x + i * 25, 
-                       self.offset_y_second_row, 
-                       self.z_offset
-                       ) * 
-                rotx(pi)
-            )
-            
-            # Aufnahmeposition
-            pick[f"Jenga{piece_num}"] = (
-                self.frame.Pose() * 
-                transl(self.offset_x + i * 25, 
-                       self.offset_y_second_row, 
-                       self.z_pick
-                       ) * 
-                rotx(pi)
-            )
-        
-        return pick_above, pick
\ No newline at end of file
+        # Mit Orientierungsauswahl pro Platz über get_pick_pose(...)
+        if self.selector is not None:
+            for slot in range(1, self.capacity + 1):
+                pick_above[f"Jenga{slot}above"], pick[f"Jenga{slot}"] = self.get_pick_pose(slot)
+            return pick_above, pick
+        
+        # Alle Plätze beider Reihen (Steine 1-8 und 9-15) in einem Schritt berechnen
+        slots = list(range(1, self.capacity + 1))
+        above_poses, pick_poses = self.get_pick_pose_arrays(slots)
+        for slot, above_pose, pick_pose in zip(slots, to_mats(above_poses), to_mats(pick_poses)):
+            pick_above[f"Jenga{slot}above"] = above_pose
+            pick[f"Jenga{slot}"] = pick_pose
+        
+        return pick_above, pick
@@ -17,9 +17,39 @@ Beschreibung:
 Abhängigkeiten (gem. Ordner und requirements.txt):
     - RoboDK (robolink, robomath, robodialogs)
     - RTS-System für Vakuum-Greifer-Steuerung
-    - Benutzerdefinierte Module: robot_controller, magazine, tower, jenga_piece_collection
+    - Benutzerdefinierte Module: robot_controller, magazine, tower, jenga_piece_collection, build_checkpoint
+
+Aufruf:
+    python main.py              Neuer Turmbau ab Stein 1
+    python main.py --resume     Wiederaufnahme ab dem nächsten nicht platzierten Stein
+    python main.py --cycles N   N Aufbau-/Abbauzyklen über die TaskPipeline (N >= 1)
+    python main.py --endless    Roboterprogramm mit Endlosschleife um einen Aufbau-/Abbauzyklus
+    python main.py --export-val3 DIR   VAL3-Projekt direkt nach DIR schreiben
+    python main.py --optimize   Befehle über die IR mit Peephole-Optimierung ausführen
+    python main.py --mode turbo Simulation ohne Rendering, Ausgabe der simulierten Zykluszeit
+    python main.py --metrics-port 9100 --metrics-file metrics.prom
+                                Phasen- und Zykluszeiten im Prometheus-Format bereitstellen
+    python main.py --two-stage                 Schnelle Anfahrt, nur die letzten Millimeter vor dem Kontakt langsam
+    python main.py --simulate-io --sensor-latency 0.1
+                                RTS-Wartebefehle und -Verzweigungen mit simulierten Sensorlatenzen auswerten
+    python main.py --trajectory run.traj --trajectory-rate 250
+                                Gelenkwerte, TCP, Geschwindigkeit und Vakuum in einen Ringpuffer aufzeichnen
+    python main.py --record session.jsonl      Alle RoboDK-Aufrufe mit Antworten aufzeichnen
+    python main.py --replay session.jsonl      Lauf ohne RoboDK gegen Aufzeichnung wiederholen und vergleichen
+    python main.py --select-config             Greiforientierung und Gelenkkonfiguration mit kürzester Bewegung wählen
+    python main.py --select-config --connections 4
+                                IK der Anfahrposen parallel über einen Pool von RoboDK-Verbindungen lösen
+    python main.py --towers TowerFrame,TowerFrame2 --settle-time 5 --check-time 2
+                                Mehrere Türme verschränkt aus einem oder mehreren Magazinen (--magazines) bauen
+    python main.py --robots "Staubli TX2-40,Staubli TX2-40 B" --tools Greifer1,Greifer2 --magazines M1,M2
+                                Mehrere Roboter bauen einen Turm aus je einem Magazin mit Zonenverriegelung
+    python main.py --pick-recovery             Fehlgriffe über den nächsten belegten Magazinplatz beheben
+    python main.py --recovery-program          Zusätzlich Ersatzaufnahme als ifConnection-Block ins Programm
 """
 
+import argparse
+import time
+
 from robodk.robolink import *
 from robodk.robomath import *
 from robodk.robodialogs import *
@@ -27,56 +57,362 @@ from robodk.robodialogs import *
 from robot_controller import RobotController
 from magazine import Magazine
 from tower import Tower
-from jenga_piece_collection import JengaPieceCollection
+from jenga_piece_collection import JengaPieceCollection, PLACED
+from build_checkpoint import BuildCheckpoint
+from task_pipeline import TaskPipeline, run_pipeline
+from interference_checker import InterferenceChecker, plan_from_tower
+from val3_writer import Val3Writer
+from metrics import Metrics
+from session_replay import SessionRecorder, SessionReplay
+from multi_tower_scheduler import MultiTowerScheduler, run_schedule
+from multi_robot_coordinator import MultiRobotCoordinator, ZoneInterlock, run_coordinated
+from connection_pool import RobolinkPool
+
+
+def build_tower(robot_controller, magazine, tower, pieces, checkpoint):
+    """Sequenzieller Turmbau aller noch nicht platzierten Steine mit Checkpoint nach jedem Stein"""
+    # Pickup-Positionen im Magazin berechnen und generieren
+    pick_above_poses, pick_poses = magazine.get_pick_positions()
+    print("Magazine pickup positions generated")
+    
+    # Start des sequenziellen Turmbaus
+    print("Starting Jenga tower construction...")
+    
+    # Iterative Verarbeitung aller noch nicht platzierten Jenga-Steine in numerischer Reihenfolge
+    for piece in checkpoint.remaining(pieces):
+        print(f"Processing {piece} for layer {tower.get_layer_for_piece(piece)+1}")
+        
+        # Kompletter Bewegungsablauf: Aufnehmen aus Magazin und Platzieren im Turm
+        held = robot_controller.move_piece(
+            piece, 
+            magazine, 
+            tower, 
+            pick_above_poses, 
+            pick_poses
+        )
+        
+        # Nach einem Fehlgriff übernimmt der Ersatzstein den Turmplatz, nachfolgende Plätze rücken auf
+        if held != piece:
+            pieces.replace_missing(piece, held)
+            piece = held
+        
+        # Fortschritt nach jedem platzierten Stein sichern
+        checkpoint.record_placement(piece, tower, robot_controller.robot, pieces)
+    
+    # Turmbau erfolgreich abgeschlossen - Roboter in Home-Position
+    print("Jenga tower construction completed!")
+    robot_controller.move_to_home()
+    checkpoint.clear()
+
+
+def check_tower_plan(tower, pieces):
+    """Prüft den Turmplan vor dem Bau auf Überlappungen und fehlende Auflage"""
+    pieces = list(pieces)
+    report = InterferenceChecker().check(*plan_from_tower(tower, pieces))
+    if report.overlaps or report.unsupported:
+        numbers = [piece.number for piece in pieces]
+        overlaps = [(numbers[i], numbers[j]) for i, j, _ in report.overlaps]
+        unsupported = [numbers[i] for i in report.unsupported]
+        raise Exception(f"Invalid tower plan for {tower.frame.Name()}: overlapping pieces {overlaps}, "
+                        f"unsupported pieces {unsupported}")
 
 
-def main():
+def run_continuous(robot_controller, magazine, tower, pieces, cycles, endless):
+    """Kontinuierlicher Betrieb: Aufgaben werden bei Bedarf aus Magazin- und Turmzustand geplant"""
+    pipeline = TaskPipeline(
+        pieces, 
+        magazine, 
+        tower, 
+        cycles=1 if endless else cycles
+    )
+    print("Starting continuous production...")
+    count = run_pipeline(
+        robot_controller, 
+        pipeline, 
+        endless_name="productionLoop" if endless else None
+    )
+    print(f"Continuous production finished after {count} tasks")
+    robot_controller.move_to_home()
+
+
+def main(resume=False, checkpoint_path="build_checkpoint.json", cycles=None, endless=False, export_val3=None, 
+         optimize=False, mode="demo", metrics_port=None, metrics_file=None, record=None, replay=None, 
+         replay_diff=None, select_config=False, towers=None, magazines=None, settle_time=0.0, check_time=0.0, 
+         pick_recovery=False, recovery_program=False, trajectory=None, trajectory_rate=250, two_stage=False, 
+         simulate_io=False, sensor_latency=0.1, robots=None, tools=None, connections=None):
     """Hauptfunktion für den automatisierten Jenga-Turmbau"""
+    robot_controller = None
+    metrics = None
+    rdk = None
+    pool = None
     try:
-        # Verbindung zu RoboDK-Simulation herstellen
-        rdk = Robolink()
+        # Mehrere Türme bzw. Magazine werden ohne Checkpoint gebaut
+        if resume and (len(towers or []) > 1 or len(magazines or []) > 1):
+            raise Exception("--resume is not supported with several towers or magazines")
+        
+        # Der kontinuierliche Betrieb plant ab vollem Magazin und nutzt keinen Checkpoint
+        if resume and (cycles is not None or endless):
+            raise Exception("--resume is not supported with --cycles or --endless")
+        if cycles is not None and cycles < 1:
+            raise Exception("--cycles needs at least one cycle, use --endless for an endless robot program")
+        
+        # Checkpoint, Behebung von Fehlgriffen und Metriken sind nur für einen Roboter eingerichtet
+        single_robot_options = resume or pick_recovery or recovery_program or metrics_port is not None or metrics_file
+        if len(robots or []) > 1 and single_robot_options:
+            raise Exception("--resume, --pick-recovery, --recovery-program and metrics require a single robot")
+        
+        # Die Auswahl der Greiforientierung löst die IK des ersten Roboters für Magazin und Turm
+        if len(robots or []) > 1 and select_config:
+            raise Exception("--select-config requires a single robot")
+        
+        # Mit --optimize laufen Bewegungen erst beim Abarbeiten der IR, Phasenzeiten wären nur Aufzeichnungszeiten
+        if optimize and (metrics_port is not None or metrics_file is not None):
+            raise Exception("Metrics (--metrics-port, --metrics-file) are not supported with --optimize")
+        
+        # Bahnaufzeichnung braucht eine eigene RoboDK-Verbindung, die Wiedergabe läuft ohne RoboDK
+        if trajectory is not None and replay is not None:
+            raise Exception("--trajectory is not supported with --replay")
+        
+        # Verbindung zu RoboDK-Simulation herstellen bzw. Aufzeichnung wiedergeben
+        if replay is not None:
+            rdk = SessionReplay(replay)
+        elif record is not None:
+            rdk = SessionRecorder(Robolink(), record)
+        else:
+            rdk = Robolink()
+        
+        # Optionaler direkter VAL3-Export ohne Postprozessor
+        program_writer = Val3Writer(export_val3) if export_val3 else None
+        
+        # Roboter und Greifer (mehrere Roboter nur paarweise mit eigenem Greifer)
+        robot_names = list(zip(robots or [], tools or []))
+        if len(robots or []) != len(tools or []):
+            raise Exception("Each robot needs its own gripper (--robots and --tools)")
         
         # Initialisierung der Teilsysteme mit objektorientiertem Ansatz
-        robot_controller = RobotController(rdk)
-        magazine = Magazine(rdk)
-        tower = Tower(rdk)
+        robot_controller = RobotController(rdk, program_writer, optimize, *(robot_names[0] if robot_names else ()))
+        magazine = Magazine(rdk, *(magazines or [])[:1])
+        tower = Tower(rdk, *(towers or [])[:1])
         
         # Jenga-Steine als Objektsammlung verwalten (15 Steine)
         pieces = JengaPieceCollection(rdk, 15)
         print(f"Initialized Jenga robot system with {len(pieces)} pieces")
         
-        # Robotersystem in Ausgangslage bringen
-        print("Initializing robot system...")
-        robot_controller.initialize()
+        # Turmplan vor dem Bau auf Überlappungen und fehlende Auflage prüfen
+        check_tower_plan(tower, pieces)
+        
+        # Ausführungsmodus der Simulation (demo, turbo, validate)
+        robot_controller.set_run_mode(mode)
         
-        # Pickup-Positionen im Magazin berechnen und generieren
-        pick_above_poses, pick_poses = magazine.get_pick_positions()
-        print("Magazine pickup positions generated")
+        # I/O-Wartezeiten und -Verzweigungen in der Simulation auswerten
+        if simulate_io:
+            robot_controller.use_simulated_io(sensor_latency)
         
-        # Start des sequenziellen Turmbaus
-        print("Starting Jenga tower construction...")
+        # Laufzeitmetriken, bei beschleunigter Simulation in simulierter Zeit (inkl. simulierter I/O-Wartezeiten)
+        if metrics_port is not None or metrics_file is not None:
+            clock = robot_controller.io.now if simulate_io else rdk.SimulationTime
+            metrics = Metrics(clock if mode == "turbo" else time.perf_counter)
+            if metrics_port is not None:
+                metrics.serve(metrics_port)
+            if metrics_file is not None:
+                metrics.write_to(metrics_file)
+            robot_controller.enable_metrics(metrics)
         
-        # Iterative Verarbeitung aller Jenga-Steine in numerischer Reihenfolge
-        for piece in pieces:
-            print(f"Processing {piece} for layer {tower.get_layer_for_piece(piece)+1}")
+        # Bahnaufzeichnung über eine eigene RoboDK-Verbindung
+        if trajectory is not None:
+            robot_controller.use_trajectory_recorder(Robolink(), trajectory, trajectory_rate)
+        
+        # Baufortschritt laden bzw. neu beginnen
+        checkpoint = BuildCheckpoint(checkpoint_path)
+        if resume and checkpoint.exists():
+            checkpoint.load()
+            dropped = checkpoint.reconcile(pieces, tower)
+            if dropped:
+                print(f"Pieces {dropped} not found on tower, rebuilding them")
+            print(f"Resuming tower construction after {len(checkpoint.placed)} placed pieces")
+            checkpoint.restore_targets(pieces)
+            pieces.set_state(checkpoint.placed, PLACED)
+            
+            # Roboter aus gesichertem Zustand in sichere Lage bringen
+            robot_controller.resume(checkpoint.robot_joints)
+        else:
+            checkpoint.clear()
             
-            # Kompletter Bewegungsablauf: Aufnehmen aus Magazin und Platzieren im Turm
-            robot_controller.move_piece(
-                piece, 
-                magazine, 
+            # Robotersystem in Ausgangslage bringen
+            print("Initializing robot system...")
+            robot_controller.initialize()
+        
+        # Greifen ohne bekanntes Teil über Index der Magazinplätze (nach dem Checkpoint-Abgleich)
+        robot_controller.use_magazine_index(magazine, pieces)
+        
+        # Fehlgriffe im Magazin ohne Bedienereingriff über den nächsten belegten Platz beheben
+        if pick_recovery or recovery_program:
+            robot_controller.use_pick_recovery(program=recovery_program)
+        
+        # Symmetrie der Steine für kürzere Gelenkbewegungen nutzen, IK optional parallel über einen Verbindungspool
+        if select_config:
+            if connections:
+                if record is not None or replay is not None:
+                    raise Exception("Pooled connections cannot be recorded or replayed")
+                pool = RobolinkPool(connections)
+            robot_controller.use_configuration_selector(magazine, tower, pieces, pool)
+        
+        # Schneller Abschnitt bis kurz vor die Kontaktpose, Umschaltabstand und Geschwindigkeiten pro Station
+        if two_stage:
+            robot_controller.use_two_stage_contact(magazine, tower)
+        
+        # Mehrere Roboter an einem Turm: Zuteilung der Turmplätze und Zonenverriegelung um den Turm
+        if len(robot_names) > 1:
+            if len(magazines or []) < len(robot_names):
+                raise Exception("Each robot needs its own magazine (--magazines)")
+            robot_magazines = [magazine] + [Magazine(rdk, name) for name in magazines[1:len(robot_names)]]
+            controllers = [robot_controller]
+            for robot_name, tool_name in robot_names[1:]:
+                other = RobotController(rdk, robot_name=robot_name, tool_name=tool_name)
+                other.initialize()
+                if simulate_io:
+                    other.use_simulated_io(sensor_latency)
+                if two_stage:
+                    other.use_two_stage_contact(*robot_magazines, tower)
+                controllers.append(other)
+            coordinator = MultiRobotCoordinator(
+                list(zip(controllers, robot_magazines)), 
                 tower, 
-                pick_above_poses, 
-                pick_poses
+                pieces, 
+                ZoneInterlock(tower.frame)
+            )
+            run_coordinated(coordinator)
+        
+        # Mehrere Türme bzw. Magazine: verschränkte Ablaufplanung
+        elif len(towers or []) > 1 or len(magazines or []) > 1:
+            all_magazines = [magazine] + [Magazine(rdk, name) for name in (magazines or [])[1:]]
+            all_towers = [tower] + [Tower(rdk, name) for name in (towers or [])[1:]]
+            for other in all_towers[1:]:
+                other.selector = tower.selector
+            for other in all_magazines[1:]:
+                other.selector = magazine.selector
+            if two_stage:
+                robot_controller.use_two_stage_contact(*all_magazines[1:], *all_towers[1:])
+            scheduler = MultiTowerScheduler(
+                pieces, all_magazines, all_towers, settle_time=settle_time, check_time=check_time
             )
+            for other in all_towers:
+                check_tower_plan(other, list(pieces)[:scheduler.pieces_per_tower])
+            run_schedule(robot_controller, scheduler)
+            robot_controller.move_to_home()
+        
+        # Kontinuierlicher Betrieb bzw. einmaliger Turmbau
+        elif cycles is not None or endless:
+            run_continuous(robot_controller, magazine, tower, pieces, cycles, endless)
+        else:
+            build_tower(robot_controller, magazine, tower, pieces, checkpoint)
         
-        # Turmbau erfolgreich abgeschlossen - Roboter in Home-Position
-        print("Jenga tower construction completed!")
-        robot_controller.move_to_home()
+        # Befehlsstrom abschliessen und direkt exportiertes VAL3-Programm schreiben
+        robot_controller.finish()
+        if program_writer is not None:
+            program_writer.close()
+            print(f"VAL3 program written to {program_writer.path}")
             
     except Exception as e:
         print(f"Error: {e}")
         raise
+    
+    finally:
+        # Metriken abschliessend in die Datei schreiben und Endpunkt stoppen
+        if metrics is not None:
+            metrics.close()
+        
+        # Zusätzliche Verbindungen der Planungsabfragen trennen
+        if pool is not None:
+            pool.close()
+        
+        # Bahnaufzeichnung beenden (Daten liegen bereits in der Datei)
+        if robot_controller is not None and robot_controller.trajectory is not None:
+            robot_controller.trajectory.stop()
+        
+        # Rendering wieder einschalten und Laufzeit melden (auch nach Fehlern)
+        if robot_controller is not None:
+            cycle_time, wall_time = robot_controller.end_run()
+            if wall_time is not None:
+                if cycle_time is not None:
+                    print(f"Simulated cycle time: {cycle_time:.1f} s (wall time {wall_time:.1f} s, mode {mode})")
+                    if robot_controller.io is not None:
+                        print(robot_controller.io.summary())
+                else:
+                    print(f"Validation finished in {wall_time:.1f} s wall time")
+        
+        # Aufzeichnung abschliessen bzw. Wiedergabe mit Aufzeichnung vergleichen
+        if isinstance(rdk, SessionRecorder):
+            rdk.close()
+        elif isinstance(rdk, SessionReplay):
+            rdk.report(replay_diff)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Automatisierter Jenga-Turmbau")
+    parser.add_argument("--resume", action="store_true", help="Turmbau ab letztem Checkpoint fortsetzen")
+    parser.add_argument("--checkpoint", default="build_checkpoint.json", help="Pfad der Checkpoint-Datei")
+    parser.add_argument("--cycles", type=int, default=None, help="Anzahl Aufbau-/Abbauzyklen (mindestens 1)")
+    parser.add_argument("--endless", action="store_true", help="Endlosschleife im Roboterprogramm erzeugen")
+    parser.add_argument("--export-val3", default=None, help="VAL3-Projekt direkt in dieses Verzeichnis schreiben")
+    parser.add_argument("--optimize", action="store_true", help="Redundante Befehle vor der Ausführung entfernen")
+    parser.add_argument("--mode", choices=("demo", "turbo", "validate"), default="demo", 
+                        help="Ausführungsmodus der Simulation")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Prometheus-Endpunkt auf diesem lokalen Port")
+    parser.add_argument("--metrics-file", default=None, help="Metriken in diese rollierende Datei schreiben")
+    parser.add_argument("--record", default=None, help="RoboDK-Aufrufe in diese Datei aufzeichnen")
+    parser.add_argument("--replay", default=None, help="Aufzeichnung ohne RoboDK wiedergeben und vergleichen")
+    parser.add_argument("--replay-diff", default=None, help="Unterschiede der Wiedergabe in diese Datei schreiben")
+    parser.add_argument("--select-config", action="store_true", 
+                        help="Greiforientierung und Gelenkkonfiguration mit kürzester Bewegung wählen")
+    parser.add_argument("--connections", type=int, default=None, 
+                        help="Anzahl zusätzlicher RoboDK-Verbindungen für parallele IK-Abfragen (mit --select-config)")
+    parser.add_argument("--towers", default=None, help="Kommagetrennte Tower-Frames für den Bau mehrerer Türme")
+    parser.add_argument("--magazines", default=None, help="Kommagetrennte Magazin-Frames")
+    parser.add_argument("--robots", default=None, help="Kommagetrennte Roboter für den gemeinsamen Bau eines Turms")
+    parser.add_argument("--tools", default=None, help="Kommagetrennte Greifer, einer pro Roboter")
+    parser.add_argument("--settle-time", type=float, default=0.0, 
+                        help="Wartezeit in s nach jedem Layer, wird mit Arbeit an anderen Türmen gefüllt")
+    parser.add_argument("--check-time", type=float, default=0.0, 
+                        help="Prüfzeit in s nach jeder Platzierung, wird mit Arbeit an anderen Türmen gefüllt")
+    parser.add_argument("--pick-recovery", action="store_true", help="Fehlgriffe im Magazin automatisch beheben")
+    parser.add_argument("--recovery-program", action="store_true", 
+                        help="Ersatzaufnahme als ifConnection/elseConnection-Block ins Roboterprogramm schreiben")
+    parser.add_argument("--two-stage", action="store_true", 
+                        help="Anfahrt und Rückzug an Kontaktposen schnell mit kurzem langsamen Abschnitt")
+    parser.add_argument("--simulate-io", action="store_true", 
+                        help="RTS-Anschlüsse über ein simuliertes I/O-Modell auswerten")
+    parser.add_argument("--sensor-latency", type=float, default=0.1, help="Antwortzeit des Vakuumsensors in s")
+    parser.add_argument("--trajectory", default=None, help="Roboterbahn in diesen Ringpuffer (Datei) aufzeichnen")
+    parser.add_argument("--trajectory-rate", type=float, default=250, help="Abtastrate der Bahnaufzeichnung in Hz")
+    args = parser.parse_args()
+    
+    main(
+        resume=args.resume, 
+        checkpoint_path=args.checkpoint, 
+        cycles=args.cycles, 
+        endless=args.endless, 
+        export_val3=args.export_val3, 
+        optimize=args.optimize, 
+        mode=args.mode, 
+        metrics_port=args.metrics_port, 
+        metrics_file=args.metrics_file, 
+        record=args.record, 
+        replay=args.replay, 
+        replay_diff=args.replay_diff, 
+        select_config=args.select_config, 
+        towers=args.towers.split(",") if args.towers else None, 
+        magazines=args.magazines.split(",") if args.magazines else None, 
+        settle_time=args.settle_time, 
+        check_time=args.check_time, 
+        pick_recovery=args.pick_recovery, 
+        recovery_program=args.recovery_program, 
+        trajectory=args.trajectory, 
+        trajectory_rate=args.trajectory_rate, 
+        two_stage=args.two_stage, 
+        simulate_io=args.simulate_io, 
+        sensor_latency=args.sensor_latency, 
+        robots=args.robots.split(",") if args.robots else None, 
+        tools=args.tools.split(",") if args.tools else None, 
+        connections=args.connections
+    )
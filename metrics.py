@@ -0,0 +1,217 @@
+# Laufzeitmetriken für den Produktionsbetrieb
+# Latenz-Histogramme pro Bewegungsphase, Zykluszeiten pro Stein/Layer und Fehlerzähler
+# Export im Prometheus-Textformat über lokalen HTTP-Endpunkt und als rollierende Datei
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# Bewegungsphasen eines Pick/Place-Ablaufs
+PHASES = ("approach", "pick", "vacuum", "retract", "transfer", "place", "home")
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+CYCLE_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+class Histogram:
+    """Kumulatives Histogramm mit festen Buckets (Prometheus-Semantik)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Erfasst einen Messwert"""
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels=""):
+        """Zeilen im Prometheus-Textformat, labels z.B. 'phase="pick"'"""
+        sep = "," if labels else ""
+        lines = []
+        for upper, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{upper}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class Metrics:
+    """
+    Sammelt Laufzeitmetriken eines Turmbaus
+
+    Die Zeitmessung erfolgt über `clock` (Standard: Wanduhr). Für beschleunigte
+    Simulation kann z.B. Robolink.SimulationTime übergeben werden. Im IR-Modus
+    (--optimize) werden Bewegungen erst beim Flush ausgeführt, die Phasenzeiten
+    erfassen dann nur die Aufzeichnung, die Zykluszeiten pro Stein bleiben gültig.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.phases = {phase: Histogram(PHASE_BUCKETS) for phase in PHASES}
+        self.piece_cycle = Histogram(CYCLE_BUCKETS)
+        self.layer_cycle = Histogram(CYCLE_BUCKETS)
+        self.failures = {}
+        self.pieces_total = 0
+
+        # Laufender Stein und Layer
+        self.piece_start = None
+        self.layer = None
+        self.layer_start = None
+        self.layer_end = None
+
+        # Export
+        self.server = None
+        self.file_logger = None
+        self.file_interval = 60
+        self.last_file_write = None
+
+    @contextmanager
+    def phase(self, name):
+        """Misst die Dauer einer Phase, Ausnahmen werden als Fehler der Phase gezählt"""
+        start = self.clock()
+        try:
+            yield
+        except Exception:
+            self.record_failure(name)
+            raise
+        duration = self.clock() - start
+        with self.lock:
+            self.phases[name].observe(duration)
+
+    def record_failure(self, kind):
+        """Erhöht den Fehlerzähler einer Phase bzw. Fehlerart"""
+        with self.lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def piece_started(self, layer):
+        """Beginn eines Steins, layer < 0 für Aufgaben ohne Turm-Layer (z.B. Abbau)"""
+        now = self.clock()
+        self.piece_start = now
+        if layer != self.layer:
+            self._close_layer()
+            self.layer = layer
+            self.layer_start = now
+
+    def piece_finished(self):
+        """Abschluss eines Steins: Zykluszeit erfassen und Datei ggf. nachführen"""
+        if self.piece_start is None:
+            return
+        now = self.clock()
+        with self.lock:
+            self.piece_cycle.observe(now - self.piece_start)
+            self.pieces_total += 1
+        self.piece_start = None
+        self.layer_end = now
+        self._write_file()
+
+    def close(self):
+        """Schliesst den laufenden Layer ab, schreibt die Datei und stoppt den Endpunkt"""
+        self._close_layer()
+        self._write_file(force=True)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _close_layer(self):
+        """Erfasst die Zykluszeit des aktuellen Layers (nur Turm-Layer)"""
+        if self.layer is not None and self.layer >= 0 and self.layer_end is not None:
+            with self.lock:
+                self.layer_cycle.observe(self.layer_end - self.layer_start)
+        self.layer = None
+        self.layer_end = None
+
+    def render(self):
+        """Alle Metriken im Prometheus-Textformat"""
+        with self.lock:
+            lines = [
+                "# HELP jenga_phase_duration_seconds Duration of pick/place motion phases",
+                "# TYPE jenga_phase_duration_seconds histogram",
+            ]
+            for name, histogram in self.phases.items():
+                lines += histogram.render("jenga_phase_duration_seconds", f'phase="{name}"')
+
+            lines += [
+                "# HELP jenga_piece_cycle_seconds Cycle time per piece from pick start to place end",
+                "# TYPE jenga_piece_cycle_seconds histogram",
+            ]
+            lines += self.piece_cycle.render("jenga_piece_cycle_seconds")
+
+            lines += [
+                "# HELP jenga_layer_cycle_seconds Cycle time per completed tower layer",
+                "# TYPE jenga_layer_cycle_seconds histogram",
+            ]
+            lines += self.layer_cycle.render("jenga_layer_cycle_seconds")
+
+            lines += [
+                "# HELP jenga_pieces_total Pieces moved",
+                "# TYPE jenga_pieces_total counter",
+                f"jenga_pieces_total {self.pieces_total}",
+                "# HELP jenga_failures_total Failures per phase or kind",
+                "# TYPE jenga_failures_total counter",
+            ]
+            for kind, count in sorted(self.failures.items()):
+                lines.append(f'jenga_failures_total{{kind="{kind}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """Startet den lokalen HTTP-Endpunkt /metrics in einem Hintergrund-Thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keine Zugriffsausgaben auf der Konsole
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print(f"Metrics endpoint on http://{host}:{self.server.server_port}/metrics")
+
+    def write_to(self, path, interval=60, max_bytes=10 * 1024 * 1024, backups=5):
+        """Schreibt Momentaufnahmen höchstens alle `interval` Sekunden in eine rollierende Datei"""
+        logger = logging.getLogger(f"jenga.metrics.{path}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("# snapshot %(asctime)s\n%(message)s"))
+        logger.addHandler(handler)
+
+        self.file_logger = logger
+        self.file_interval = interval
+
+    def _write_file(self, force=False):
+        """Momentaufnahme in die Datei, zeitlich gedrosselt (Wanduhr)"""
+        if self.file_logger is None:
+            return
+        now = time.monotonic()
+        if not force and self.last_file_write is not None and now - self.last_file_write < self.file_interval:
+            return
+        self.last_file_write = now
+        self.file_logger.info(self.render())
@@ -0,0 +1,276 @@
+# Koordination mehrerer Roboter an einem gemeinsamen Turm
+# Jeder Roboter arbeitet aus seinem eigenen Magazin, der Bereich um den Turm wird über eine
+# Zonenreservierung verriegelt (RTS-Handshake Anfrage/Freigabe auf den realen Steuerungen)
+
+import math
+
+import numpy as np
+from robodk.robomath import transl, invH
+
+from jenga_piece_collection import PIECES_PER_LAYER
+from tasks import Task, BUILD
+
+
+class ZoneInterlock:
+    """
+    Gemeinsamer Arbeitsraum um den Frame einer Station (z.B. Turm), den höchstens ein Roboter belegt
+
+    Im Roboterprogramm setzt jeder Roboter vor dem Einfahren die Anfrage `request` und wartet auf
+    die Freigabe `grant` durch die Zellensteuerung, nach dem Verlassen wird die Anfrage zurückgesetzt.
+    In der Simulation laufen die Roboter nacheinander in der Reihenfolge der Reservierungen, die
+    Zone prüft dabei, dass sie nie von zwei Robotern gleichzeitig belegt wird. Mit simuliertem
+    I/O-Modell (RobotController.use_simulated_io) folgt die Freigabe direkt der Anfrage.
+    """
+
+    def __init__(self, frame, request="dZoneRequest", grant="dZoneGranted",
+                 request_link="98FE10BA-0446-4B8A-A8CF-35B98F42725C",
+                 grant_link="98FE10BA-0446-4B8A-A8CF-35B98F42725D", timeout=-1):
+        self.frame = frame
+        self.request = request
+        self.grant = grant
+        self.request_link = request_link
+        self.grant_link = grant_link
+        self.timeout = timeout
+
+        # Aktuell belegender Roboter und Anzahl Reservierungen
+        self.owner = None
+        self.entries = 0
+
+        # Gemessene Belegungsdauer pro Reservierung in s (Simulationszeit inkl. simulierter I/O-Wartezeiten)
+        self.entered_at = None
+        self.busy_times = []
+
+    def register(self, controller):
+        """Legt die Handshake-Anschlüsse auf der Steuerung eines Roboters an"""
+        controller.rts.addConnection(self.request, self.request_link, 'dio')
+        controller.rts.addConnection(self.grant, self.grant_link, 'dio')
+        if controller.io is not None:
+            controller.io.respond(self.request, self.grant, 0)
+
+    def covers(self, frame):
+        """Station liegt in der Zone"""
+        return frame is not None and frame == self.frame
+
+    def enter(self, controller):
+        """Reserviert die Zone: Anfrage setzen und auf Freigabe warten"""
+        if self.owner is not None and self.owner is not controller:
+            raise Exception(f"Zone at {self.frame.Name()} is already reserved by {self.owner.robot.Name()}")
+        controller.rts.setOutput(self.request, 1)
+        controller.rts.waitConnection(self.grant, 1, self.timeout)
+        self.owner = controller
+        self.entries += 1
+        self.entered_at = _clock(controller)
+
+    def leave(self, controller):
+        """Gibt die Zone nach dem Rückzug wieder frei"""
+        controller.rts.setOutput(self.request, 0)
+        if self.owner is controller:
+            self.owner = None
+            self.busy_times.append(_clock(controller) - self.entered_at)
+
+
+class MultiRobotCoordinator:
+    """
+    Mehrere Roboter bauen gemeinsam einen Turm, jeder aus seinem eigenen Magazin
+
+    `robots` ist eine Liste von Paaren (RobotController, Magazin). Die Turmplätze werden Layer für
+    Layer dem Roboter mit dem kürzesten Weg Magazin -> Turmplatz zugeteilt, dabei erhält jeder Roboter
+    höchstens ceil(3 / Anzahl Roboter) Plätze pro Layer. Jedes Magazin wird in der Reihenfolge seiner
+    Turmplätze bestückt (Magazinplatz k = k-ter Stein des Roboters, siehe load_magazines).
+
+    Auf einer modellierten Zeitachse besteht jede Aufgabe aus einem Teil ausserhalb der Zone
+    (`pick_time` plus Hin- und Rückweg / `travel_speed`) und einem Teil in der Zone (`zone_time`:
+    Anfahrt, Ablage, Rückzug). Die Zone wird innerhalb eines Layers an den zuerst bereiten Roboter
+    vergeben, der nächste Layer erst nach dem vollständigen darunterliegenden. `pick_time` und
+    `zone_time` sind Annahmen, bis sie über calibrate(...) aus der Simulation übernommen werden.
+
+    Iteration liefert Paare (RobotController, Aufgabe) in der Reihenfolge der Reservierungen.
+    """
+
+    def __init__(self, robots, tower, pieces, zone=None, pick_time=5.0, zone_time=3.0, travel_speed=250.0):
+        self.robots = list(robots)
+        self.tower = tower
+        self.pieces = list(pieces)
+        self.zone = zone
+        self.pick_time = pick_time
+        self.zone_time = zone_time
+        self.travel_speed = travel_speed
+
+        # Anzahl gemessener Aufgaben, aus denen pick_time und zone_time stammen (0 = Annahmen)
+        self.calibrated = 0
+
+        # Turmziele und Magazinplätze einmalig über den Transformationskern bestimmen
+        slots = np.arange(1, len(self.pieces) + 1)
+        self.target_positions = tower.get_placement_pose_arrays(self.pieces[0], slots)[1][:, :3, 3]
+        self.pick_positions = [magazine.get_pick_pose_arrays(np.arange(1, magazine.capacity + 1))[1][:, :3, 3]
+                               for _, magazine in self.robots]
+
+        self.assignment = self.assign_slots(len(self.robots))
+        self.schedule, self.makespan, self.zone_busy = self._timeline(self.assignment)
+
+        # Zonenverriegelung auf allen Steuerungen einrichten
+        if self.zone is not None:
+            for controller, _ in self.robots:
+                controller.use_zone_interlock(self.zone)
+
+    def assign_slots(self, count):
+        """
+        Teilt die Turmplätze den ersten `count` Robotern zu
+        Rückgabe: Liste pro Roboter mit den Turmplätzen (1-basiert) in Bauabfolge
+        """
+        layer_limit = math.ceil(PIECES_PER_LAYER / count)
+        assignment = [[] for _ in range(count)]
+        for layer_start in range(0, len(self.pieces), PIECES_PER_LAYER):
+            layer_slots = range(layer_start + 1, min(layer_start + PIECES_PER_LAYER, len(self.pieces)) + 1)
+            in_layer = [0] * count
+            for slot in layer_slots:
+                best = None
+                for robot in range(count):
+                    magazine = self.robots[robot][1]
+                    if in_layer[robot] >= layer_limit or len(assignment[robot]) >= magazine.capacity:
+                        continue
+                    distance = self._travel(robot, len(assignment[robot]) + 1, slot)
+                    if best is None or distance < best[0]:
+                        best = (distance, robot)
+                if best is None:
+                    raise Exception(f"No robot with free magazine slots left for tower slot {slot}")
+                assignment[best[1]].append(slot)
+                in_layer[best[1]] += 1
+        return assignment
+
+    def _travel(self, robot, magazine_slot, slot):
+        """Weg Magazinplatz -> Turmplatz in mm"""
+        return float(np.linalg.norm(self.target_positions[slot - 1] - self.pick_positions[robot][magazine_slot - 1]))
+
+    def _outside_time(self, robot, magazine_slot, slot):
+        """Dauer ausserhalb der Zone: Aufnahme sowie Hin- und Rückweg"""
+        return self.pick_time + 2 * self._travel(robot, magazine_slot, slot) / self.travel_speed
+
+    def _timeline(self, assignment):
+        """
+        Simulierte Zeitachse der Zonenreservierungen
+        Rückgabe: (Liste (Start, Roboter, Turmplatz, Magazinplatz), Gesamtdauer, Belegungszeit der Zone)
+        """
+        queues = [list(slots) for slots in assignment]
+        taken = [0] * len(assignment)
+        ready = [self._outside_time(r, 1, queue[0]) if queue else 0.0 for r, queue in enumerate(queues)]
+        zone_free = 0.0
+        schedule = []
+
+        for layer_start in range(0, len(self.pieces), PIECES_PER_LAYER):
+            layer_end = layer_start + PIECES_PER_LAYER
+            while True:
+                # Roboter, deren nächster Platz in diesem Layer liegt, in der Reihenfolge ihrer Bereitschaft
+                waiting = [r for r, queue in enumerate(queues) if queue and layer_start < queue[0] <= layer_end]
+                if not waiting:
+                    break
+                robot = min(waiting, key=lambda r: ready[r])
+                slot = queues[robot].pop(0)
+                taken[robot] += 1
+
+                start = max(ready[robot], zone_free)
+                zone_free = start + self.zone_time
+                schedule.append((start, robot, slot, taken[robot]))
+
+                # Nächste Aufnahme beginnt nach dem Verlassen der Zone
+                if queues[robot]:
+                    ready[robot] = zone_free + self._outside_time(robot, taken[robot] + 1, queues[robot][0])
+
+        return schedule, zone_free, self.zone_time * len(schedule)
+
+    def __iter__(self):
+        for _, robot, slot, magazine_slot in self.schedule:
+            controller, magazine = self.robots[robot]
+            piece = self.pieces[slot - 1]
+
+            source_above, source = magazine.get_pick_pose(magazine_slot)
+            target_above, target = self.tower.get_placement_pose(piece, slot=slot)
+            yield controller, Task(
+                BUILD, piece, source_above, source, magazine.frame, target_above, target, self.tower.frame, 0, slot - 1
+            )
+
+    def load_magazines(self):
+        """
+        Bestückt die Magazine nach dem Plan und führt das Belegungsmodell nach (falls angelegt)
+        Jeder Stein liegt zu Beginn auf seinem Platz im ersten Magazin (Platz = Steinnummer) und wird mit
+        unverändertem Versatz zu diesem Platz auf seinen Platz im Magazin seines Roboters gesetzt.
+        """
+        source = self.robots[0][1]
+        source_pose = source.frame.PoseAbs()
+        for (_, magazine), slots in zip(self.robots, self.assignment):
+            loading = {k: self.pieces[slot - 1] for k, slot in enumerate(slots, start=1)}
+            for magazine_slot, piece in loading.items():
+                # Lage des Steins relativ zu seinem bisherigen Platz
+                x, y = source.get_slot_position(piece.number)
+                offset = invH(source_pose * transl(x, y, 0)) * piece.piece.PoseAbs()
+                
+                x, y = magazine.get_slot_position(magazine_slot)
+                piece.piece.setParent(magazine.frame)
+                piece.piece.setPose(transl(x, y, 0) * offset)
+            
+            if magazine.frame_pose_inv is not None:
+                magazine.slot_pieces = dict(loading)
+            numbers = [piece.number for piece in loading.values()]
+            print(f"Load {magazine.frame.Name()} with pieces {numbers}")
+
+    def calibrate(self, task_times):
+        """
+        Übernimmt pick_time und zone_time aus gemessenen Aufgaben (Dauer in s, Reihenfolge der Iteration)
+        zone_time ist die mittlere Belegung der Zone, pick_time der mittlere Rest abzüglich des modellierten
+        Hin- und Rückwegs. Ohne Zone oder ohne Simulationszeit (validate) bleiben die Annahmen bestehen.
+        """
+        zone_times = self.zone.busy_times[-len(task_times):] if self.zone is not None and task_times else []
+        if len(zone_times) != len(task_times) or not task_times or min(task_times) <= 0:
+            return False
+
+        outside = [
+            total - zone - 2 * self._travel(robot, magazine_slot, slot) / self.travel_speed
+            for total, zone, (_, robot, slot, magazine_slot) in zip(task_times, zone_times, self.schedule)
+        ]
+        self.zone_time = float(np.mean(zone_times))
+        self.pick_time = max(float(np.mean(outside)), 0.0)
+        self.calibrated = len(task_times)
+        self.schedule, self.makespan, self.zone_busy = self._timeline(self.assignment)
+        return True
+
+    def scaling_report(self):
+        """Modellierte Durchsatzsteigerung mit 1 bis n Robotern (Liste der Zeilen, erste Zeile: Herkunft der Zeiten)"""
+        if self.calibrated:
+            lines = [f"Scaling model calibrated from {self.calibrated} simulated tasks: pick {self.pick_time:.1f} s, "
+                     f"zone {self.zone_time:.1f} s (travel {self.travel_speed:g} mm/s assumed)"]
+        else:
+            lines = [f"Scaling model from assumed times, not measured: pick {self.pick_time:.1f} s, "
+                     f"zone {self.zone_time:.1f} s, travel {self.travel_speed:g} mm/s"]
+        single = None
+        for count in range(1, len(self.robots) + 1):
+            _, makespan, zone_busy = self._timeline(self.assign_slots(count))
+            single = makespan if single is None else single
+            throughput = len(self.pieces) / makespan * 3600
+            lines.append(f"{count} robot(s): {makespan:6.1f} s, {throughput:6.1f} pieces/h, "
+                         f"speedup {single / makespan:.2f}x, zone busy {zone_busy / makespan:.0%}")
+        return lines
+
+
+def run_coordinated(coordinator, speed=10):
+    """Führt alle Aufgaben in der Reihenfolge der Zonenreservierungen aus und meldet die Skalierung"""
+    coordinator.load_magazines()
+    task_times = []
+    for controller, task in coordinator:
+        start = _clock(controller)
+        controller.execute_task(task, speed)
+        task_times.append(_clock(controller) - start)
+    for controller, _ in coordinator.robots:
+        controller.move_to_home()
+
+    # Roboter laufen in der Simulation nacheinander: gemessene Zeiten in das Zeitmodell übernehmen
+    coordinator.calibrate(task_times)
+    print(f"Coordinated {len(task_times)} tasks on {len(coordinator.robots)} robots: "
+          f"modelled time {coordinator.makespan:.1f} s, zone busy {coordinator.zone_busy:.1f} s")
+    for line in coordinator.scaling_report():
+        print(line)
+    return len(task_times)
+
+
+def _clock(controller):
+    """Simulationszeit einer Steuerung, mit simuliertem I/O-Modell inkl. Wartezeiten"""
+    return controller.io.now() if controller.io is not None else controller.rdk.SimulationTime()
@@ -0,0 +1,137 @@
+# Verschränkte Ablaufplanung für mehrere Türme mit einem Roboter
+# Verteilt Steine aus einem oder mehreren Magazinen auf mehrere Tower-Frames, minimiert die
+# Verfahrwege und nutzt Wartezeiten eines Turms (Layer setzen lassen, Prüfung) für andere Türme
+
+import numpy as np
+
+from jenga_piece_collection import PIECES_PER_LAYER
+from tasks import Task, BUILD
+
+
+class MultiTowerScheduler:
+    """
+    Plant Aufbauaufgaben für mehrere Türme auf einer simulierten Zeitachse
+
+    Nach jeder Platzierung ist der Turm für `check_time` Sekunden gesperrt, nach jedem
+    vollständigen Layer für `settle_time` Sekunden. In dieser Zeit arbeitet der Roboter an
+    einem anderen Turm. Unter den bereiten Türmen wird die Aufgabe mit dem kürzesten Weg
+    (letzte Ablage -> Magazinplatz -> Turmplatz) gewählt, der Magazinplatz jeweils als
+    nächstgelegener belegter Platz. Die Dauer einer Aufgabe wird mit `task_time` plus
+    Verfahrweg / `travel_speed` abgeschätzt.
+
+    Iteration liefert Paare (wait, task): wait ist die Wartezeit in Sekunden vor der Aufgabe.
+    """
+
+    def __init__(self, pieces, magazines, towers, pieces_per_tower=None, settle_time=0.0, check_time=0.0,
+                 task_time=8.0, travel_speed=250.0):
+        self.magazines = list(magazines)
+        self.towers = list(towers)
+        self.settle_time = settle_time
+        self.check_time = check_time
+        self.task_time = task_time
+        self.travel_speed = travel_speed
+
+        # Magazinbestand: (Magazin, Platz) -> Stein, reihum nach Platznummer auf alle Magazine verteilt
+        self.stock = {}
+        pieces = list(pieces)
+        self.reference_piece = pieces[0]
+        for slot in range(1, max(magazine.capacity for magazine in self.magazines) + 1):
+            for magazine in self.magazines:
+                if pieces and slot <= magazine.capacity:
+                    self.stock[(magazine, slot)] = pieces.pop(0)
+
+        # Aufnahmepositionen einmalig bestimmen (Wegberechnung ohne RoboDK-Aufrufe)
+        self.pick_positions = {
+            (magazine, slot): np.array(magazine.get_pick_pose(slot)[1].Pos()) for magazine, slot in self.stock
+        }
+
+        # Gleichmässige Verteilung auf die Türme in ganzen Layern
+        if pieces_per_tower is None:
+            pieces_per_tower = len(self.stock) // len(self.towers) // PIECES_PER_LAYER * PIECES_PER_LAYER
+        if pieces_per_tower < PIECES_PER_LAYER:
+            raise Exception(f"Not enough pieces for {len(self.towers)} towers, each tower needs at least one layer")
+        if pieces_per_tower * len(self.towers) > len(self.stock):
+            raise Exception(f"Not enough pieces for {len(self.towers)} towers of {pieces_per_tower} pieces")
+        self.pieces_per_tower = pieces_per_tower
+
+        # Zustand pro Turm: Anzahl platzierter Steine und Zeitpunkt, ab dem wieder platziert werden kann
+        self.placed = {tower: 0 for tower in self.towers}
+        self.ready = {tower: 0.0 for tower in self.towers}
+
+        # Simulierte Zeitachse
+        self.clock = 0.0
+        self.idle = 0.0
+        self.position = None
+
+    def __iter__(self):
+        while True:
+            step = self._next()
+            if step is None:
+                return
+            yield step
+
+    def _next(self):
+        """Wählt die nächste Aufgabe und führt Modell und Zeitachse nach"""
+        open_towers = [tower for tower in self.towers if self.placed[tower] < self.pieces_per_tower]
+        if not open_towers:
+            return None
+
+        best = None
+        for tower in open_towers:
+            slot = self.placed[tower] + 1
+            wait = max(0.0, self.ready[tower] - self.clock)
+
+            # Zielpose hängt nur von Turmplatz und Steingeometrie ab
+            _, target = tower.get_placement_pose(self.reference_piece, slot=slot)
+            target_position = np.array(target.Pos())
+
+            key, travel = self._nearest_stock(target_position)
+            cost = (wait, travel)
+            if best is None or cost < best[0]:
+                best = (cost, tower, slot, key, target_position)
+
+        (wait, travel), tower, slot, key, target_position = best
+        magazine, magazine_slot = key
+        piece = self.stock.pop(key)
+
+        source_above, source = magazine.get_pick_pose(magazine_slot)
+        target_above, target = tower.get_placement_pose(piece, slot=slot)
+
+        # Zeitachse: Warten, Ausführung, Sperrzeit des Turms
+        self.idle += wait
+        self.clock += wait + self.task_time + travel / self.travel_speed
+        self.placed[tower] += 1
+        self.ready[tower] = self.clock + self.check_time
+        if self.placed[tower] % PIECES_PER_LAYER == 0:
+            self.ready[tower] = self.clock + self.settle_time
+        self.position = target_position
+
+        return wait, Task(
+            BUILD, piece, source_above, source, magazine.frame, target_above, target, tower.frame, 0, slot - 1
+        )
+
+    def _nearest_stock(self, target_position):
+        """Belegter Magazinplatz mit kürzestem Weg letzte Ablage -> Platz -> Ziel"""
+        best = None
+        for key in self.stock:
+            pick_position = self.pick_positions[key]
+            travel = np.linalg.norm(target_position - pick_position)
+            if self.position is not None:
+                travel += np.linalg.norm(pick_position - self.position)
+            if best is None or travel < best[1]:
+                best = (key, travel)
+        return best
+
+
+def run_schedule(robot_controller, scheduler, speed=10):
+    """Führt alle geplanten Aufgaben aus, Wartezeiten werden als Pause ins Programm übernommen"""
+    count = 0
+    for wait, task in scheduler:
+        if wait > 0:
+            robot_controller.robot.Pause(wait * 1000)
+        robot_controller.execute_task(task, speed)
+        count += 1
+
+    print(f"Scheduled {count} tasks on {len(scheduler.towers)} towers: "
+          f"modelled time {scheduler.clock:.1f} s, idle {scheduler.idle:.1f} s")
+    return count
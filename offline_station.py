@@ -0,0 +1,37 @@
+# Station ohne RoboDK für reine Posenberechnungen (Benchmarks, Toleranzanalyse)
+# Liefert Items mit fester Pose, damit Tower, Magazine und JengaPieceCollection unverändert nutzbar sind
+
+from robodk.robomath import eye
+
+
+class OfflineItem:
+    """Item mit fester Pose relativ zum Parent"""
+
+    def __init__(self, name, pose):
+        self.name = name
+        self.pose = pose
+
+    def Valid(self):
+        return True
+
+    def Name(self):
+        return self.name
+
+    def Pose(self):
+        return self.pose
+
+
+class OfflineStation:
+    """
+    Ersatz für Robolink bei Berechnungen ohne Simulation
+    `poses` legt die Posen einzelner Items fest (Name -> Mat), alle anderen liegen im Ursprung.
+    """
+
+    def __init__(self, poses=None):
+        self.poses = dict(poses or {})
+        self.items = {}
+
+    def Item(self, name, *args):
+        if name not in self.items:
+            self.items[name] = OfflineItem(name, self.poses.get(name, eye(4)))
+        return self.items[name]
@@ -0,0 +1,363 @@
+# Zwischendarstellung (IR) für Bewegungs- und RTS-Befehle mit Peephole-Optimierung
+# Befehle werden zuerst aufgezeichnet, optimiert und validiert und erst dann an RoboDK oder einen Export übergeben
+
+import ast
+from collections import namedtuple
+
+from robodk.robomath import Mat
+
+# Einzelner Befehl: op = Befehlsname, args = Argumente, source = Originaltext (nur RTS-Befehle)
+Instruction = namedtuple("Instruction", ["op", "args", "source"], defaults=[(), None])
+
+# Roboterbefehle
+MOVEJ = "MoveJ"
+MOVEL = "MoveL"
+SPEED = "setSpeed"
+PAUSE = "Pause"
+SET_JOINTS = "setJoints"
+SET_FRAME = "setPoseFrame"
+SET_TOOL = "setPoseTool"
+
+# Simulationsbefehle (nur RoboDK, nicht im Roboterprogramm)
+ATTACH = "AttachClosest"
+DETACH = "DetachAll"
+CALL = "call"
+
+# RTS-Kontrollstrukturen: öffnende Befehle -> (Blocktyp, zugehöriger Abschluss)
+BLOCK_OPEN = {
+    "ifConnection": ("ifConnection", "endIfConnection"),
+    "ifConfirm": ("ifConfirm", "endIfConfirmCount"),
+    "whileConnection": ("while", "endWhileConnection"),
+    "whileEndless": ("while", "endWhileEndless"),
+}
+BLOCK_MIDDLE = {
+    "elseIfConnection": "ifConnection",
+    "elseConnection": "ifConnection",
+    "elseConfirm": "ifConfirm",
+}
+BLOCK_CLOSE = {"endIfConnection", "endIfConfirmCount", "endWhileConnection", "endWhileEndless"}
+
+# Befehle, nach welchen der bekannte Roboter- und I/O-Zustand nicht mehr gilt
+BARRIERS = (
+    set(BLOCK_OPEN) | set(BLOCK_MIDDLE) | BLOCK_CLOSE |
+    {"waitConnection", "boxAlert", PAUSE, SET_JOINTS, SET_FRAME, SET_TOOL}
+)
+
+# Felder von robot.setSpeed(...) und die Bewegungsart, welche sie beeinflussen
+SPEED_FIELDS = (("speed_linear", MOVEL), ("speed_joints", MOVEJ), ("accel_linear", MOVEL), ("accel_joints", MOVEJ))
+
+
+class ProgramIR:
+    """Zeichnet Befehle auf und gibt sie blockweise optimiert an die Backends weiter"""
+
+    def __init__(self, optimize=True):
+        self.instructions = []
+        self.optimizer = PeepholeOptimizer() if optimize else None
+        self.validator = NestingValidator()
+
+        # Statistik über aufgezeichnete und effektiv ausgeführte Befehle
+        self.recorded = 0
+        self.emitted = 0
+
+    def record(self, op, *args, source=None):
+        self.instructions.append(Instruction(op, args, source))
+        self.recorded += 1
+
+    def record_code(self, code):
+        """Zeichnet einen RTS-Befehl (RunCode-Text) als strukturierten Befehl auf"""
+        call = ast.parse(code.strip(), mode="eval").body
+        args = tuple(ast.literal_eval(arg) for arg in call.args)
+        self.record(call.func.id, *args, source=code)
+
+    def defer(self, function, *args):
+        """Zeichnet einen reinen Simulationsaufruf auf (z.B. JengaPiece.attach_to_frame)"""
+        self.record(CALL, function, *args)
+
+    def flush(self, backends, final=False):
+        """Optimiert, validiert und führt alle aufgezeichneten Befehle auf den Backends aus"""
+        instructions, self.instructions = self.instructions, []
+        if self.optimizer is not None:
+            instructions = self.optimizer.feed(instructions)
+            if final:
+                instructions += self.optimizer.finish()
+
+        for instruction in instructions:
+            self.validator.check(instruction)
+            for backend in backends:
+                backend.execute(instruction)
+        self.emitted += len(instructions)
+
+        if final:
+            self.validator.finish()
+
+    # ----------- Proxies für RoboDK-Objekte ----------- #
+
+    def robot_proxy(self, robot):
+        return _RecordingRobot(self, robot)
+
+    def link_proxy(self, rdk):
+        return _RecordingLink(self, rdk)
+
+    def gripper_proxy(self, gripper):
+        return _RecordingGripper(self, gripper)
+
+    def item_proxy(self, item):
+        return _RecordingItem(self, item)
+
+
+class PeepholeOptimizer:
+    """
+    Entfernt redundante Befehle im Befehlsstrom
+
+    - Geschwindigkeitsänderungen werden erst vor der nächsten betroffenen Bewegung ausgegeben,
+      überschriebene und unveränderte Werte entfallen
+    - Bewegungen auf das zuletzt angefahrene Ziel entfallen (z.B. Home -> Home zwischen zwei Steinen)
+    - Ausgänge, welche bereits auf dem gesetzten Wert stehen, entfallen
+
+    Der Zustand bleibt über mehrere feed()-Aufrufe erhalten, damit auch über Blockgrenzen optimiert wird.
+    An Kontrollstrukturen und Wartebefehlen wird der bekannte Zustand verworfen.
+    """
+
+    def __init__(self):
+        self.speed = {}          # Aktiv ausgegebene Geschwindigkeitsfelder
+        self.pending = {}        # Noch nicht ausgegebene Geschwindigkeitsfelder
+        self.last_target = None  # (Bewegungsart, Ziel) der letzten Bewegung
+        self.outputs = {}        # Bekannter Wert pro Ausgang
+
+    def feed(self, instructions):
+        result = []
+        for instruction in instructions:
+            op = instruction.op
+
+            if op == SPEED:
+                for (field, _), value in zip(SPEED_FIELDS, instruction.args):
+                    if value != -1:
+                        self.pending[field] = value
+                continue
+
+            if op in (MOVEJ, MOVEL):
+                if self._same_target(op, instruction.args[0]):
+                    continue
+                result += self._flush_speed(op)
+                self.last_target = (op, instruction.args[0])
+                result.append(instruction)
+                continue
+
+            if op == "setOutput":
+                name, value = instruction.args
+                if self.outputs.get(name) == str(value):
+                    continue
+                self.outputs[name] = str(value)
+                result.append(instruction)
+                continue
+
+            if op in BARRIERS:
+                result += self._flush_speed(None)
+                self.speed = {}
+                self.last_target = None
+                self.outputs = {}
+
+            result.append(instruction)
+        return result
+
+    def finish(self):
+        """Am Programmende nicht mehr benötigte Geschwindigkeitsänderungen verwerfen"""
+        self.pending = {}
+        return []
+
+    def _flush_speed(self, move_op):
+        """Gibt ausstehende Geschwindigkeitsfelder aus, welche die Bewegungsart betreffen (None = alle)"""
+        args = []
+        changed = False
+        for field, affects in SPEED_FIELDS:
+            value = -1
+            if field in self.pending and (move_op is None or affects == move_op):
+                value = self.pending.pop(field)
+                if self.speed.get(field) != value:
+                    self.speed[field] = value
+                    changed = True
+                else:
+                    value = -1
+            args.append(value)
+        return [Instruction(SPEED, tuple(args))] if changed else []
+
+    def _same_target(self, op, target):
+        if self.last_target is None:
+            return False
+        last_op, last = self.last_target
+        if isinstance(target, Mat) and isinstance(last, Mat):
+            return _close(target.rows, last.rows)
+        if not isinstance(target, Mat) and not isinstance(last, Mat) and op == last_op:
+            return _close(list(target), list(last))
+        return False
+
+
+class NestingValidator:
+    """Prüft die korrekte Verschachtelung der RTS-Kontrollstrukturen"""
+
+    def __init__(self):
+        self.stack = []
+
+    def check(self, instruction):
+        op = instruction.op
+        if op in BLOCK_OPEN:
+            kind, closer = BLOCK_OPEN[op]
+            name = instruction.args[-1] if kind == "while" else None
+            self.stack.append((kind, closer, name))
+        elif op in BLOCK_MIDDLE:
+            if not self.stack or self.stack[-1][0] != BLOCK_MIDDLE[op]:
+                raise Exception(f"{op} outside of {BLOCK_MIDDLE[op]} block")
+        elif op in BLOCK_CLOSE:
+            if not self.stack:
+                raise Exception(f"{op} without open block")
+            kind, closer, name = self.stack[-1]
+            if op != closer or (name is not None and instruction.args[-1] != name):
+                raise Exception(f"{op} does not close innermost block {kind} {name or ''}".rstrip())
+            self.stack.pop()
+
+    def finish(self):
+        if self.stack:
+            raise Exception("Unclosed blocks in robot program: %s" % ", ".join(k for k, _, _ in self.stack))
+
+
+class RoboDKBackend:
+    """Führt IR-Befehle über die RoboDK-API aus (Simulation bzw. Postprozessor)"""
+
+    def __init__(self, robot, rdk, gripper):
+        self.robot = robot
+        self.rdk = rdk
+        self.gripper = gripper
+
+    def execute(self, instruction):
+        op, args = instruction.op, instruction.args
+        if op == ATTACH:
+            self.gripper.AttachClosest()
+        elif op == DETACH:
+            self.gripper.DetachAll()
+        elif op == CALL:
+            args[0](*args[1:])
+        elif instruction.source is not None:
+            self.rdk.RunCode(instruction.source)
+        else:
+            getattr(self.robot, op)(*args)
+
+
+class Val3Backend:
+    """Schreibt IR-Befehle in einen Val3Writer (Simulationsbefehle werden übersprungen)"""
+
+    def __init__(self, writer, robot):
+        self.writer = writer
+        self.robot = robot
+
+    def execute(self, instruction):
+        op, args = instruction.op, instruction.args
+        if op == MOVEJ:
+            self.writer.move_joints(args[0])
+        elif op == MOVEL:
+            self.writer.move_linear(args[0])
+        elif op == SPEED:
+            self.writer.set_speed(*args)
+        elif op == PAUSE:
+            self.writer.pause(max(args[0], 0))
+        elif op == SET_FRAME:
+            # Referenz wurde im RoboDK-Backend bereits gesetzt
+            self.writer.set_reference(self.robot.PoseFrame())
+        elif op == SET_TOOL:
+            self.writer.set_tool(self.robot.PoseTool())
+        elif instruction.source is not None:
+            self.writer.run_code(instruction.source)
+
+
+class _RecordingRobot:
+    """Ersetzt das Roboter-Item: Befehle werden aufgezeichnet, Abfragen direkt weitergeleitet"""
+
+    def __init__(self, program, robot):
+        self._program = program
+        self._robot = robot
+
+    def __getattr__(self, name):
+        return getattr(self._robot, name)
+
+    def MoveJ(self, target, blocking=True):
+        self._program.record(MOVEJ, target)
+
+    def MoveL(self, target, blocking=True):
+        self._program.record(MOVEL, target)
+
+    def setSpeed(self, speed_linear, speed_joints=-1, accel_linear=-1, accel_joints=-1):
+        self._program.record(SPEED, speed_linear, speed_joints, accel_linear, accel_joints)
+
+    def Pause(self, time_ms=-1):
+        self._program.record(PAUSE, time_ms)
+
+    def setJoints(self, joints):
+        self._program.record(SET_JOINTS, joints)
+
+    def setPoseFrame(self, frame):
+        self._program.record(SET_FRAME, frame)
+
+    def setPoseTool(self, tool):
+        self._program.record(SET_TOOL, tool)
+
+
+class _RecordingLink:
+    """Ersetzt Robolink für die RTS-Klasse: RunCode-Befehle werden aufgezeichnet"""
+
+    def __init__(self, program, rdk):
+        self._program = program
+        self._rdk = rdk
+
+    def __getattr__(self, name):
+        return getattr(self._rdk, name)
+
+    def RunCode(self, code, code_is_fcn_call=False):
+        self._program.record_code(code)
+
+
+class _RecordingGripper:
+    """Ersetzt das Greifer-Item für die RTS-Klasse: Anhängen und Lösen werden aufgezeichnet"""
+
+    def __init__(self, program, gripper):
+        self._program = program
+        self._gripper = gripper
+
+    def __getattr__(self, name):
+        return getattr(self._gripper, name)
+
+    def AttachClosest(self, *args, **kwargs):
+        self._program.record(ATTACH)
+
+    def DetachAll(self, *args, **kwargs):
+        self._program.record(DETACH)
+
+
+class _RecordingItem:
+    """Ersetzt ein Objekt-Item (z.B. Jenga-Stein): Umhängen wird in der Befehlsreihenfolge aufgezeichnet"""
+
+    def __init__(self, program, item):
+        self._program = program
+        self._item = item
+
+    def __getattr__(self, name):
+        return getattr(self._item, name)
+
+    def __bool__(self):
+        return True
+
+    def setParentStatic(self, parent):
+        self._program.defer(self._item.setParentStatic, _unwrap(parent))
+
+
+def _unwrap(obj):
+    """Liefert das RoboDK-Objekt hinter einem Aufzeichnungs-Proxy"""
+    for name in ("_item", "_gripper", "_robot", "_rdk"):
+        if name in getattr(obj, "__dict__", {}):
+            return obj.__dict__[name]
+    return obj
+
+
+def _close(a, b, tolerance=1e-6):
+    """Vergleicht zwei (verschachtelte) Zahlenlisten elementweise"""
+    flat_a = [v for row in a for v in (row if isinstance(row, list) else [row])]
+    flat_b = [v for row in b for v in (row if isinstance(row, list) else [row])]
+    return len(flat_a) == len(flat_b) and all(abs(x - y) <= tolerance for x, y in zip(flat_a, flat_b))
@@ -1,34 +1,106 @@
 # Robotersteuerung für Staubli TX2-40 mit RTS-System
 # Verwaltet Bewegungsabläufe, Greifer-Funktionen und Koordinatentransformationen
 
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from robodk.robolink import RUNMODE_SIMULATE, RUNMODE_QUICKVALIDATE
+from robodk.robomath import pi
+
 from RTS import RTS
+from jenga_piece_collection import IN_MAGAZINE, HELD, PLACED, PIECES_PER_LAYER
+from tasks import CLEAR
+from val3_writer import Val3RobotTee, Val3LinkTee
+from program_ir import ProgramIR, RoboDKBackend, Val3Backend
+from configuration_selector import ConfigurationSelector
+from trajectory_recorder import TrajectoryRecorder
+from transforms import to_array, to_mat, to_mats, offset_towards
+from io_model import SimulatedIO, IOLinkTee
+
+# Ausführungsmodi der Simulation
+RUN_MODES = ("demo", "turbo", "validate")
+
 
 class RobotController:
     """Zentrale Robotersteuerung für Bewegungskoordination"""
     
-    def __init__(self, rdk):
+    def __init__(self, rdk, program_writer=None, optimize=False, robot_name='Staubli TX2-40', 
+                 tool_name='AROB_LWS_VakuumGreifer_14'):
         self.rdk = rdk
         
         # Initialisierung der Hardware-Komponenten
-        self.robot = rdk.Item('Staubli TX2-40')
-        self.tool = rdk.Item('AROB_LWS_VakuumGreifer_14')
+        self.robot = rdk.Item(robot_name)
+        self.tool = rdk.Item(tool_name)
         self.world_frame = rdk.Item("World")
         
+        rts_link = rdk
+        rts_gripper = self.tool
+        self.program = None
+        
+        if optimize:
+            # Befehle zuerst als IR aufzeichnen, optimiert an RoboDK und optional an den VAL3-Export
+            self.program = ProgramIR()
+            self.backends = [RoboDKBackend(self.robot, rdk, self.tool)]
+            if program_writer is not None:
+                self.backends.append(Val3Backend(program_writer, self.robot))
+            self.robot = self.program.robot_proxy(self.robot)
+            rts_link = self.program.link_proxy(rdk)
+            rts_gripper = self.program.gripper_proxy(self.tool)
+        elif program_writer is not None:
+            # Direkter VAL3-Export: Bewegungen und RTS-Befehle werden mitgeschrieben
+            self.robot = Val3RobotTee(self.robot, program_writer)
+            rts_link = Val3LinkTee(rdk, program_writer)
+        
         # RTS-System für Vakuum-Greifer-Steuerung
-        self.rts = RTS(rdk, self.robot, self.tool)
+        self.rts = RTS(rts_link, self.robot, rts_gripper)
         self.rts.addConnection('dVacuum', '98FE10BA-0446-4B8A-A8CF-35B98F42725A', 'dio')
         self.rts.setGripperConnection('dVacuum')
         self.rts.addConnection('dVaccumSensor', '98FE10BA-0446-4B8A-A8CF-35B98F42725B', 'aio')
         
+        # Aktiver Ausführungsmodus und Startzeitpunkte für die Zykluszeitmessung
+        self.run_mode = "demo"
+        self.run_start_sim = None
+        self.run_start_wall = None
+        
+        # Simulationsgeschwindigkeit vor dem Turbo-Modus, wird in end_run() wiederhergestellt
+        self.previous_speed = None
+        
+        # Optionale Laufzeitmetriken (siehe enable_metrics)
+        self.metrics = None
+        
+        # Optionale Bahnaufzeichnung (siehe use_trajectory_recorder)
+        self.trajectory = None
+        
+        # Stationen mit zweistufiger Anfahrt der Kontaktposen (siehe use_two_stage_contact)
+        self.contact_stations = []
+        
+        # Optionales simuliertes I/O-Modell (siehe use_simulated_io)
+        self.io = None
+        
+        # Mit anderen Robotern geteilte Arbeitsräume (siehe use_zone_interlock)
+        self.zones = []
+        
+        # Optionale Auswahl der Gelenkkonfiguration (siehe use_configuration_selector)
+        self.selector = None
+        
+        # Belegungsmodell des Magazins und Behandlung von Fehlgriffen (siehe use_pick_recovery)
+        self.magazine = None
+        self.pick_sensor = None
+        self.recovery_program = False
+        self.vacuum_threshold = 1
+        self.vacuum_timeout = 1
+        
         # Standard-Gelenkpositionen für sichere Bewegungen
         self.t_home = [0, 50, 50, 0, 60, 0]    # Home-Position für sichere Übergänge
         self.t_start = [0, 0, 90, 0, 90, 0]    # Start-Position für Initialisierung
         
         # Validierung der RoboDK-Komponenten
         if not self.robot.Valid():
-            raise Exception("Robot 'Staubli TX2-40' not found in RoboDK")
+            raise Exception(f"Robot '{robot_name}' not found in RoboDK")
         if not self.tool.Valid():
-            raise Exception("Tool 'AROB_LWS_VakuumGreifer_14' not found in RoboDK")
+            raise Exception(f"Tool '{tool_name}' not found in RoboDK")
     
     def initialize(self):
         """Initialisiert Roboter in definierte Ausgangslage"""
@@ -36,67 +108,469 @@ class RobotController:
         self.robot.setPoseFrame(self.world_frame)
         self.robot.setSpeed(50, 50, 50, 75)  # Standard-Geschwindigkeitsprofile
     
+    def resume(self, robot_joints=None):
+        """Bringt Roboter nach einem Abbruch in einen definierten Zustand für die Wiederaufnahme"""
+        # Noch am Greifer hängende Steine lösen (Aufnahme wurde nicht abgeschlossen)
+        self.tool.DetachAll()
+        
+        # Letzten gesicherten Roboterzustand wiederherstellen (nur Simulation)
+        if robot_joints is not None:
+            self.robot.setJoints(robot_joints)
+        
+        self.robot.setPoseFrame(self.world_frame)
+        self.robot.setSpeed(50, 50, 50, 75)
+        self.move_to_home()
+    
+    def set_run_mode(self, mode, simulation_speed=100):
+        """
+        Setzt den Ausführungsmodus der Simulation
+        - demo:     Darstellung aller Bewegungen mit der eingestellten Simulationsgeschwindigkeit
+        - turbo:    Ohne Rendering mit beschleunigter Simulation, liefert simulierte Zykluszeit
+        - validate: Schnellprüfung (Erreichbarkeit, Programmablauf) ohne Bewegungszeiten
+        """
+        if mode not in RUN_MODES:
+            raise Exception(f"Unknown run mode '{mode}', use one of {', '.join(RUN_MODES)}")
+        
+        self.run_mode = mode
+        if mode == "validate":
+            self.rdk.setRunMode(RUNMODE_QUICKVALIDATE)
+            self.rdk.Render(False)
+        elif mode == "turbo":
+            self.rdk.setRunMode(RUNMODE_SIMULATE)
+            if self.previous_speed is None:
+                self.previous_speed = self.rdk.SimulationSpeed()
+            self.rdk.setSimulationSpeed(simulation_speed)
+            self.rdk.Render(False)
+        else:
+            self.rdk.setRunMode(RUNMODE_SIMULATE)
+            self.rdk.Render(True)
+        
+        # Startzeitpunkte für simulierte und reale Laufzeit
+        self.run_start_sim = self.rdk.SimulationTime()
+        self.run_start_wall = time.perf_counter()
+    
+    def end_run(self):
+        """
+        Schaltet das Rendering wieder ein (auch nach Fehlern) und liefert die Laufzeiten
+        Rückgabe: (simulierte Zykluszeit in s oder None bei validate, reale Laufzeit in s)
+        """
+        self.rdk.Render(True)
+        if self.run_start_wall is None:
+            return None, None
+        
+        wall_time = time.perf_counter() - self.run_start_wall
+        cycle_time = None
+        if self.run_mode != "validate":
+            cycle_time = self.rdk.SimulationTime() - self.run_start_sim
+            
+            # I/O-Wartezeiten einrechnen, nur für den Postprozessor simulierte Zweige abziehen
+            if self.io is not None:
+                cycle_time += self.io.wait_time - self.io.skipped_time
+        
+        # Simulation für nachfolgende interaktive Nutzung zurücksetzen
+        self.rdk.setRunMode(RUNMODE_SIMULATE)
+        if self.previous_speed is not None:
+            self.rdk.setSimulationSpeed(self.previous_speed)
+            self.previous_speed = None
+        self.run_start_wall = None
+        return cycle_time, wall_time
+    
     def move_to_home(self):
         """Bewegt Roboter in sichere Home-Position"""
         self.robot.MoveJ(self.t_home)
     
-    def pick_piece(self, piece, pick_above_poses, pick_poses, speed=10):
+    def pick_piece(self, piece, pick_above_poses, pick_poses, speed=10, frame=None):
         """Aufnahme eines Jenga-Steins aus dem Magazin"""
+        return self.pick_at(
+            piece, 
+            pick_above_poses[f"Jenga{piece.number}above"], 
+            pick_poses[f"Jenga{piece.number}"], 
+            speed, 
+            frame
+        )
+    
+    def pick_at(self, piece, pick_above_pose, pick_pose, speed=10, frame=None):
+        """
+        Aufnahme eines Jenga-Steins an gegebener Pose (Magazin oder Turm)
+        frame: Frame der Station (für die zweistufige Anfahrt, siehe use_two_stage_contact)
+        Rückgabe: tatsächlich gegriffener Stein (nach einem Fehlgriff im Magazin der Ersatzstein)
+        """
+        # Magazinplatz der Aufnahme, bereits als leer bekannte Plätze direkt durch Ersatzplatz ersetzen
+        slot = self._magazine_slot(pick_pose)
+        if slot is not None and self.pick_sensor is not None and slot not in self.magazine.slot_pieces:
+            slot, piece, pick_above_pose, pick_pose = self._spare_slot(slot)
+        
         print(f"Picking up piece {piece.number}")
         
         # Sicherheitsbewegung über Home-Position
-        self.move_to_home()
-        
-        # Positionierung oberhalb des Zielsteins
-        self.robot.MoveJ(pick_above_poses[f"Jenga{piece.number}above"])
+        with self._phase("home"):
+            self.move_to_home()
         
-        # Präzisionsbewegung mit reduzierter Geschwindigkeit
-        self.robot.setSpeed(speed)
+        # Positionierung oberhalb des Zielsteins (in geteilten Arbeitsräumen erst nach der Freigabe)
+        with self._phase("approach"):
+            self._enter_zone(frame)
+            self.robot.MoveJ(self._approach_target(pick_above_pose))
         
-        # Anfahren der Greifposition und Aktivierung des Vakuums
-        self.robot.MoveL(pick_poses[f"Jenga{piece.number}"])
-        self.rts.setVacuum(1, "dVacuum")
+        # Anfahren der Greifposition mit reduzierter Geschwindigkeit und Aktivierung des Vakuums
+        with self._phase("pick"):
+            self._contact_approach(pick_above_pose, pick_pose, speed, frame)
+        with self._phase("vacuum"):
+            if slot is not None and self.pick_sensor is not None:
+                piece, slot, pick_above_pose = self._vacuum_with_recovery(piece, slot, pick_above_pose, pick_pose)
+            else:
+                self.rts.setVacuum(1, "dVacuum", item=self._item(piece.piece))
+        piece.state = HELD
+        if slot is not None:
+            self.magazine.take_slot(slot)
         
-        # Zurückfahren in sichere Höhe
-        self.robot.MoveL(pick_above_poses[f"Jenga{piece.number}above"])
+        # Zurückfahren in sichere Höhe (optional mit Ersatzaufnahme im Roboterprogramm)
+        with self._phase("retract"):
+            if slot is not None and self.recovery_program:
+                self._recovery_block(slot, pick_above_pose)
+            else:
+                self._contact_retract(pick_above_pose, pick_pose, frame)
+            self._leave_zone(frame)
         
         # Geschwindigkeit für nachfolgende Bewegungen zurücksetzen
         self.robot.setSpeed(50)
+        return piece
     
     def place_piece(self, piece, place_above_pose, place_pose, tower_frame, speed=10):
         """Platzierung eines Jenga-Steins auf dem Turm"""
         print(f"Placing piece {piece.number}")
         
-        # Sicherheitsbewegung über Home-Position
-        self.move_to_home()
-        
-        # Anfahren der Position oberhalb des Zielplatzes
-        self.robot.MoveJ(place_above_pose)
+        # Transfer über Home-Position zur Position oberhalb des Zielplatzes
+        with self._phase("transfer"):
+            self.move_to_home()
+            self._enter_zone(tower_frame)
+            self.robot.MoveJ(self._approach_target(place_above_pose))
         
-        # Präzisionsplatzierung mit reduzierter Geschwindigkeit
-        self.robot.setSpeed(speed)
+        # Absetzen des Steins mit reduzierter Geschwindigkeit und Deaktivierung des Vakuums
+        with self._phase("place"):
+            self._contact_approach(place_above_pose, place_pose, speed, tower_frame)
+        # Stein wird beim Lösen direkt statisch am Tower-Frame befestigt
+        with self._phase("vacuum"):
+            self.rts.setVacuum(0, "dVacuum", item=self._item(piece.piece), parent=tower_frame)
+        piece.state = PLACED
         
-        # Absetzen des Steins und Deaktivierung des Vakuums
-        self.robot.MoveL(place_pose)
-        self.rts.setVacuum(0, "dVacuum")
-        
-        # Statische Befestigung des Steins am Tower-Frame
-        piece.attach_to_frame(tower_frame)
+        # Ablage im Magazin (Abbau) im Belegungsmodell nachführen
+        if self.magazine is not None and tower_frame == self.magazine.frame:
+            slot = self.magazine.slot_near(place_pose)
+            if slot is not None:
+                self.magazine.put_slot(slot, piece)
         
         # Zurückfahren und Rückkehr zur Home-Position
-        self.robot.MoveL(place_above_pose)
+        with self._phase("retract"):
+            self._contact_retract(place_above_pose, place_pose, tower_frame)
+            self._leave_zone(tower_frame)
         self.robot.setSpeed(50)
-        self.move_to_home()
+        with self._phase("home"):
+            self.move_to_home()
     
     def move_piece(self, piece, magazine, tower, pick_above_poses, pick_poses, speed=10):
         """Vollständiger Bewegungsablauf: Aufnahme aus Magazin und Platzierung im Turm"""
         print(f"Moving piece {piece.number} from magazine to tower")
+        self._piece_started(piece)
         
-        # Phase 1: Aufnahme aus dem Magazin
-        self.pick_piece(piece, pick_above_poses, pick_poses, speed)
+        # Phase 1: Aufnahme aus dem Magazin (nach Fehlgriff ggf. Ersatzstein)
+        held = self.pick_piece(piece, pick_above_poses, pick_poses, speed, magazine.frame)
         
-        # Phase 2: Berechnung der Zielposition im Turm
-        place_above, place = tower.get_placement_pose(piece)
+        # Phase 2: Berechnung der Zielposition im Turm (geplanter Turmplatz des Steins)
+        place_above, place = tower.get_placement_pose(piece, slot=piece.target + 1)
         
         # Phase 3: Platzierung im Turm
-        self.place_piece(piece, place_above, place, tower.frame, speed)
\ No newline at end of file
+        self.place_piece(held, place_above, place, tower.frame, speed)
+        self.flush()
+        self._piece_finished()
+        return held
+    
+    def execute_task(self, task, speed=10):
+        """Führt eine Aufgabe der TaskPipeline aus (Aufbau oder Abbau eines Steins)"""
+        print(f"Executing {task.kind} task for piece {task.piece.number} (cycle {task.cycle + 1})")
+        
+        # Geplanten Turmplatz erst bei der Ausführung übernehmen (Planung läuft voraus)
+        task.piece.target = task.piece_target
+        self._piece_started(task.piece)
+        
+        held = self.pick_at(task.piece, task.source_above, task.source, speed, task.source_frame)
+        self.place_piece(held, task.target_above, task.target, task.target_frame, speed)
+        
+        # Abbauaufgaben legen den Stein zurück ins Magazin
+        if task.kind == CLEAR:
+            held.state = IN_MAGAZINE
+        self.flush()
+        self._piece_finished()
+        return held
+    
+    def flush(self, final=False):
+        """Führt aufgezeichnete Befehle optimiert aus (nur mit optimize=True, sonst ohne Wirkung)"""
+        if self.program is not None:
+            self.program.flush(self.backends, final)
+    
+    def finish(self):
+        """Schliesst den Befehlsstrom ab und meldet die Wirkung der Optimierung"""
+        if self.program is not None:
+            self.flush(final=True)
+            removed = self.program.recorded - self.program.emitted
+            print(f"Program optimizer removed {removed} of {self.program.recorded} instructions")
+    
+    def use_configuration_selector(self, magazine, tower, pieces=None, pool=None):
+        """
+        Magazin und Turm wählen Greiforientierung und Gelenkkonfiguration mit kürzester Bewegung ab Home
+        Erst nach initialize()/resume() aufrufen, da Werkzeug und Referenz vom Roboter übernommen werden.
+        Mit Verbindungspool werden die Anfahrposen aller Magazin- und Turmplätze (beide symmetrischen
+        Varianten) vorab parallel gelöst, die Bewegungen bleiben auf der Hauptverbindung.
+        """
+        # Im IR-Modus aufgezeichnete Einstellungen zuerst ausführen
+        self.flush()
+        self.selector = ConfigurationSelector(self.robot, self.t_home, pool=pool)
+        magazine.selector = self.selector
+        tower.selector = self.selector
+        
+        if pool is not None:
+            magazine_slots = np.arange(1, magazine.capacity + 1)
+            tower_slots = np.arange(1, len(pieces) + 1) if pieces is not None else []
+            poses = []
+            for rotation in (0, pi):
+                poses += to_mats(magazine.get_pick_pose_arrays(magazine_slots, rotation)[0])
+                if len(tower_slots):
+                    above, _ = tower.get_placement_pose_arrays(pieces[0], tower_slots, rotation_offset=rotation)
+                    poses += to_mats(above)
+            self.selector.prefetch(poses)
+            print(f"Solved {len(self.selector.solutions)} approach poses on {pool.size} connections")
+    
+    def _approach_target(self, pose):
+        """Gelenkwerte der gewählten Konfiguration für eine Anfahrpose, sonst die Pose selbst"""
+        if self.selector is not None:
+            joints = self.selector.joints_for(pose)
+            if joints is not None:
+                return joints
+        return pose
+    
+    def enable_metrics(self, metrics):
+        """Aktiviert die Erfassung von Phasen- und Zykluszeiten (siehe metrics.Metrics)"""
+        self.metrics = metrics
+    
+    def _phase(self, name):
+        """Kontext für die Zeitmessung einer Bewegungsphase, ohne Metriken ohne Wirkung"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
+    
+    def use_trajectory_recorder(self, link, path, rate=250, seconds=600):
+        """
+        Startet die Bahnaufzeichnung über eine eigene Verbindung `link` (Robolink ist nicht threadsicher)
+        Neben Bahn und Geschwindigkeit werden der Vakuumzustand (Stein am Greifer) und der aktuelle Stein erfasst.
+        """
+        robot = link.Item(self.robot.Name())
+        gripper = link.Item(self.tool.Name())
+        self.trajectory = TrajectoryRecorder(
+            robot, 
+            path, 
+            rate, 
+            capacity=int(rate * seconds), 
+            signals={"dVacuum": lambda: float(len(gripper.Childs()) > 0)}
+        )
+        self.trajectory.start()
+        return self.trajectory
+    
+    def use_simulated_io(self, sensor_latency=0.1):
+        """
+        Wertet die RTS-Anschlüsse in der Simulation über ein I/O-Modell aus (siehe SimulatedIO)
+        Der Vakuumsensor folgt dem Vakuumausgang nach sensor_latency Sekunden, sofern ein Stein am
+        Greifer hängt. Wartezeiten und inaktive Zweige fliessen in die simulierte Zykluszeit ein.
+        """
+        self.io = SimulatedIO(self.rdk.SimulationTime)
+        self.io.respond("dVacuum", "dVaccumSensor", sensor_latency, lambda value: value if self._gripping() else 0)
+        
+        # RTS-Befehle dort abgreifen, wo sie in zeitlicher Reihenfolge mit den Bewegungen ausgeführt werden
+        if self.program is not None:
+            self.backends[0].rdk = IOLinkTee(self.backends[0].rdk, self.io)
+        else:
+            self.rts.RDK = IOLinkTee(self.rts.RDK, self.io)
+        return self.io
+    
+    def _gripping(self):
+        """Stein am Greifer (Simulation)"""
+        return len(self.tool.Childs()) > 0
+    
+    def use_two_stage_contact(self, *stations):
+        """
+        Zweistufige Anfahrt und Rückzug an den Kontaktposen der gegebenen Stationen (Magazin, Turm)
+        Von der Anfahrpose aus wird mit station.fast_speed bis station.contact_distance vor die
+        Kontaktpose gefahren, erst der letzte Abschnitt mit station.slow_speed (Rückzug umgekehrt).
+        Anfahr- und Kontaktposen der Stationen werden unverändert übernommen.
+        """
+        self.contact_stations.extend(stations)
+    
+    def _contact_station(self, frame):
+        """Station mit zweistufiger Anfahrt zum Frame oder None"""
+        if frame is None:
+            return None
+        for station in self.contact_stations:
+            if station.frame == frame:
+                return station
+        return None
+    
+    def _contact_split(self, above_pose, pose, station):
+        """Umschaltpose zwischen schnellem und langsamem Abschnitt, None falls die Strecke kürzer ist"""
+        switch, length = offset_towards(to_array(pose), to_array(above_pose), station.contact_distance)
+        if length <= station.contact_distance:
+            return None
+        return to_mat(switch)
+    
+    def _contact_approach(self, above_pose, pose, speed, frame):
+        """Lineare Anfahrt der Kontaktpose, für Stationen aus use_two_stage_contact in zwei Abschnitten"""
+        station = self._contact_station(frame)
+        if station is None:
+            self.robot.setSpeed(speed)
+            self.robot.MoveL(pose)
+            return
+        
+        switch = self._contact_split(above_pose, pose, station)
+        if switch is not None:
+            self.robot.setSpeed(station.fast_speed)
+            self.robot.MoveL(switch)
+        self.robot.setSpeed(station.slow_speed)
+        self.robot.MoveL(pose)
+    
+    def _contact_retract(self, above_pose, pose, frame):
+        """Linearer Rückzug zur Anfahrpose, für Stationen aus use_two_stage_contact in zwei Abschnitten"""
+        station = self._contact_station(frame)
+        if station is not None:
+            switch = self._contact_split(above_pose, pose, station)
+            if switch is not None:
+                self.robot.MoveL(switch)
+                self.robot.setSpeed(station.fast_speed)
+        self.robot.MoveL(above_pose)
+    
+    def use_zone_interlock(self, zone):
+        """
+        Station in einem mit anderen Robotern geteilten Arbeitsraum (siehe multi_robot_coordinator.ZoneInterlock)
+        Die Zone wird vor der Anfahrt reserviert und nach dem Rückzug wieder freigegeben.
+        """
+        zone.register(self)
+        self.zones.append(zone)
+    
+    def _enter_zone(self, frame):
+        for zone in self.zones:
+            if zone.covers(frame):
+                zone.enter(self)
+    
+    def _leave_zone(self, frame):
+        for zone in self.zones:
+            if zone.covers(frame):
+                zone.leave(self)
+    
+    def _piece_started(self, piece):
+        if self.trajectory is not None:
+            self.trajectory.piece = piece.number
+        if self.metrics is not None:
+            # Abbauaufgaben haben keinen Zielplatz im Turm (target = -1)
+            layer = piece.target // PIECES_PER_LAYER if piece.target >= 0 else -1
+            self.metrics.piece_started(layer)
+    
+    def _piece_finished(self):
+        if self.trajectory is not None:
+            self.trajectory.piece = 0
+        if self.metrics is not None:
+            self.metrics.piece_finished()
+    
+    def use_magazine_index(self, magazine, pieces):
+        """Ansaugen ohne bekanntes Teil über den Index der Magazinplätze statt AttachClosest()"""
+        magazine.build_slot_index(pieces)
+        self.magazine = magazine
+        self.rts.setAttachResolver(lambda gripper: magazine.take_item_near(self.robot.Pose()))
+    
+    def use_pick_recovery(self, sensor=None, program=False, threshold=1, timeout=1):
+        """
+        Behandlung von Fehlgriffen im Magazin (erfordert use_magazine_index)
+        
+        sensor(piece) liefert in der Simulation, ob nach dem Ansaugen Vakuum anliegt. Standard:
+        Der Stein fehlt, wenn sein Item in der Station gelöscht oder ausgeblendet wurde. Bei einem
+        Fehlgriff wird der Platz als leer markiert und ohne Umweg über Home der nächstgelegene
+        belegte Platz angefahren.
+        
+        Mit program=True wird zusätzlich nach jeder Aufnahme im Magazin ein Block
+        ifConnection('dVaccumSensor' < threshold) / elseConnection() ins Roboterprogramm geschrieben,
+        welcher auf der Steuerung den nächstgelegenen (laut Plan belegten) Platz anfährt. Da der
+        Postprozessor nur simulierte Befehle erhält, fährt die Simulation beide Zweige ab.
+        """
+        if self.magazine is None:
+            raise Exception("Pick recovery requires the magazine slot index (use_magazine_index)")
+        self.pick_sensor = sensor if sensor is not None else self._piece_present
+        self.recovery_program = program
+        self.vacuum_threshold = threshold
+        self.vacuum_timeout = timeout
+    
+    def _piece_present(self, piece):
+        """Simulierter Vakuumsensor: Stein vorhanden, solange sein Item gültig und sichtbar ist"""
+        return piece.piece.Valid() and piece.piece.Visible()
+    
+    def _magazine_slot(self, pose):
+        """Magazinplatz einer Aufnahmepose oder None (ohne Belegungsmodell immer None)"""
+        if self.magazine is None:
+            return None
+        return self.magazine.slot_near(pose)
+    
+    def _spare_slot(self, slot):
+        """Nächstgelegener belegter Magazinplatz mit Stein und Posen"""
+        spare = self.magazine.nearest_stocked_slot(slot)
+        if spare is None:
+            raise Exception(f"No stocked magazine slot left to replace slot {slot}")
+        pick_above_pose, pick_pose = self.magazine.get_pick_pose(spare)
+        return spare, self.magazine.slot_pieces[spare], pick_above_pose, pick_pose
+    
+    def _vacuum_with_recovery(self, piece, slot, pick_above_pose, pick_pose):
+        """Ansaugen mit Prüfung des Vakuumsensors, bei Fehlgriff direkt zum nächsten belegten Platz"""
+        while not self.pick_sensor(piece):
+            print(f"Missed pick of piece {piece.number} at magazine slot {slot}")
+            if self.metrics is not None:
+                self.metrics.record_failure("missed_pick")
+            
+            # Fehlversuch: Vakuum ein, kein Teil angesogen, Vakuum aus
+            self.rts.setOutput("dVacuum", 1)
+            self.rts.setOutput("dVacuum", 0)
+            self.magazine.mark_empty(slot)
+            slot, piece, next_above, next_pick = self._spare_slot(slot)
+            
+            # Ohne Umweg über Home: hoch, direkt über den Ersatzplatz und wieder hinunter
+            self.robot.MoveL(pick_above_pose)
+            self.robot.MoveJ(self._approach_target(next_above))
+            self.robot.MoveL(next_pick)
+            pick_above_pose = next_above
+        
+        self.rts.setVacuum(1, "dVacuum", item=self._item(piece.piece))
+        return piece, slot, pick_above_pose
+    
+    def _recovery_block(self, slot, pick_above_pose):
+        """Ersatzaufnahme als ifConnection/elseConnection-Block im Roboterprogramm mit anschliessendem Rückzug
+
+        Das Programm versucht genau einen Ersatzplatz, schlägt auch dieser fehl, läuft es ohne Stein weiter.
+        Ob der Zweig im Roboter ausgeführt wird, ist beim Planen unbekannt; der Ersatzplatz wird deshalb
+        im Belegungsmodell entnommen, damit ihn keine spätere Aufgabe im selben Programm mehr anfährt.
+        """
+        spare = self.magazine.nearest_stocked_slot(slot)
+        if spare is None:
+            self.robot.MoveL(pick_above_pose)
+            return
+        self.magazine.take_slot(spare)
+        spare_above, spare_pick = self.magazine.get_pick_pose(spare)
+        
+        self.rts.waitConnection("dVaccumSensor", self.vacuum_threshold, self.vacuum_timeout, ">=")
+        self.rts.ifConnection("dVaccumSensor", self.vacuum_threshold, "<")
+        self.rts.setOutput("dVacuum", 0)
+        self.robot.MoveL(pick_above_pose)
+        self.robot.MoveJ(self._approach_target(spare_above))
+        self.robot.MoveL(spare_pick)
+        self.rts.setOutput("dVacuum", 1)
+        self.robot.MoveL(spare_above)
+        self.rts.elseConnection()
+        self.robot.MoveL(pick_above_pose)
+        self.rts.endIfConnection()
+    
+    def _item(self, item):
+        """Objekt-Item für RTS, im IR-Modus als aufzeichnender Proxy"""
+        if self.program is not None:
+            return self.program.item_proxy(item)
+        return item
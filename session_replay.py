@@ -0,0 +1,262 @@
+# Aufzeichnung und Wiedergabe von RoboDK-Sitzungen für schnelle Regressionstests
+# Der Recorder protokolliert jeden Robolink-Aufruf mit Antwort, der Replayer ersetzt
+# RoboDK durch die aufgezeichneten Antworten und vergleicht die Aufrufe Schritt für Schritt
+
+import difflib
+import json
+
+import numpy as np
+from robodk.robolink import Item
+from robodk.robomath import Mat
+
+# Aufrufe, welche das Roboterprogramm bzw. die Station verändern (Standard für den Vergleich)
+DIFF_CALLS = (
+    "MoveJ", "MoveL", "MoveC", "setSpeed", "setRounding", "setJoints", "setPoseFrame", "setPoseTool",
+    "setParentStatic", "AttachClosest", "DetachAll", "RunCode", "Pause",
+)
+
+# Ziel-Name für Aufrufe direkt auf der Robolink-Verbindung
+LINK = "RDK"
+
+# Markierung für nicht aufgezeichnete Aufrufe (aufgezeichnete Antworten können None sein)
+_MISSING = object()
+
+
+class SessionRecorder:
+    """
+    Ersetzt Robolink transparent und schreibt jeden Aufruf samt Antwort als JSON-Zeile
+
+    Items werden über ihren Namen referenziert, Posen als Matrixzeilen gespeichert.
+    """
+
+    def __init__(self, rdk, path):
+        self._rdk = rdk
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def Item(self, name, itemtype=None):
+        item = self._rdk.Item(name, itemtype)
+        self._write(LINK, "Item", [name], _encode(item, name))
+        return _RecordedItem(self, item, name)
+
+    def __getattr__(self, name):
+        return self._wrap(LINK, self._rdk, name)
+
+    def _wrap(self, target, obj, name):
+        """Aufzeichnender Ersatz für eine Methode von obj"""
+        attribute = getattr(obj, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            args = [_unwrap(arg) for arg in args]
+            kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+            result = attribute(*args, **kwargs)
+            self._write(target, name, list(args) + ([kwargs] if kwargs else []), _encode(result))
+            return self._wrap_result(result)
+
+        return call
+
+    def _wrap_result(self, result):
+        """Zurückgegebene Items ebenfalls aufzeichnend umhüllen"""
+        if isinstance(result, Item):
+            return _RecordedItem(self, result, result.Name())
+        if isinstance(result, list) and result and isinstance(result[0], Item):
+            return [_RecordedItem(self, item, item.Name()) for item in result]
+        return result
+
+    def _write(self, target, call, args, result):
+        entry = {"target": target, "call": call, "args": _encode(args), "result": result}
+        self._file.write(json.dumps(entry) + "\n")
+        self.count += 1
+
+    def close(self):
+        """Schliesst die Aufzeichnung"""
+        if not self._file.closed:
+            self._file.close()
+            print(f"Recorded {self.count} RoboDK calls to {self.path}")
+
+
+class _RecordedItem:
+    """Aufzeichnender Stellvertreter eines RoboDK-Items"""
+
+    def __init__(self, recorder, item, name):
+        self._recorder = recorder
+        self._item = item
+        self.name = name
+
+    def __getattr__(self, name):
+        return self._recorder._wrap(self.name, self._item, name)
+
+    def __eq__(self, other):
+        return _unwrap(other) == self._item
+
+    def __hash__(self):
+        return hash(self._item)
+
+
+class SessionReplay:
+    """
+    Stand-in für Robolink, beantwortet Aufrufe aus einer Aufzeichnung ohne RoboDK
+
+    Antworten werden pro Aufruf (Ziel, Methode, Argumente) in Aufzeichnungsreihenfolge
+    geliefert, bei geänderten Argumenten ersatzweise pro (Ziel, Methode). Alle Aufrufe
+    des neuen Laufs werden mitprotokolliert und lassen sich mit diff() vergleichen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.recorded = [json.loads(line) for line in f if line.strip()]
+
+        # Antworten pro exaktem Aufruf und pro Methode, jeweils mit Lesezeiger
+        self._exact = {}
+        self._by_call = {}
+        for entry in self.recorded:
+            self._exact.setdefault(_key(entry), []).append(entry["result"])
+            self._by_call.setdefault((entry["target"], entry["call"]), []).append(entry["result"])
+        self._cursors = {}
+
+        self.calls = []
+        self._items = {}
+
+    def Item(self, name, itemtype=None):
+        self._serve(LINK, "Item", [name])
+        return self._item(name)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._serve(LINK, name, list(args) + ([kwargs] if kwargs else []))
+
+    def _item(self, name):
+        """Ein Stellvertreter pro Itemname (Identität für Vergleiche)"""
+        if name not in self._items:
+            self._items[name] = _ReplayItem(self, name)
+        return self._items[name]
+
+    def _serve(self, target, call, args):
+        """Protokolliert den Aufruf und liefert die aufgezeichnete Antwort"""
+        entry = {"target": target, "call": call, "args": _encode(args)}
+        self.calls.append(entry)
+
+        result = self._next(self._exact, _key(entry))
+        if result is _MISSING:
+            result = self._next(self._by_call, (target, call))
+        return self._decode(None if result is _MISSING else result)
+
+    def _next(self, table, key):
+        """Nächste Antwort für key (_MISSING falls nicht aufgezeichnet), die letzte wird wiederholt"""
+        results = table.get(key)
+        if not results:
+            return _MISSING
+        position = self._cursors.get((id(table), key), 0)
+        self._cursors[(id(table), key)] = position + 1
+        return results[min(position, len(results) - 1)]
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "item" in value:
+                return self._item(value["item"])
+            if "mat" in value:
+                return Mat(value["mat"])
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        return value
+
+    def rewind(self):
+        """Setzt Lesezeiger und Protokoll zurück, die Aufzeichnung wird erneut von vorne wiedergegeben"""
+        self._cursors = {}
+        self.calls = []
+
+    def diff(self, calls=DIFF_CALLS, precision=3):
+        """Zeilenweiser Vergleich (unified diff) von Aufzeichnung und neuem Lauf, leer bei Gleichheit"""
+        recorded = [_format(entry, precision) for entry in self.recorded if calls is None or entry["call"] in calls]
+        replayed = [_format(entry, precision) for entry in self.calls if calls is None or entry["call"] in calls]
+        return list(difflib.unified_diff(recorded, replayed, "recorded", "replayed", lineterm=""))
+
+    def report(self, diff_path=None):
+        """Meldet das Vergleichsergebnis und schreibt den Diff optional in eine Datei"""
+        lines = self.diff()
+        changed = sum(1 for line in lines if line[:1] in "+-" and line[:3] not in ("+++", "---"))
+        if not lines:
+            print(f"Replay matches recording ({len(self.calls)} calls)")
+        else:
+            print(f"Replay differs from recording in {changed} lines")
+        if diff_path is not None:
+            with open(diff_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        return not lines
+
+
+class _ReplayItem:
+    """Stellvertreter eines RoboDK-Items im Replay"""
+
+    def __init__(self, replay, name):
+        self._replay = replay
+        self.name = name
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._replay._serve(self.name, name, list(args) + ([kwargs] if kwargs else []))
+
+    def __eq__(self, other):
+        return isinstance(other, _ReplayItem) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+def _unwrap(value):
+    """Aufzeichnende Items für Aufrufe an RoboDK auspacken"""
+    if isinstance(value, _RecordedItem):
+        return value._item
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+def _encode(value, name=None):
+    """JSON-taugliche Darstellung von Aufrufargumenten und Antworten"""
+    if isinstance(value, (_RecordedItem, _ReplayItem)):
+        return {"item": value.name}
+    if isinstance(value, Item):
+        return {"item": name if name is not None else value.Name()}
+    if isinstance(value, Mat):
+        return {"mat": value.rows}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(key): _encode(v) for key, v in value.items()}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def _key(entry):
+    return (entry["target"], entry["call"], json.dumps(entry["args"]))
+
+
+def _format(entry, precision):
+    """Lesbare Darstellung eines Aufrufs mit gerundeten Zahlen (ohne Rauschen der letzten Stellen)"""
+    def fmt(value):
+        if isinstance(value, float):
+            text = f"{value:.{precision}f}"
+            return text[1:] if text.startswith("-") and float(text) == 0 else text
+        if isinstance(value, dict):
+            if "item" in value:
+                return value["item"]
+            if "mat" in value:
+                return "Mat(" + fmt(value["mat"]) + ")"
+            return "{" + ", ".join(f"{key}={fmt(v)}" for key, v in value.items()) + "}"
+        if isinstance(value, list):
+            return "[" + ", ".join(fmt(v) for v in value) + "]"
+        return repr(value)
+
+    return f"{entry['target']}.{entry['call']}(" + ", ".join(fmt(arg) for arg in entry["args"]) + ")"
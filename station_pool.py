@@ -0,0 +1,198 @@
+# Vorgewärmte Worker für parallele Simulationsläufe
+# Jeder Worker lädt die Station einmal (RoboDK ohne Oberfläche oder SessionReplay) und setzt sie
+# zwischen den Aufträgen über einen Schnappschuss zurück, statt Simulation.rdk neu zu laden
+#
+# Aufruf (Geschwindigkeits-Sweep, je ein Turmbau pro Geschwindigkeit):
+#     python station_pool.py --workers 4 --speeds 5,10,20,40
+#     python station_pool.py --replay session.jsonl --workers 4 --speeds 5,10,20,40
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from functools import partial
+
+from robodk.robolink import Robolink
+
+from robot_controller import RobotController
+from magazine import Magazine
+from tower import Tower
+from jenga_piece_collection import JengaPieceCollection
+from session_replay import SessionReplay
+
+# Teilsysteme einer geladenen Station
+Station = namedtuple("Station", "rdk robot_controller magazine tower pieces")
+
+# Erster Port der RoboDK-Instanzen der Worker (ein Port pro Worker)
+BASE_PORT = 20600
+
+
+class StationSnapshot:
+    """
+    Sauberer Zustand einer Station: Parent, Pose und Sichtbarkeit der Steine, Zustand und Zielplätze
+    der Sammlung, Gelenkwerte des Roboters und Belegungsmodell des Magazins
+
+    restore() macht die Änderungen eines Laufs (z.B. JengaPiece.attach_to_frame, RTS.setVacuum)
+    mit wenigen Aufrufen pro Stein rückgängig. Eine SessionReplay wird zusätzlich an den Anfang
+    der Aufzeichnung zurückgesetzt.
+    """
+
+    def __init__(self, station):
+        self.station = station
+        self.items = [
+            (piece.piece, piece.piece.Parent(), piece.piece.Pose(), piece.piece.Visible())
+            for piece in station.pieces
+        ]
+        self.state = station.pieces.state.copy()
+        self.target = station.pieces.target.copy()
+        self.joints = station.robot_controller.robot.Joints()
+        self.slot_pieces = dict(station.magazine.slot_pieces)
+
+    def restore(self):
+        """Setzt die Station auf den Schnappschuss zurück"""
+        station = self.station
+        station.robot_controller.tool.DetachAll()
+        for item, parent, pose, visible in self.items:
+            item.setParent(parent)
+            item.setPose(pose)
+            item.setVisible(visible)
+        station.pieces.state[:] = self.state
+        station.pieces.target[:] = self.target
+        station.robot_controller.robot.setJoints(self.joints)
+        station.magazine.slot_pieces = dict(self.slot_pieces)
+
+        if isinstance(station.rdk, SessionReplay):
+            station.rdk.rewind()
+
+
+def load_station(rdk):
+    """Standardaufbau einer Station wie in main.py"""
+    robot_controller = RobotController(rdk)
+    magazine = Magazine(rdk)
+    tower = Tower(rdk)
+    pieces = JengaPieceCollection(rdk, 15)
+    robot_controller.use_magazine_index(magazine, pieces)
+    return Station(rdk, robot_controller, magazine, tower, pieces)
+
+
+def robodk_station(path="Simulation.rdk"):
+    """Eigene RoboDK-Instanz ohne Oberfläche pro Worker, lädt die Station aus `path`"""
+    identity = multiprocessing.current_process()._identity
+    port = BASE_PORT + (identity[0] if identity else 0)
+    rdk = Robolink(port=port, args=["-NOUI", f"-PORT={port}"], quit_on_close=True)
+    rdk.AddFile(os.path.abspath(path))
+    return rdk
+
+
+# Zustand im Worker-Prozess (über _start_worker gesetzt)
+_worker = None
+
+
+def _start_worker(factory, setup):
+    """Lädt die Station einmal pro Worker und legt den Schnappschuss an"""
+    global _worker
+    start = time.perf_counter()
+    station = setup(factory())
+    snapshot = StationSnapshot(station)
+    snapshot.restore()
+    _worker = (station, snapshot, time.perf_counter() - start)
+
+
+def _run_job(job_args):
+    """Führt einen Auftrag aus und setzt die Station danach zurück"""
+    job, args = job_args
+    station, snapshot, load_time = _worker
+    start = time.perf_counter()
+    try:
+        result = job(station, *args)
+    finally:
+        reset_start = time.perf_counter()
+        snapshot.restore()
+        reset_time = time.perf_counter() - reset_start
+    return result, reset_start - start, reset_time, load_time
+
+
+class StationWorkerPool:
+    """
+    Pool von `size` Prozessen mit je einer bereits geladenen Station
+
+    `factory()` liefert die Verbindung eines Workers (Standard: robodk_station, für Läufe ohne
+    RoboDK z.B. partial(SessionReplay, "session.jsonl")), `setup(rdk)` baut daraus die Station.
+    Beide werden einmal pro Worker beim Start des Pools ausgeführt und müssen picklebar sein
+    (Funktionen auf Modulebene bzw. partial). Aufträge sind Funktionen job(station, *args).
+    """
+
+    def __init__(self, size=4, factory=robodk_station, setup=load_station):
+        self.size = size
+        self._pool = multiprocessing.Pool(size, initializer=_start_worker, initargs=(factory, setup))
+
+        # Statistik: Anzahl Aufträge, Lade-, Auftrags- und Rücksetzzeiten in s
+        self.jobs = 0
+        self.load_times = []
+        self.job_time = 0.0
+        self.reset_time = 0.0
+
+    def map(self, job, args_list):
+        """Führt job(station, *args) für alle Argumente parallel aus, Ergebnisse in Reihenfolge"""
+        results = []
+        for result, job_time, reset_time, load_time in self._pool.map(_run_job, [(job, args) for args in args_list]):
+            results.append(result)
+            self.jobs += 1
+            self.job_time += job_time
+            self.reset_time += reset_time
+            self.load_times.append(load_time)
+        return results
+
+    def summary(self):
+        """Kurzbericht: Ladezeit der Station gegenüber dem Rücksetzen pro Auftrag"""
+        if not self.jobs:
+            return "No jobs run"
+        load = max(self.load_times)
+        return (f"{self.jobs} jobs on {self.size} workers: station load {load:.2f} s once per worker, "
+                f"reset {self.reset_time / self.jobs * 1000:.1f} ms per job, "
+                f"job {self.job_time / self.jobs:.2f} s on average")
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_job(station, speed):
+    """Beispielauftrag: Turmbau mit gegebener Kontaktgeschwindigkeit, Rückgabe simulierte Zykluszeit"""
+    controller = station.robot_controller
+    controller.set_run_mode("turbo")
+    controller.initialize()
+    pick_above_poses, pick_poses = station.magazine.get_pick_positions()
+    for piece in station.pieces:
+        controller.move_piece(piece, station.magazine, station.tower, pick_above_poses, pick_poses, speed)
+    controller.move_to_home()
+    cycle_time, _ = controller.end_run()
+    return cycle_time
+
+
+def main(workers=4, speeds=(5, 10, 20, 40), station="Simulation.rdk", replay=None):
+    """Geschwindigkeits-Sweep über den Worker-Pool"""
+    factory = partial(SessionReplay, replay) if replay is not None else partial(robodk_station, station)
+    with StationWorkerPool(workers, factory) as pool:
+        cycle_times = pool.map(build_job, [(speed,) for speed in speeds])
+        for speed, cycle_time in zip(speeds, cycle_times):
+            print(f"Speed {speed}: simulated cycle time {cycle_time:.1f} s")
+        print(pool.summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallele Simulationsläufe mit vorgewärmten Stationen")
+    parser.add_argument("--workers", type=int, default=4, help="Anzahl Worker-Prozesse")
+    parser.add_argument("--speeds", default="5,10,20,40", help="Kommagetrennte Kontaktgeschwindigkeiten in mm/s")
+    parser.add_argument("--station", default="Simulation.rdk", help="Station für die RoboDK-Instanzen der Worker")
+    parser.add_argument("--replay", default=None, help="Aufzeichnung statt RoboDK verwenden (SessionReplay)")
+    args = parser.parse_args()
+
+    main(args.workers, [float(speed) for speed in args.speeds.split(",")], args.station, args.replay)
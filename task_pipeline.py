@@ -0,0 +1,181 @@
+# Generatorbasierte Aufgaben-Pipeline für kontinuierlichen Betrieb
+# Erzeugt Pick/Place-Aufgaben bei Bedarf aus Magazinbestand und Turmzustand
+
+from collections import deque
+
+from tasks import Task, BUILD, CLEAR
+
+
+class TaskPipeline:
+    """
+    Plant Aufbau- und Abbauaufgaben schrittweise aus dem aktuellen Stationsmodell
+
+    Ein Zyklus besteht aus dem Aufbau des Turms aus dem Magazinbestand und dem
+    anschliessenden Abbau zurück ins Magazin. Die Planung läuft höchstens
+    `lookahead` Aufgaben der Ausführung voraus (Backpressure), dadurch bleibt der
+    Speicherbedarf auch bei endlosem Betrieb konstant.
+    """
+
+    def __init__(self, pieces, magazine, tower, lookahead=2, cycles=1, clear=True):
+        self.magazine = magazine
+        self.tower = tower
+        self.lookahead = max(1, lookahead)
+
+        # None entspricht endlosem Betrieb
+        self.cycles = cycles
+        self.clear = clear
+
+        # Magazinbestand: Platznummer -> Stein (Startbelegung entspricht Steinnummer)
+        self.stock = {piece.number: piece for piece in pieces}
+
+        # Turmzustand: Stapel aus (Turmplatz, Stein), oberster Stein zuletzt
+        self.stack = []
+
+    def _plan(self):
+        """Interner Generator, welcher Aufgaben erst bei Abfrage berechnet und das Modell nachführt"""
+        cycle = 0
+        while self.cycles is None or cycle < self.cycles:
+            # Aufbau: Steine in Platzreihenfolge aus dem Magazin auf den nächsten Turmplatz
+            while self.stock:
+                slot = min(self.stock)
+                piece = self.stock.pop(slot)
+
+                # Belegung des Platzes wird erst bei der Ausführung geprüft (_revalidate), da vorausgeplante
+                # Abbauaufgaben den Platz im Magazinmodell noch nicht wieder belegt haben
+                tower_slot = len(self.stack) + 1
+
+                source_above, source = self.magazine.get_pick_pose(slot)
+                target_above, target = self.tower.get_placement_pose(piece, slot=tower_slot)
+                self.stack.append((tower_slot, piece))
+
+                yield Task(
+                    BUILD, piece, source_above, source, self.magazine.frame, target_above, target, self.tower.frame,
+                    cycle, tower_slot - 1
+                )
+
+            # Abbau: oberster Stein zuerst, zurück auf den ersten freien Magazinplatz
+            if self.clear:
+                while self.stack:
+                    tower_slot, piece = self.stack.pop()
+                    slot = self._first_free_slot()
+
+                    source_above, source = self.tower.get_placement_pose(piece, slot=tower_slot)
+                    target_above, target = self.magazine.get_pick_pose(slot)
+                    self.stock[slot] = piece
+
+                    yield Task(
+                        CLEAR, piece, source_above, source, self.tower.frame, target_above, target, self.magazine.frame,
+                        cycle, -1
+                    )
+
+            cycle += 1
+
+            # Ohne Abbau ist nach dem ersten Zyklus nichts mehr zu tun
+            if not self.stock:
+                return
+
+    def _first_free_slot(self):
+        """Sucht den ersten unbelegten Magazinplatz"""
+        for slot in range(1, self.magazine.capacity + 1):
+            if slot not in self.stock:
+                return slot
+        raise Exception("No free magazine slot available")
+
+    def replace(self, task, held):
+        """
+        Gleicht den Plan an, wenn statt task.piece ein Ersatzstein gegriffen wurde (Fehlgriff im Magazin)
+        Der Ersatzstein liegt nun auf dem Turmplatz der Aufgabe. Sein Magazinplatz ist im
+        Magazinmodell leer, Aufgaben dafür werden vor der Ausführung ersetzt (_revalidate).
+        """
+        if held == task.piece or task.kind != BUILD:
+            return
+        
+        # Letzter Eintrag des geplanten Steins gehört zur gerade ausgeführten Aufgabe
+        for i in range(len(self.stack) - 1, -1, -1):
+            tower_slot, piece = self.stack[i]
+            if piece == task.piece:
+                self.stack[i] = (tower_slot, held)
+                held.target = tower_slot - 1
+                task.piece.target = -1
+                break
+    
+    def _revalidate(self, task, buffer):
+        """
+        Prüft eine vorausgeplante Aufbauaufgabe vor der Ausführung gegen das Magazinmodell
+        Ist ihr Platz leer (Fehlgriff, Stein als Ersatz gegriffen), übernimmt sie den nächsten ungeplanten
+        Magazinplatz bzw. den Stein der zuletzt geplanten Aufbauaufgabe. Ohne Stein entfällt sie (None).
+        """
+        if task.kind != BUILD or self.magazine.frame_pose_inv is None:
+            return task
+        if self.magazine.is_stocked(self.magazine.slot_near(task.source)):
+            return task
+        
+        index = max(i for i, (_, piece) in enumerate(self.stack) if piece == task.piece)
+        tower_slot = self.stack[index][0]
+        
+        slot = piece = None
+        while self.stock and piece is None:
+            slot = min(self.stock)
+            piece = self.stock.pop(slot)
+            if not self.magazine.is_stocked(slot):
+                piece = None
+        
+        while piece is None and buffer and buffer[-1].kind == BUILD and buffer[-1].piece != task.piece:
+            last = buffer.pop()
+            self.stack.pop()
+            slot = self.magazine.slot_near(last.source)
+            if self.magazine.is_stocked(slot):
+                piece = last.piece
+        
+        if piece is None:
+            del self.stack[index]
+            return None
+        
+        source_above, source = self.magazine.get_pick_pose(slot)
+        target_above, target = self.tower.get_placement_pose(piece, slot=tower_slot)
+        self.stack[index] = (tower_slot, piece)
+        return task._replace(piece=piece, source_above=source_above, source=source,
+                             target_above=target_above, target=target, piece_target=tower_slot - 1)
+
+    def __iter__(self):
+        """Liefert Aufgaben in Ausführungsreihenfolge, Planung höchstens `lookahead` Aufgaben voraus"""
+        planner = self._plan()
+        buffer = deque()
+
+        for task in planner:
+            buffer.append(task)
+            if len(buffer) >= self.lookahead:
+                task = self._revalidate(buffer.popleft(), buffer)
+                if task is not None:
+                    yield task
+
+        while buffer:
+            task = self._revalidate(buffer.popleft(), buffer)
+            if task is not None:
+                yield task
+
+
+def run_pipeline(robot_controller, pipeline, endless_name=None, speed=10):
+    """
+    Führt alle Aufgaben der Pipeline mit dem RobotController aus
+
+    Mit endless_name wird der Ablauf im Roboterprogramm in RTS.whileEndless(...) /
+    RTS.endWhileEndless(...) eingebettet. Da die Simulation keine Endlosschleifen
+    durchlaufen kann, muss die Pipeline dann auf eine endliche Anzahl Zyklen
+    (typischerweise einen Aufbau-/Abbauzyklus) begrenzt sein.
+    """
+    if endless_name is not None:
+        if pipeline.cycles is None:
+            raise Exception("Endless robot program requires a finite number of simulated cycles")
+        robot_controller.rts.whileEndless(endless_name)
+
+    count = 0
+    for task in pipeline:
+        held = robot_controller.execute_task(task, speed)
+        pipeline.replace(task, held)
+        count += 1
+
+    if endless_name is not None:
+        robot_controller.rts.endWhileEndless(endless_name)
+
+    return count
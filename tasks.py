@@ -0,0 +1,14 @@
+# Gemeinsame Aufgabendefinition für TaskPipeline, Ablaufplanung und RobotController
+
+from collections import namedtuple
+
+# Einzelne Aufgabe: Stein von Quelle (Magazin/Turm) zu Ziel (Turm/Magazin) bewegen
+# piece_target: geplanter Turmplatz des Steins (0-basiert, -1 beim Abbau), übernommen erst bei der Ausführung
+Task = namedtuple(
+    "Task",
+    ["kind", "piece", "source_above", "source", "source_frame", "target_above", "target", "target_frame", "cycle",
+     "piece_target"]
+)
+
+BUILD = "build"
+CLEAR = "clear"
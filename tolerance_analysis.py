@@ -0,0 +1,268 @@
+# Monte-Carlo-Toleranzanalyse des Turmplans ohne RoboDK
+# Kalibrierfehler der Frames, Masstoleranzen der Steine und TCP-Fehler werden für viele Stichproben
+# gleichzeitig (NumPy, blockweise) durch den Turmplan propagiert und pro Layer ausgewertet
+#
+# Aufruf:
+#     python tolerance_analysis.py --samples 1000000 --layers 5
+#     python tolerance_analysis.py --layers 20 --piece-height 0.15 --contact-distance 5 --risk 0.001
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from jenga_piece_collection import JengaPieceCollection, STANDARD, PIECES_PER_LAYER
+from tower import Tower
+from offline_station import OfflineStation
+
+# Kennwerte eines Layers über alle Stichproben:
+# - overhang: Überstand über die Hüllfläche des darunterliegenden Layers in mm (max. über 4 Seiten)
+# - shift: Versatz des Layer-Mittelpunkts zum darunterliegenden Layer in mm
+# - offset: Versatz des Layer-Mittelpunkts zur geplanten Turmachse (base_x, base_y) in mm (inkl. Frame-Kalibrierung)
+# - z_error: Oberseite des Steins minus kommandierte Ablagehöhe in mm (> 0 Kontakt zu früh, < 0 Fallhöhe)
+# - margin: Abstand des Schwerpunkts aller darüberliegenden Steine zum Rand der Auflagefläche in mm
+# Pro Kennwert (Mittelwert, Standardabweichung, ungünstigster Wert), dazu die Wahrscheinlichkeiten
+# early_contact (z_error > contact_distance, Kontakt im schnellen Abschnitt) und unstable (margin < 0)
+LayerStats = namedtuple("LayerStats", "layer overhang shift offset z_error margin early_contact unstable")
+
+METRICS = ("overhang", "shift", "offset", "z_error", "margin")
+
+
+class ToleranceAnalysis:
+    """
+    Streuungen (Standardabweichungen, normalverteilt) der Einflussgrössen
+
+    - frame_xy/frame_z in mm, frame_yaw in Grad: Kalibrierung des Tower-Frames (pro Stichprobe), die
+      Drehung wirkt um den Frame-Ursprung und verschiebt den Turm über den Basisversatz (base_x, base_y)
+    - magazine_xy in mm, magazine_yaw in Grad: Kalibrierung des Magazins, der Stein hängt dadurch
+      versetzt am Greifer (pro Stichprobe für alle Steine gleich)
+    - tcp_xy/tcp_z in mm, tcp_yaw in Grad: Wiederholgenauigkeit bei jeder Ablage
+    - piece_length/piece_width/piece_height in mm: Masstoleranz jedes Steins
+
+    Die Sollwerte stammen aus Tower.calculate_piece_positions von `tower` mit Basisversatz (Standard:
+    Tower einer OfflineStation) und dem Steintyp `geometry`, contact_distance ohne Angabe aus der
+    zweistufigen Anfahrt des Turms (siehe RobotController.use_two_stage_contact).
+    """
+
+    def __init__(self, frame_xy=0.5, frame_z=0.2, frame_yaw=0.2, magazine_xy=0.5, magazine_yaw=0.3,
+                 tcp_xy=0.1, tcp_z=0.05, tcp_yaw=0.1, piece_length=0.3, piece_width=0.2, piece_height=0.1,
+                 tower=None, geometry=STANDARD, contact_distance=None):
+        self.frame_xy = frame_xy
+        self.frame_z = frame_z
+        self.frame_yaw = float(np.radians(frame_yaw))
+        self.magazine_xy = magazine_xy
+        self.magazine_yaw = float(np.radians(magazine_yaw))
+        self.tcp_xy = tcp_xy
+        self.tcp_z = tcp_z
+        self.tcp_yaw = float(np.radians(tcp_yaw))
+        self.piece_length = piece_length
+        self.piece_width = piece_width
+        self.piece_height = piece_height
+
+        self.tower = tower if tower is not None else Tower(OfflineStation())
+        self.piece = JengaPieceCollection(OfflineStation(), 1, geometry=geometry)[0]
+        self.length, self.width, self.height = self.piece.length, self.piece.width, self.piece.height
+        self.base_x, self.base_y = float(self.tower.base_x), float(self.tower.base_y)
+        self.base_z = float(self.tower.base_z)
+        self.contact_distance = self.tower.contact_distance if contact_distance is None else contact_distance
+
+    def nominal(self, layers):
+        """Sollposen im Tower-Frame (inkl. Basisversatz): Arrays (x, y, z, Drehung) der Länge layers * 3"""
+        slots = np.arange(1, layers * PIECES_PER_LAYER + 1)
+        x_offset, y_offset, z, rotation_z = self.tower.calculate_piece_positions(self.piece, slots)
+        return self.base_x + x_offset, self.base_y + y_offset, z, rotation_z
+
+    def sample(self, rng, count, layers):
+        """
+        Propagiert `count` Stichproben durch einen Turm mit `layers` Layern
+        Rückgabe: Dict Kennwert -> Array (count, layers), overhang/shift für Layer 0 sind 0, margin des obersten inf
+        """
+        n = layers * PIECES_PER_LAYER
+        x0, y0, z0, yaw0 = (a.astype(np.float32) for a in self.nominal(layers))
+
+        # Einfache Genauigkeit genügt für Abweichungen im Bereich von Hundertstelmillimetern
+        def normal(shape):
+            return rng.standard_normal(shape, dtype=np.float32)
+
+        # Frame-Kalibrierung: starre Verschiebung und Drehung des ganzen Turms um den Frame-Ursprung
+        frame_yaw = normal((count, 1)) * self.frame_yaw
+        c, s = np.cos(frame_yaw), np.sin(frame_yaw)
+        x = c * x0 - s * y0 + normal((count, 1)) * self.frame_xy
+        y = s * x0 + c * y0 + normal((count, 1)) * self.frame_xy
+
+        # Versatz des Steins am Greifer (Magazin) dreht mit der Ablageorientierung, dazu der TCP-Fehler
+        yaw = yaw0 + frame_yaw + normal((count, 1)) * self.magazine_yaw + normal((count, n)) * self.tcp_yaw
+        grip_x, grip_y = normal((count, 1)) * self.magazine_xy, normal((count, 1)) * self.magazine_xy
+        c, s = np.cos(yaw), np.sin(yaw)
+        x += c * grip_x - s * grip_y + normal((count, n)) * self.tcp_xy
+        y += s * grip_x + c * grip_y + normal((count, n)) * self.tcp_xy
+
+        # Masse der Steine, Hüllquader in der Turmebene (Längsachse entlang (-sin, cos) wie in plan_from_tower)
+        length = self.length + normal((count, n)) * self.piece_length
+        width = self.width + normal((count, n)) * self.piece_width
+        height = self.height + normal((count, n)) * self.piece_height
+        half_x = (np.abs(s) * length + np.abs(c) * width) / 2
+        half_y = (np.abs(c) * length + np.abs(s) * width) / 2
+
+        shape = (count, layers, PIECES_PER_LAYER)
+        x, y, half_x, half_y = (a.reshape(shape) for a in (x, y, half_x, half_y))
+        min_x, max_x = _layer(np.minimum, x - half_x), _layer(np.maximum, x + half_x)
+        min_y, max_y = _layer(np.minimum, y - half_y), _layer(np.maximum, y + half_y)
+        center_x, center_y = _layer(np.add, x) / PIECES_PER_LAYER, _layer(np.add, y) / PIECES_PER_LAYER
+
+        metrics = {}
+        overhang = np.zeros((count, layers), dtype=np.float32)
+        overhang[:, 1:] = np.maximum.reduce([
+            max_x[:, 1:] - max_x[:, :-1], min_x[:, :-1] - min_x[:, 1:],
+            max_y[:, 1:] - max_y[:, :-1], min_y[:, :-1] - min_y[:, 1:],
+        ])
+        metrics["overhang"] = overhang
+        shift = np.zeros((count, layers), dtype=np.float32)
+        shift[:, 1:] = np.hypot(np.diff(center_x, axis=1), np.diff(center_y, axis=1))
+        metrics["shift"] = shift
+        metrics["offset"] = np.hypot(center_x - self.base_x, center_y - self.base_y)
+
+        # Höhenfehler: ein Layer liegt auf seinem höchsten Stein auf, Fehler summieren sich nach oben
+        height = height.reshape(shape)
+        layer_height = _layer(np.maximum, height)
+        support = self.base_z + np.cumsum(layer_height, axis=1) - layer_height
+        top = support[:, :, None] + height
+        commanded = z0[::PIECES_PER_LAYER]
+        z_error = top - commanded[None, :, None] + normal(shape) * self.tcp_z + normal((count, 1, 1)) * self.frame_z
+        metrics["z_error"] = _layer(np.maximum, z_error)
+
+        # Standsicherheit: Schwerpunkt aller Steine oberhalb eines Layers gegen dessen Auflagefläche
+        mass = length.reshape(shape) * width.reshape(shape) * height
+        moment_x = np.cumsum(_layer(np.add, mass * x)[:, ::-1], axis=1)[:, ::-1]
+        moment_y = np.cumsum(_layer(np.add, mass * y)[:, ::-1], axis=1)[:, ::-1]
+        total = np.cumsum(_layer(np.add, mass)[:, ::-1], axis=1)[:, ::-1]
+        margin = np.full((count, layers), np.inf, dtype=np.float32)
+        com_x, com_y = moment_x[:, 1:] / total[:, 1:], moment_y[:, 1:] / total[:, 1:]
+        margin[:, :-1] = np.minimum.reduce([
+            com_x - min_x[:, :-1], max_x[:, :-1] - com_x, com_y - min_y[:, :-1], max_y[:, :-1] - com_y,
+        ])
+        metrics["margin"] = margin
+        return metrics
+
+    def run(self, samples=1_000_000, layers=5, chunk=100_000, seed=0):
+        """Blockweise Analyse, Rückgabe: Liste von LayerStats pro Layer"""
+        rng = np.random.default_rng(seed)
+        sums = {name: np.zeros(layers) for name in METRICS}
+        squares = {name: np.zeros(layers) for name in METRICS}
+        worst = {name: np.full(layers, -np.inf) for name in METRICS}
+        early_contact = np.zeros(layers)
+        unstable = np.zeros(layers)
+
+        for start in range(0, samples, chunk):
+            metrics = self.sample(rng, min(chunk, samples - start), layers)
+            for name in METRICS:
+                # Ungünstig ist beim Höhenfehler die grösste Abweichung, bei der Standsicherheit der kleinste Abstand
+                values = metrics[name]
+                if name == "margin":
+                    values = np.where(np.isfinite(values), values, 0.0)
+                sums[name] += values.sum(axis=0, dtype=np.float64)
+                squares[name] += np.square(values, dtype=np.float64).sum(axis=0)
+                if name == "margin":
+                    worst[name] = np.maximum(worst[name], -values.min(axis=0))
+                elif name == "z_error":
+                    worst[name] = np.maximum(worst[name], np.abs(values).max(axis=0))
+                else:
+                    worst[name] = np.maximum(worst[name], values.max(axis=0))
+            early_contact += (metrics["z_error"] > self.contact_distance).sum(axis=0)
+            unstable += (metrics["margin"] < 0).sum(axis=0)
+
+        stats = []
+        for layer in range(layers):
+            values = {}
+            for name in METRICS:
+                mean = sums[name][layer] / samples
+                std = np.sqrt(max(squares[name][layer] / samples - mean ** 2, 0.0))
+                bad = -worst[name][layer] if name == "margin" else worst[name][layer]
+                values[name] = (mean, std, bad)
+            stats.append(LayerStats(
+                layer + 1, values["overhang"], values["shift"], values["offset"], values["z_error"],
+                values["margin"], early_contact[layer] / samples, unstable[layer] / samples,
+            ))
+        return stats
+
+
+def _layer(ufunc, values):
+    """Verknüpft die Steine jedes Layers (letzte Achse) über ufunc, schneller als Reduktion über die kurze Achse"""
+    result = ufunc(values[..., 0], values[..., 1])
+    for i in range(2, values.shape[-1]):
+        result = ufunc(result, values[..., i])
+    return result
+
+
+def safe_layers(stats, risk=1e-3):
+    """Höchste Layerzahl, bis zu der Kontakt im schnellen Abschnitt und Kippen seltener als `risk` sind"""
+    count = 0
+    for layer in stats:
+        if layer.early_contact > risk or layer.unstable > risk:
+            break
+        count = layer.layer
+    return count
+
+
+def report(stats, risk=1e-3):
+    """Tabelle pro Layer (Mittelwert ± Standardabweichung, ungünstigster Wert) als Liste von Zeilen"""
+    lines = [f"{'layer':>5} {'overhang mm':>20} {'shift mm':>20} {'offset mm':>20} {'z error mm':>20} "
+             f"{'margin mm':>20} {'early':>8} {'tipping':>8}"]
+
+    def cell(values):
+        mean, std, bad = values
+        return f"{mean:6.2f}±{std:5.2f} ({bad:6.2f})"
+
+    for layer in stats:
+        margin = cell(layer.margin) if layer.layer < len(stats) else f"{'-':>20}"
+        lines.append(f"{layer.layer:>5} {cell(layer.overhang):>20} {cell(layer.shift):>20} {cell(layer.offset):>20} "
+                     f"{cell(layer.z_error):>20} {margin:>20} {layer.early_contact:8.1e} {layer.unstable:8.1e}")
+    lines.append(f"Safe tower height at risk {risk:g}: {safe_layers(stats, risk)} of {len(stats)} layers")
+    return lines
+
+
+def main(samples=1_000_000, layers=5, chunk=100_000, seed=0, risk=1e-3, **tolerances):
+    """Führt die Analyse aus und gibt den Bericht aus"""
+    analysis = ToleranceAnalysis(**tolerances)
+    start = time.perf_counter()
+    stats = analysis.run(samples, layers, chunk, seed)
+    elapsed = time.perf_counter() - start
+    print(f"{samples} samples x {layers * PIECES_PER_LAYER} pieces in {elapsed:.2f} s "
+          f"(contact distance {analysis.contact_distance} mm)")
+    for line in report(stats, risk):
+        print(line)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte-Carlo-Toleranzanalyse des Turmplans")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Anzahl Stichproben")
+    parser.add_argument("--layers", type=int, default=5, help="Anzahl Layer des Turms")
+    parser.add_argument("--chunk", type=int, default=100_000, help="Stichproben pro Block (Speicherbedarf)")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--risk", type=float, default=1e-3, help="Zulässige Wahrscheinlichkeit pro Layer")
+    parser.add_argument("--contact-distance", type=float, default=None,
+                        help="Langsamer Abschnitt vor der Ablage in mm (Standard: Tower.contact_distance)")
+    parser.add_argument("--frame-xy", type=float, default=0.5, help="Kalibrierung Tower-Frame x/y in mm")
+    parser.add_argument("--frame-yaw", type=float, default=0.2, help="Kalibrierung Tower-Frame Drehung in Grad")
+    parser.add_argument("--magazine-xy", type=float, default=0.5, help="Kalibrierung Magazin x/y in mm")
+    parser.add_argument("--tcp-xy", type=float, default=0.1, help="TCP-Fehler pro Ablage x/y in mm")
+    parser.add_argument("--piece-width", type=float, default=0.2, help="Masstoleranz Steinbreite in mm")
+    parser.add_argument("--piece-height", type=float, default=0.1, help="Masstoleranz Steinhöhe in mm")
+    args = parser.parse_args()
+
+    main(
+        args.samples,
+        args.layers,
+        args.chunk,
+        args.seed,
+        args.risk,
+        contact_distance=args.contact_distance,
+        frame_xy=args.frame_xy,
+        frame_yaw=args.frame_yaw,
+        magazine_xy=args.magazine_xy,
+        tcp_xy=args.tcp_xy,
+        piece_width=args.piece_width,
+        piece_height=args.piece_height
+    )
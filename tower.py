@@ -1,5 +1,10 @@
+import numpy as np
 from robodk.robomath import *
 
+from configuration_selector import symmetric_variants
+from jenga_piece_collection import PIECES_PER_LAYER
+from transforms import to_array, to_mat, gripper_targets
+
 class Tower:
     """Verwaltet Tower-Frame und Stein-Platzierung mit dynamischer Formel"""
     
@@ -14,75 +19,90 @@ class Tower:
         self.base_x = 0      
         self.base_y = 70     
         self.base_z = 5     
+        
+        # Zweistufige Anfahrt der Ablagepose (siehe RobotController.use_two_stage_contact):
+        # die letzten contact_distance mm mit slow_speed, die Strecke davor mit fast_speed (mm/s)
+        self.contact_distance = 5
+        self.fast_speed = 100
+        self.slow_speed = 10
+        
+        # Optionale Auswahl der Greiforientierung (siehe ConfigurationSelector)
+        self.selector = None
     
-    def calculate_piece_position(self, piece):
+    def calculate_piece_position(self, piece, slot=None):
         """
         Berechnet Position für Jenga-Stein mit dynamischer Formel
         Rückgabe: (x_offset, y_offset, z, rotation_z)
         
+        Ohne Angabe von slot wird der Turmplatz aus der Steinnummer abgeleitet,
+        ansonsten wird der Stein auf den gegebenen Turmplatz (1-basiert) gesetzt.
+        """
+        slot = piece.number if slot is None else slot
+        x_offset, y_offset, z, rotation_z = self.calculate_piece_positions(piece, [slot])
+        return float(x_offset[0]), float(y_offset[0]), float(z[0]), float(rotation_z[0])
+    
+    def calculate_piece_positions(self, piece, slots):
+        """
+        Berechnet Positionen für viele Turmplätze (1-basiert) mit der Geometrie von piece
+        Rückgabe: Arrays (x_offset, y_offset, z, rotation_z)
+        
         Jenga-Turm-Logik:
         - Gerade Layer (0,2,4...): Steine entlang X-Achse, Verteilung in Y-Richtung
         - Ungerade Layer (1,3,5...): Steine entlang Y-Achse, Verteilung in X-Richtung
         - Rotation bestimmt Ausrichtung und Abstandsberechnung zwischen Steinen
         """
-        # Konvertierung zu 0-basiertem Index für Berechnungen
-        piece_index = piece.number - 1
+        # Konvertierung zu 0-basiertem Index, Layer (0-basiert) und Position innerhalb des Layers
+        piece_index = np.asarray(slots) - 1
+        layer = piece_index // PIECES_PER_LAYER
         
-        # Berechnung Layer (0-basiert) und Position innerhalb des Layers
-        layer = piece_index // 3
-        index_in_layer = piece_index % 3
-        
-        # Bestimmung ob gerader oder ungerader Layer (alternierende Orientierungen)
+        # Muster: -WIDTH, 0, +WIDTH
+        offset = (piece_index % PIECES_PER_LAYER - 1) * piece.width
         is_even_layer = (layer % 2 == 0)
         
-        # Z-Position basierend auf Layer-Höhe und Stein-Eigenschaften
+        # Gerade Layer: 90° Rotation, Verteilung in Y-Richtung; ungerade Layer: 0°, Verteilung in X-Richtung
+        x_offset = np.where(is_even_layer, 0, offset)
+        y_offset = np.where(is_even_layer, offset, 0)
         z = (layer + 1) * piece.height + self.base_z
-        
-        if is_even_layer:
-            # Gerade Layer: Steine horizontal entlang X-Achse ausgerichtet
-            # 90° Rotation: Steine werden in Y-Richtung mit WIDTH-Abstand verteilt
-            x_offset = 0
-            y_offset = (index_in_layer - 1) * piece.width  # Muster: -WIDTH, 0, +WIDTH
-            rotation_z = pi/2  # 90 Grad Rotation
-        else:
-            # Ungerade Layer: Steine vertikal entlang Y-Achse ausgerichtet  
-            # 0° Rotation: Steine werden in X-Richtung mit WIDTH-Abstand verteilt
-            x_offset = (index_in_layer - 1) * piece.width # Muster: -WIDTH, 0, +WIDTH
-            y_offset = 0
-            rotation_z = 0  # 0 Grad Rotation (natürliche Ausrichtung)
-        
+        rotation_z = np.where(is_even_layer, pi/2, 0)
         return x_offset, y_offset, z, rotation_z
     
-    def get_placement_pose(self, piece, hover_height=30):
-        """Berechnet Platzierungs-Pose für Jenga-Stein mit dynamischer Formel"""
-        # Positionsberechnung basierend auf Stein-Objekt
-        piece_number = piece.number
+    def get_placement_pose_arrays(self, piece, slots, hover_height=30, rotation_offset=0, frame_pose=None):
+        """
+        Anfahr- und Platzierungsposen (N, 4, 4) für viele Turmplätze in einem Schritt
+        frame_pose: Pose des Tower-Frames als (4, 4), Standard: aktuelle Pose in RoboDK
+        rotation_offset: zusätzliche Drehung um die Hochachse (pi für die symmetrische Variante)
+        """
+        if frame_pose is None:
+            frame_pose = to_array(self.frame.Pose())
         
-        x_offset, y_offset, z, rotation_z = self.calculate_piece_position(piece)
+        x_offset, y_offset, z, rotation_z = self.calculate_piece_positions(piece, slots)
+        x = self.base_x + x_offset
+        y = self.base_y + y_offset
+        rotation = rotation_z + rotation_offset
         
-        # Berechnung absoluter Positionen im Tower-Frame
-        abs_x = self.base_x + x_offset
-        abs_y = self.base_y + y_offset
-        abs_z = z
+        place_above = gripper_targets(frame_pose, x, y, z + hover_height, rotation)
+        place = gripper_targets(frame_pose, x, y, z, rotation)
+        return place_above, place
+    
+    def get_placement_pose(self, piece, hover_height=30, slot=None):
+        """Berechnet Platzierungs-Pose für Jenga-Stein mit dynamischer Formel"""
+        slot = piece.number if slot is None else slot
+        frame_pose = to_array(self.frame.Pose())
         
-        # Erstellung der Ziel-Posen mit Koordinatentransformation
-        place_above = (
-            self.frame.Pose() * 
-            transl(abs_x, abs_y, abs_z + hover_height) * 
-            rotz(rotation_z) * 
-            rotx(pi)  # 180° Rotation für korrekte Greifer-Orientierung
-        )
+        def poses(rotation_offset):
+            # Ziel-Posen über den gemeinsamen Transformationskern, Mat nur an der Schnittstelle
+            place_above, place = self.get_placement_pose_arrays(
+                piece, [slot], hover_height, rotation_offset, frame_pose
+            )
+            return to_mat(place_above[0]), to_mat(place[0])
         
-        place = (
-            self.frame.Pose() * 
-            transl(abs_x, abs_y, abs_z) * 
-            rotz(rotation_z) * 
-            rotx(pi)  # 180° Rotation für korrekte Greifer-Orientierung
-        )
+        # Stein ist um 180° symmetrisch: Orientierung mit kürzester Gelenkbewegung wählen
+        if self.selector is not None:
+            return self.selector.select(symmetric_variants(poses, 0))
         
-        return place_above, place
+        return poses(0)
     
     def get_layer_for_piece(self, piece):
-        """Bestimmt Layer-Nummer (0-basiert) für gegebenen Jenga-Stein"""
-        return (piece.number - 1) // 3
+        """Bestimmt Layer-Nummer (0-basiert) aus dem Zielplatz des Steins (-1 ohne Zielplatz)"""
+        return piece.target // PIECES_PER_LAYER if piece.target >= 0 else -1
     
@@ -0,0 +1,199 @@
+# Hochfrequente Aufzeichnung der Roboterbahn in einen speicherabgebildeten Ringpuffer
+# Gelenkwerte, TCP-Pose, TCP-Geschwindigkeit und I/O-Zustand werden mit fester Rate abgetastet
+# und direkt in eine vorab angelegte Datei geschrieben (bleibt auch nach einem Absturz erhalten)
+
+import math
+import threading
+import time
+
+import numpy as np
+
+# Kennung und Aufbau der Datei: Kopf (HEADER_SIZE Bytes) gefolgt von `capacity` Datensätzen
+MAGIC = b"JTRAJ01"
+HEADER_SIZE = 512
+MAX_SIGNALS = 8
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("capacity", "<u8"),
+    ("count", "<u8"),
+    ("rate", "<f8"),
+    ("start", "<f8"),
+    ("signals", "<u4"),
+    ("names", "S32", MAX_SIGNALS),
+])
+
+
+def record_dtype(signals):
+    """Datensatz: Zeit, Gelenkwerte, TCP-Pose [R|p], TCP-Geschwindigkeit, Stein, I/O-Werte"""
+    return np.dtype([
+        ("time", "<f8"),
+        ("joints", "<f8", 6),
+        ("tcp", "<f8", (3, 4)),
+        ("speed", "<f8"),
+        ("piece", "<i4"),
+        ("io", "<f8", signals),
+    ])
+
+
+def _open(path, mode, capacity=None, signals=None):
+    """Kopf und Datensätze einer Aufzeichnung als Memory-Maps"""
+    header = np.memmap(path, HEADER_DTYPE, mode, shape=1)
+    if capacity is None:
+        if header["magic"][0] != MAGIC:
+            raise Exception(f"{path} is not a trajectory recording")
+        capacity, signals = int(header["capacity"][0]), int(header["signals"][0])
+    records = np.memmap(path, record_dtype(signals), mode, offset=HEADER_SIZE, shape=capacity)
+    return header, records
+
+
+class TrajectoryRecorder:
+    """
+    Tastet den Roboter in einem Hintergrund-Thread mit `rate` Hz ab
+
+    Da Robolink nicht threadsicher ist, muss `robot` von einer eigenen Verbindung stammen
+    (z.B. Robolink().Item('Staubli TX2-40')). `signals` ist ein Dict Name -> Funktion,
+    welche den aktuellen Wert des Anschlusses liefert (höchstens MAX_SIGNALS).
+
+    Der Ringpuffer fasst `capacity` Datensätze, danach werden die ältesten überschrieben.
+    Im Abtastpfad wird nur in die vorab angelegte Datei geschrieben, der Zähler im Kopf wird
+    erst nach dem vollständigen Datensatz erhöht (Leser sehen keine halben Datensätze).
+    """
+
+    def __init__(self, robot, path, rate=250, capacity=250 * 600, signals=None, clock=time.perf_counter):
+        self.robot = robot
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.signals = dict(signals or {})
+        self.clock = clock
+        if len(self.signals) > MAX_SIGNALS:
+            raise Exception(f"At most {MAX_SIGNALS} I/O signals can be recorded")
+
+        # Datei in voller Grösse anlegen, danach keine Allokation mehr
+        with open(path, "wb") as f:
+            f.truncate(HEADER_SIZE + capacity * record_dtype(len(self.signals)).itemsize)
+        self.header, self.records = _open(path, "r+", capacity, len(self.signals))
+        self.header["magic"] = MAGIC
+        self.header["capacity"] = capacity
+        self.header["count"] = 0
+        self.header["rate"] = rate
+        self.header["signals"] = len(self.signals)
+        for i, name in enumerate(self.signals):
+            self.header["names"][0, i] = name.encode()
+        self.header.flush()
+
+        # Aktueller Stein (wird vom RobotController gesetzt, 0 = kein Stein)
+        self.piece = 0
+
+        self._readers = list(self.signals.values())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Startet die Abtastung"""
+        if self._thread is not None:
+            return
+        self.header["start"] = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Beendet die Abtastung und schreibt die Datei zurück"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.records.flush()
+        self.header.flush()
+        count = int(self.header["count"][0])
+        print(f"Recorded {count} trajectory samples ({min(count, self.capacity)} kept) to {self.path}")
+
+    def _run(self):
+        period = 1.0 / self.rate
+        capacity, header = self.capacity, self.header
+        times, joints, tcp = self.records["time"], self.records["joints"], self.records["tcp"]
+        speeds, pieces, io = self.records["speed"], self.records["piece"], self.records["io"]
+        count = 0
+        last_time = last_position = None
+        start = next_time = self.clock()
+
+        while not self._stop.is_set():
+            # Datensatz direkt in die Felder des Ringpuffers schreiben
+            i = count % capacity
+            now = self.clock() - start
+            pose = self.robot.Pose()
+            position = pose.Pos()
+            times[i] = now
+            joints[i] = self.robot.Joints().list()[:6]
+            tcp[i] = pose.rows[:3]
+            speeds[i] = 0
+            if last_time is not None and now > last_time:
+                speeds[i] = math.dist(position, last_position) / (now - last_time)
+            pieces[i] = self.piece
+            for k, read in enumerate(self._readers):
+                io[i, k] = read()
+            last_time, last_position = now, position
+
+            count += 1
+            header["count"] = count
+
+            # Feste Rate, verpasste Abtastzeitpunkte werden nicht nachgeholt
+            next_time += period
+            delay = next_time - self.clock()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_time = self.clock()
+
+
+class TrajectoryReader:
+    """
+    Liest eine Aufzeichnung (auch während sie noch geschrieben wird) ohne Kopien
+
+    segments() liefert die gültigen Datensätze in zeitlicher Reihenfolge als ein bis zwei
+    Views auf die Datei (zwei, sobald der Ringpuffer übergelaufen ist).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header, self.records = _open(path, "r")
+        self.capacity = int(self.header["capacity"][0])
+        self.rate = float(self.header["rate"][0])
+        self.names = [name.decode() for name in self.header["names"][0, :int(self.header["signals"][0])]]
+
+    @property
+    def count(self):
+        """Anzahl bisher geschriebener Datensätze (inkl. überschriebener)"""
+        return int(self.header["count"][0])
+
+    def segments(self):
+        """Gültige Datensätze als Views in zeitlicher Reihenfolge"""
+        count = self.count
+        if count <= self.capacity:
+            return [self.records[:count]]
+        split = count % self.capacity
+        return [part for part in (self.records[split:], self.records[:split]) if len(part)]
+
+    def field(self, name):
+        """Ein Feld über alle gültigen Datensätze (View, nach Überlauf des Ringpuffers eine Kopie)"""
+        parts = [segment[name] for segment in self.segments()]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def signal(self, name):
+        """Verlauf eines aufgezeichneten I/O-Anschlusses"""
+        return self.field("io")[:, self.names.index(name)]
+
+    def piece_durations(self):
+        """Dauer pro Stein in Sekunden (für Ausreisser der Zykluszeit): Steinnummer -> Liste der Dauern"""
+        times, pieces = self.field("time"), self.field("piece")
+        changes = np.flatnonzero(np.diff(pieces)) + 1
+        starts = np.concatenate([[0], changes])
+        ends = np.concatenate([changes, [len(pieces)]])
+
+        durations = {}
+        for start, end in zip(starts, ends):
+            if pieces[start] > 0 and end > start:
+                durations.setdefault(int(pieces[start]), []).append(float(times[end - 1] - times[start]))
+        return durations
@@ -0,0 +1,105 @@
+# Vergleich der Posenberechnung: robomath.Mat-Ketten pro Turmplatz gegen Tower.get_placement_pose_arrays,
+# Layout-Raster über robomath.Mat-Ketten gegen den NumPy-Transformationskern
+# Läuft ohne RoboDK (OfflineStation) mit fester Frame-Pose und Standard-Steingeometrie
+#
+# Aufruf:
+#     python transform_benchmark.py --slots 3000 --frames 500 --repeat 3
+
+import argparse
+import time
+
+import numpy as np
+from robodk.robomath import transl, rotz, rotx, invH, pi
+
+from transforms import to_array, to_mats, compose, inverse, translations, rotations_z
+from tower import Tower
+from jenga_piece_collection import JengaPieceCollection
+from offline_station import OfflineStation
+
+# Feste Frame-Pose (entspricht einer typischen Turmplatzierung in der Station)
+FRAME = transl(450, -150, 20) * rotz(0.35)
+
+
+def tower_targets_mat(tower, piece, slots, hover_height=30):
+    """Bisheriger Weg: Mat-Kette Frame * transl * rotz * rotx(pi) pro Turmplatz (Anfahr- und Platzierungspose)"""
+    poses = []
+    for slot in slots:
+        x_offset, y_offset, z, rotation_z = tower.calculate_piece_position(piece, slot)
+        x, y = tower.base_x + x_offset, tower.base_y + y_offset
+        poses.append(tower.frame.Pose() * transl(x, y, z + hover_height) * rotz(rotation_z) * rotx(pi))
+        poses.append(tower.frame.Pose() * transl(x, y, z) * rotz(rotation_z) * rotx(pi))
+    return poses
+
+
+def tower_targets_batched(tower, piece, slots, hover_height=30):
+    """Tower.get_placement_pose_arrays: alle Posen in einem Schritt, (2N, 4, 4)"""
+    return np.concatenate(tower.get_placement_pose_arrays(piece, slots, hover_height))
+
+
+def layout_sweep_mat(frames, targets):
+    """Bisheriger Weg: Ziele relativ zu jedem Kandidaten-Frame über Mat-Multiplikation und invH"""
+    return [invH(frame) * target for frame in frames for target in targets]
+
+
+def layout_sweep_batched(frames, targets):
+    """Transformationskern: (C, 1, 4, 4) x (1, S, 4, 4)"""
+    return compose(inverse(frames)[:, None], targets[None])
+
+
+def _time(function, repeat):
+    """Beste Laufzeit aus `repeat` Durchläufen in Sekunden"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(slots=3000, frames=500, repeat=3):
+    """Misst beide Wege und prüft, dass sie dieselben Posen liefern"""
+    station = OfflineStation({"TowerFrame": FRAME})
+    tower = Tower(station)
+    piece = JengaPieceCollection(station, 1)[0]
+
+    slot_numbers = list(range(1, slots + 1))
+    print(f"Tower targets for {slots} slots ({2 * slots} poses):")
+    mat_time, mat_poses = _time(lambda: tower_targets_mat(tower, piece, slot_numbers), repeat)
+    batch_time, batch_poses = _time(lambda: tower_targets_batched(tower, piece, slot_numbers), repeat)
+    boundary_time, _ = _time(lambda: to_mats(tower_targets_batched(tower, piece, slot_numbers)), repeat)
+
+    # Reihenfolge der Einzelaufrufe: (above, place) pro Platz
+    reference = to_array(mat_poses).reshape(slots, 2, 4, 4).swapaxes(0, 1).reshape(-1, 4, 4)
+    error = np.max(np.abs(reference - batch_poses))
+    print(f"  Mat chain:           {mat_time * 1000:9.1f} ms")
+    print(f"  batched:             {batch_time * 1000:9.1f} ms  ({mat_time / batch_time:.0f}x)")
+    print(f"  batched + Mat out:   {boundary_time * 1000:9.1f} ms  ({mat_time / boundary_time:.0f}x)")
+    print(f"  max deviation:       {error:.2e} mm")
+
+    # Layout-Raster: Kandidaten-Frames x Ziele eines Turms
+    rng = np.random.default_rng(0)
+    shifts = rng.uniform(-150, 150, (frames, 2))
+    candidates = compose(
+        to_array(FRAME), translations(shifts[:, 0], shifts[:, 1], 0), rotations_z(rng.uniform(-pi, pi, frames))
+    )
+    targets = tower_targets_batched(tower, piece, list(range(1, 16)))
+    candidate_mats, target_mats = to_mats(candidates), to_mats(targets)
+
+    print(f"Layout sweep for {frames} frames x {len(targets)} targets:")
+    mat_time, mat_result = _time(lambda: layout_sweep_mat(candidate_mats, target_mats), repeat)
+    batch_time, batch_result = _time(lambda: layout_sweep_batched(candidates, targets), repeat)
+    error = np.max(np.abs(to_array(mat_result).reshape(batch_result.shape) - batch_result))
+    print(f"  Mat chain:           {mat_time * 1000:9.1f} ms")
+    print(f"  batched:             {batch_time * 1000:9.1f} ms  ({mat_time / batch_time:.0f}x)")
+    print(f"  max deviation:       {error:.2e} mm")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Mat-Ketten gegen Transformationskern")
+    parser.add_argument("--slots", type=int, default=3000, help="Anzahl Turmplätze")
+    parser.add_argument("--frames", type=int, default=500, help="Anzahl Kandidaten-Frames im Layout-Raster")
+    parser.add_argument("--repeat", type=int, default=3, help="Anzahl Messungen (beste zählt)")
+    args = parser.parse_args()
+
+    main(args.slots, args.frames, args.repeat)
@@ -0,0 +1,125 @@
+# Vektorisierte homogene Transformationen (NumPy) für viele Posen gleichzeitig
+# Ersetzt Ketten aus robomath.Mat-Multiplikationen, Umwandlung von/zu Mat nur an der API-Grenze
+
+import numpy as np
+from robodk.robomath import Mat
+
+# Drehung um 180° um die x-Achse (Greiferorientierung nach unten)
+FLIP_X = np.diag([1.0, -1.0, -1.0, 1.0])
+
+
+def to_array(pose):
+    """Mat (bzw. Liste von Mats) -> (4, 4) bzw. (N, 4, 4)"""
+    if isinstance(pose, Mat):
+        return np.array(pose.rows, dtype=float)
+    return np.array([p.rows for p in pose], dtype=float)
+
+
+def to_mat(T):
+    """(4, 4) -> Mat"""
+    return Mat(T.tolist())
+
+
+def to_mats(T):
+    """(N, 4, 4) -> Liste von Mats"""
+    return [Mat(rows) for rows in T.tolist()]
+
+
+def translations(x, y, z):
+    """Reine Verschiebungen (N, 4, 4), Argumente als Skalare oder Arrays (werden ausgedehnt)"""
+    x, y, z = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (x, y, z)))
+    T = np.zeros(x.shape + (4, 4))
+    T[..., 0, 0] = T[..., 1, 1] = T[..., 2, 2] = T[..., 3, 3] = 1
+    T[..., 0, 3], T[..., 1, 3], T[..., 2, 3] = x, y, z
+    return T
+
+
+def rotations_z(angles):
+    """Drehungen um die z-Achse (..., 4, 4), Winkel in Radiant"""
+    angles = np.asarray(angles, dtype=float)
+    c, s = np.cos(angles), np.sin(angles)
+    T = np.zeros(angles.shape + (4, 4))
+    T[..., 0, 0], T[..., 0, 1], T[..., 1, 0], T[..., 1, 1] = c, -s, s, c
+    T[..., 2, 2] = T[..., 3, 3] = 1
+    return T
+
+
+def compose(*transforms):
+    """Verkettung von links nach rechts (entspricht A * B * C mit Mat), Batches werden ausgedehnt"""
+    result = transforms[0]
+    for T in transforms[1:]:
+        result = np.matmul(result, T)
+    return result
+
+
+def inverse(T):
+    """Inverse starrer Transformationen (..., 4, 4) über Transponierte der Rotation"""
+    R = np.swapaxes(T[..., :3, :3], -1, -2)
+    inv = np.zeros_like(T)
+    inv[..., :3, :3] = R
+    inv[..., :3, 3] = -np.einsum("...ij,...j->...i", R, T[..., :3, 3])
+    inv[..., 3, 3] = 1
+    return inv
+
+
+def transform_points(T, points):
+    """Wendet (..., 4, 4) auf Punkte (..., 3) an"""
+    return np.einsum("...ij,...j->...i", T[..., :3, :3], points) + T[..., :3, 3]
+
+
+def to_xyzrxyz(T, degrees=False):
+    """
+    Posen (..., 4, 4) -> (..., 6) als [x, y, z, rx, ry, rz] mit T = transl * rotx * roty * rotz
+    Entspricht robomath.Pose_2_TxyzRxyz, mit degrees=True dem Staubli-Format (VAL3-Punkte).
+    """
+    sy = np.clip(T[..., 0, 2], -1.0, 1.0)
+    cy = np.sqrt(1 - sy ** 2)
+    singular = cy < 1e-5
+    rx = np.where(singular, 0.0, np.arctan2(-T[..., 1, 2], T[..., 2, 2]))
+    ry = np.arctan2(sy, cy)
+    rz = np.where(singular, np.arctan2(T[..., 1, 0], T[..., 1, 1]), np.arctan2(-T[..., 0, 1], T[..., 0, 0]))
+    angles = np.stack([rx, ry, rz], axis=-1)
+    if degrees:
+        angles = np.degrees(angles)
+    return np.concatenate([T[..., :3, 3], angles], axis=-1)
+
+
+def from_xyzrxyz(values, degrees=False):
+    """(..., 6) als [x, y, z, rx, ry, rz] -> Posen (..., 4, 4), Umkehrung von to_xyzrxyz"""
+    values = np.asarray(values, dtype=float)
+    angles = np.radians(values[..., 3:]) if degrees else values[..., 3:]
+    sx, sy, sz = np.sin(angles[..., 0]), np.sin(angles[..., 1]), np.sin(angles[..., 2])
+    cx, cy, cz = np.cos(angles[..., 0]), np.cos(angles[..., 1]), np.cos(angles[..., 2])
+
+    T = translations(values[..., 0], values[..., 1], values[..., 2])
+    T[..., 0, 0], T[..., 0, 1], T[..., 0, 2] = cy * cz, -cy * sz, sy
+    T[..., 1, 0], T[..., 1, 1], T[..., 1, 2] = cx * sz + cz * sx * sy, cx * cz - sx * sy * sz, -cy * sx
+    T[..., 2, 0], T[..., 2, 1], T[..., 2, 2] = sx * sz - cx * cz * sy, cz * sx + cx * sy * sz, cx * cy
+    return T
+
+
+def offset_towards(T, target, distance):
+    """
+    Verschiebt Posen (..., 4, 4) um `distance` entlang der Geraden zur Position von `target` (Orientierung bleibt)
+    Rückgabe: (Posen, Abstand zum Ziel), bei kürzerem Abstand liegt die Pose auf dem Ziel
+    """
+    direction = target[..., :3, 3] - T[..., :3, 3]
+    length = np.linalg.norm(direction, axis=-1)
+    scale = np.minimum(distance, length) / np.where(length > 0, length, 1)
+    result = T.copy()
+    result[..., :3, 3] += direction * scale[..., None]
+    return result, length
+
+
+def flange_poses(reference, targets, tool_inv):
+    """Werkzeugziele (..., 4, 4) im Referenzsystem -> Flanschposen relativ zur Roboterbasis (für die IK)"""
+    return compose(reference, targets, tool_inv)
+
+
+def gripper_targets(frame, x, y, z, rotation=0.0):
+    """
+    Greifposen frame * transl(x, y, z) * rotz(rotation) * rotx(pi) für viele Punkte (N, 4, 4)
+    Gemeinsamer Baustein der Aufnahme- und Ablageposen von Magazin und Turm.
+    """
+    x, y, z, rotation = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (x, y, z, rotation)))
+    return compose(frame, translations(x, y, z), rotations_z(rotation), FLIP_X)
@@ -0,0 +1,126 @@
+# Vektorisierte Kinematik des Staubli TX2-40 (NumPy)
+# Vorwärts- und Rückwärtstransformation für viele Posen gleichzeitig, ohne RoboDK-Aufrufe
+
+import numpy as np
+
+# DH-Parameter (Standard-Konvention) des TX2-40 in mm bzw. Grad:
+# Zeile = Achse, Spalten = (a, alpha, d, theta_offset)
+TX2_40_DH = np.array([
+    [0,   -90, 320,   0],
+    [225,   0,   0, -90],
+    [0,    90,  35,  90],
+    [0,   -90, 225,   0],
+    [0,    90,   0,   0],
+    [0,     0,  65,   0],
+], dtype=float)
+
+# Achsgrenzen in Grad
+TX2_40_LOWER = np.array([-180, -125, -138, -270, -120, -270], dtype=float)
+TX2_40_UPPER = np.array([180, 125, 138, 270, 133.5, 270], dtype=float)
+
+
+def _dh(theta, a, alpha, d):
+    """Batch von DH-Transformationen (..., 4, 4), theta in Radiant"""
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    T = np.zeros(theta.shape + (4, 4))
+    T[..., 0, 0] = ct
+    T[..., 0, 1] = -st * ca
+    T[..., 0, 2] = st * sa
+    T[..., 0, 3] = a * ct
+    T[..., 1, 0] = st
+    T[..., 1, 1] = ct * ca
+    T[..., 1, 2] = -ct * sa
+    T[..., 1, 3] = a * st
+    T[..., 2, 1] = sa
+    T[..., 2, 2] = ca
+    T[..., 2, 3] = d
+    T[..., 3, 3] = 1
+    return T
+
+
+def forward(joints, dh=TX2_40_DH, axes=6):
+    """Flanschpose(n) relativ zur Roboterbasis für Gelenkwerte (..., 6) in Grad"""
+    joints = np.radians(np.asarray(joints, dtype=float))
+    T = np.broadcast_to(np.eye(4), joints.shape[:-1] + (4, 4))
+    for i in range(axes):
+        a, alpha, d, offset = dh[i]
+        T = T @ _dh(joints[..., i] + np.radians(offset), a, np.radians(alpha), d)
+    return T
+
+
+def inverse(poses, dh=TX2_40_DH):
+    """
+    Alle Lösungen der Rückwärtstransformation für Flanschposen (N, 4, 4) relativ zur Roboterbasis
+    Rückgabe: joints (N, 8, 6) in Grad und valid (N, 8) für Schulter x Ellbogen x Handgelenk
+
+    Die Grenzen der Achsen werden hier nicht geprüft (siehe within_limits).
+    """
+    poses = np.asarray(poses, dtype=float)
+    n = len(poses)
+    d1, a2, d3, d4, d6 = dh[0, 2], dh[1, 0], dh[2, 2], dh[3, 2], dh[5, 2]
+
+    # Handgelenkzentrum: Flansch um d6 entlang der Werkzeugachse zurück
+    w = poses[:, :3, 3] - d6 * poses[:, :3, 2]
+    rho2 = w[:, 0] ** 2 + w[:, 1] ** 2
+    v = d1 - w[:, 2]
+
+    joints = np.zeros((n, 8, 6))
+    valid = np.zeros((n, 8), dtype=bool)
+
+    for shoulder, sign in enumerate((1, -1)):
+        # Seitlicher Versatz d3 zwischen Schulter und Ellbogen
+        radial2 = rho2 - d3 ** 2
+        u = sign * np.sqrt(np.maximum(radial2, 0))
+        theta1 = np.arctan2(w[:, 1], w[:, 0]) - np.arctan2(d3, u)
+
+        # Ebener Zweigelenkarm (a2, d4): sin(theta3) aus dem Abstand zum Handgelenkzentrum
+        s3 = (u ** 2 + v ** 2 - a2 ** 2 - d4 ** 2) / (2 * a2 * d4)
+        reachable = (radial2 >= 0) & (np.abs(s3) <= 1)
+        base3 = np.arcsin(np.clip(s3, -1, 1))
+
+        for elbow, theta3 in enumerate((base3, np.pi - base3)):
+            k1 = a2 + d4 * np.sin(theta3)
+            k2 = d4 * np.cos(theta3)
+            theta2 = np.arctan2(v, u) - np.arctan2(-k2, k1)
+
+            arm = np.stack([theta1, theta2, theta3], axis=1)
+            q_arm = np.degrees(arm) - dh[:3, 3]
+
+            # Handgelenk: R36 = Rz(theta4) * Ry(theta5) * Rz(theta6)
+            R03 = forward(np.concatenate([q_arm, np.zeros((n, 3))], axis=1), dh, axes=3)[:, :3, :3]
+            R36 = np.swapaxes(R03, 1, 2) @ poses[:, :3, :3]
+            theta5 = np.arctan2(np.hypot(R36[:, 0, 2], R36[:, 1, 2]), R36[:, 2, 2])
+            theta4 = np.arctan2(R36[:, 1, 2], R36[:, 0, 2])
+            theta6 = np.arctan2(R36[:, 2, 1], -R36[:, 2, 0])
+
+            for wrist, (t4, t5, t6) in enumerate(((theta4, theta5, theta6),
+                                                  (theta4 + np.pi, -theta5, theta6 + np.pi))):
+                k = shoulder * 4 + elbow * 2 + wrist
+                q_wrist = np.degrees(np.stack([t4, t5, t6], axis=1)) - dh[3:, 3]
+                joints[:, k] = np.concatenate([q_arm, q_wrist], axis=1)
+                valid[:, k] = reachable
+
+    # Winkel auf (-180, 180] normieren
+    joints = (joints + 180) % 360 - 180
+    return joints, valid
+
+
+def within_limits(joints, lower=TX2_40_LOWER, upper=TX2_40_UPPER):
+    """Maske der Lösungen innerhalb der Achsgrenzen"""
+    return np.all((joints >= lower) & (joints <= upper), axis=-1)
+
+
+def check_model(robot, samples=10, tolerance=0.5, seed=0):
+    """
+    Vergleicht die Vorwärtstransformation mit RoboDK (robot.SolveFK) an zufälligen Gelenkwerten
+    Wirft eine Exception, falls das Modell nicht zum Roboter in der Station passt.
+    """
+    rng = np.random.default_rng(seed)
+    joints = rng.uniform(TX2_40_LOWER * 0.8, TX2_40_UPPER * 0.8, size=(samples, 6))
+    model = forward(joints)
+    for q, T in zip(joints, model):
+        reference = np.array(robot.SolveFK(q.tolist()).rows, dtype=float)
+        error = np.max(np.abs(reference[:3, 3] - T[:3, 3]))
+        if error > tolerance:
+            raise Exception(f"TX2-40 kinematic model deviates {error:.2f} mm from RoboDK at joints {q.round(1).tolist()}")
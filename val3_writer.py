@@ -0,0 +1,430 @@
+# Direkter Export von Staubli VAL3-Programmen ohne RoboDK-Postprozessor
+# Schreibt Bewegungen und RTS-Befehle während der Ausführung fortlaufend auf die Festplatte
+
+import ast
+import os
+import shutil
+import tempfile
+
+from robodk.robomath import Mat, Pose_2_Staubli, eye
+
+# Abbildung der RTS-Vergleichsoperatoren auf VAL3 (identische Schreibweise)
+VAL3_CONDITIONS = {"==": "==", "!=": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+# Standard-Bewegungsbeschreibung (mdesc) des Staubli-Controllers
+DEFAULT_MDESC = {
+    "accel": 100, "vel": 100, "decel": 100,
+    "tmax": 99999, "rmax": 9999,
+    "blend": "off", "leave": 50, "reach": 50,
+}
+
+# Tastencodes von get() für die Menütasten F1 (OK) und F2 (Abbrechen) der Bedienerabfrage
+KEY_CONFIRM = 271
+KEY_CANCEL = 272
+
+XML_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n'
+XSI = 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+
+
+class Val3Writer:
+    """
+    Erzeugt ein VAL3-Projekt (pjx, dtx, start.pgx, stop.pgx) direkt aus dem Befehlsstrom
+
+    Programmzeilen werden sofort in start.pgx geschrieben, Punkte und Gelenkwerte in temporäre
+    Dateien, welche beim Schliessen mit den Datendeklarationen zusammengeführt werden. Der
+    Speicherbedarf ist dadurch unabhängig von der Programmlänge.
+
+    Example:
+
+        .. code-block:: python
+
+            with Val3Writer("export", "Jenga") as writer:
+                writer.run_code("addConnection('dVacuum','98FE...','dio')")
+                writer.move_joints([0, 50, 50, 0, 60, 0])
+                writer.move_linear(pose)
+                writer.run_code("setOutput('dVacuum','1')")
+    """
+
+    def __init__(self, directory, name="Jenga", tool_pose=None):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.tool_pose = tool_pose if tool_pose is not None else eye(4)
+        self.reference_pose = eye(4)
+
+        # Anschlüsse: Name -> (Link, Typ)
+        self.connections = {}
+
+        # Bewegungsparameter: aktueller Zustand und bereits deklarierte Beschreibungen
+        self.mdesc = dict(DEFAULT_MDESC)
+        self.mdesc_index = {}
+
+        # Zähler für fortlaufend geschriebene Datenarrays
+        self.point_count = 0
+        self.joint_count = 0
+
+        # Offene Kontrollstrukturen ("if", "while") für Einrückung und Validierung
+        self.blocks = []
+
+        self._program = open(os.path.join(self.path, "start.pgx"), "w", encoding="utf-8")
+        self._points = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._joints = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._write_program_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    # ----------- Bewegungen ----------- #
+
+    def set_reference(self, pose):
+        """Setzt die aktive Referenz (Pose relativ zur Roboterbasis), wie robot.setPoseFrame(...)"""
+        self.reference_pose = pose
+
+    def set_tool(self, pose):
+        """Setzt das Werkzeug (Pose relativ zum Flansch), wie robot.setPoseTool(...)"""
+        self.tool_pose = pose
+
+    def move_joints(self, target):
+        """Schreibt movej(...) für Gelenkwerte oder eine Pose in der aktiven Referenz"""
+        self._line("movej(%s, tTool[0], %s)" % (self._target(target), self._mdesc_ref()))
+
+    def move_linear(self, target):
+        """Schreibt movel(...) für eine Pose in der aktiven Referenz"""
+        if not isinstance(target, Mat):
+            raise Exception("Val3Writer.move_linear requires a pose target")
+        self._line("movel(%s, tTool[0], %s)" % (self._target(target), self._mdesc_ref()))
+
+    def set_speed(self, speed_linear, speed_joints=-1, accel_linear=-1, accel_joints=-1):
+        """Übernimmt robot.setSpeed(...): lineare Geschwindigkeit in mm/s wird zu mdesc.tmax"""
+        if speed_linear != -1:
+            self.mdesc["tmax"] = speed_linear
+
+    def pause(self, milliseconds):
+        """Schreibt eine Wartezeit wie robot.Pause(...)"""
+        self._line("waitEndMove()")
+        self._line("delay(%s)" % _number(milliseconds / 1000.0))
+
+    # ----------- RTS-Befehle ----------- #
+
+    def run_code(self, code):
+        """Übersetzt einen RTS-Befehl, wie er über RDK.RunCode(...) an den Postprozessor geht"""
+        call = ast.parse(code.strip(), mode="eval").body
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+            raise Exception("Unsupported RTS instruction: %s" % code)
+
+        handler = getattr(self, "_rts_" + call.func.id, None)
+        if handler is None:
+            raise Exception("RTS instruction %s is not supported by Val3Writer" % call.func.id)
+        handler(*[ast.literal_eval(arg) for arg in call.args])
+
+    def _rts_addConnection(self, name, link, type):
+        self.connections[name] = (link, type)
+
+    def _rts_setGripperConnection(self, name):
+        self._line("// Greifer an Anschluss %s" % name)
+
+    def _rts_setOutput(self, name, value):
+        self._line("waitEndMove()")
+        self._line("%s = %s" % (self._io(name), self._io_value(name, value)))
+
+    def _rts_ifConnection(self, name, value, condition):
+        self._line("waitEndMove()")
+        self._line("if %s" % self._condition(name, value, condition))
+        self.blocks.append("if")
+
+    def _rts_elseIfConnection(self, name, value, condition):
+        self._check_block("if")
+        self._line("elseIf %s" % self._condition(name, value, condition), dedent=1)
+
+    def _rts_elseConnection(self):
+        self._check_block("if")
+        self._line("else", dedent=1)
+
+    def _rts_endIfConnection(self):
+        self._check_block("if")
+        self.blocks.pop()
+        self._line("endIf")
+
+    def _rts_ifConfirm(self, message):
+        # Bedienerabfrage auf der Benutzerseite des Handbediengeräts, wartet auf F1 oder F2
+        self._line("waitEndMove()")
+        self._line("userPage()")
+        self._line("cls()")
+        self._line("putln(\"%s\")" % message.replace('"', "'"))
+        self._line("putln(\"F1: OK   F2: Abbrechen\")")
+        self._line("nKey = 0")
+        self._line("while (nKey != %d) and (nKey != %d)" % (KEY_CONFIRM, KEY_CANCEL))
+        self.blocks.append("while")
+        self._line("nKey = get()")
+        self.blocks.pop()
+        self._line("endWhile")
+        self._line("if nKey == %d" % KEY_CONFIRM)
+        self.blocks.append("if")
+
+    def _rts_elseConfirm(self):
+        self._rts_elseConnection()
+
+    def _rts_endIfConfirmCount(self):
+        self._rts_endIfConnection()
+
+    def _rts_whileConnection(self, name, condition, value, while_name):
+        self._line("waitEndMove()")
+        self._line("while %s" % self._condition(name, value, condition))
+        self.blocks.append("while")
+
+    def _rts_endWhileConnection(self, while_name):
+        self._check_block("while")
+        self.blocks.pop()
+        self._line("endWhile")
+
+    def _rts_whileEndless(self, while_name):
+        self._line("while true")
+        self.blocks.append("while")
+
+    def _rts_endWhileEndless(self, while_name):
+        self._rts_endWhileConnection(while_name)
+
+    def _rts_waitConnection(self, name, value, condition, timeout):
+        self._line("waitEndMove()")
+        if timeout < 0:
+            self._line("wait(%s)" % self._condition(name, value, condition))
+        else:
+            self._line("bWatch = watch(%s, %s)" % (self._condition(name, value, condition), _number(timeout)))
+
+    def _rts_boxAlert(self, message):
+        self._line("popUpMsg(\"%s\")" % message.replace('"', "'"))
+
+    def _rts_setAccelerationPercentageJoints(self, percent):
+        self.mdesc["accel"] = float(percent)
+
+    def _rts_setDeccelerationPercentageJoints(self, percent):
+        self.mdesc["decel"] = float(percent)
+
+    def _rts_setSpeedPercentageJoints(self, percent):
+        self.mdesc["vel"] = float(percent)
+
+    def _rts_setTranslationalSpeedTool(self, speed):
+        self.mdesc["tmax"] = float(speed)
+
+    def _rts_setRotationalSpeedTool(self, speed):
+        self.mdesc["rmax"] = float(speed)
+
+    # ----------- Abschluss ----------- #
+
+    def close(self):
+        """Schliesst das Programm und schreibt Datenbank und Projektdatei"""
+        if self.blocks:
+            self._discard()
+            raise Exception("Unclosed %s block(s) in robot program" % ", ".join(self.blocks))
+
+        self._line("waitEndMove()")
+        self._program.write("end\n]]></Code>\n  </Program>\n</Programs>\n")
+        self._program.close()
+
+        self._write_database()
+        self._write_stop()
+        self._write_project()
+
+        self._points.close()
+        self._joints.close()
+
+    def _discard(self):
+        """Gibt Dateien nach einem Fehler frei (unvollständiges Projekt bleibt zur Analyse liegen)"""
+        for stream in (self._program, self._points, self._joints):
+            if not stream.closed:
+                stream.close()
+
+    # ----------- Hilfsfunktionen ----------- #
+
+    def _line(self, text, dedent=0):
+        indent = "  " * (len(self.blocks) + 1 - dedent)
+        self._program.write(indent + text + "\n")
+
+    def _check_block(self, kind):
+        if not self.blocks or self.blocks[-1] != kind:
+            raise Exception("No open %s block in robot program" % kind)
+
+    def _target(self, target):
+        """Schreibt Ziel in das passende Datenarray und liefert die VAL3-Referenz darauf"""
+        if isinstance(target, Mat):
+            # Pose aus aktiver Referenz in Roboterbasis (VAL3 world) umrechnen
+            x, y, z, rx, ry, rz = Pose_2_Staubli(self.reference_pose * target)
+            self._points.write(
+                '      <Value key="%d" x="%s" y="%s" z="%s" rx="%s" ry="%s" rz="%s" fatherId="world[0]" />\n'
+                % (self.point_count, _number(x), _number(y), _number(z), _number(rx), _number(ry), _number(rz))
+            )
+            self.point_count += 1
+            return "pPoints[%d]" % (self.point_count - 1)
+
+        joints = list(target)
+        self._joints.write(
+            '      <Value key="%d" %s />\n'
+            % (self.joint_count, " ".join('j%d="%s"' % (i + 1, _number(j)) for i, j in enumerate(joints)))
+        )
+        self.joint_count += 1
+        return "jJoints[%d]" % (self.joint_count - 1)
+
+    def _mdesc_ref(self):
+        """Deklariert die aktuelle Bewegungsbeschreibung einmalig und liefert die Referenz darauf"""
+        key = tuple(sorted(self.mdesc.items()))
+        if key not in self.mdesc_index:
+            self.mdesc_index[key] = len(self.mdesc_index)
+        return "mDesc[%d]" % self.mdesc_index[key]
+
+    def _io(self, name):
+        if name not in self.connections:
+            raise Exception("Connection %s was not added before use" % name)
+        return "%s[0]" % name
+
+    def _io_value(self, name, value):
+        if self.connections[name][1] == "dio":
+            return "false" if str(value).strip().lower() in ("0", "false") else "true"
+        return _number(float(value))
+
+    def _condition(self, name, value, condition):
+        if condition not in VAL3_CONDITIONS:
+            raise Exception("Invalid condition %s" % condition)
+        return "%s %s %s" % (self._io(name), VAL3_CONDITIONS[condition], self._io_value(name, value))
+
+    def _write_program_header(self):
+        self._program.write(XML_HEADER)
+        self._program.write('<Programs xmlns="http://www.staubli.com/robotics/VAL3/Program/2" %s>\n' % XSI)
+        self._program.write('  <Program name="start">\n')
+        self._program.write('    <Locals>\n      <Local name="bWatch" type="bool" xsi:type="array" size="1" />\n'
+                           '      <Local name="nKey" type="num" xsi:type="array" size="1" />\n    </Locals>\n')
+        self._program.write("    <Code><![CDATA[\nbegin\n")
+
+    def _write_database(self):
+        with open(os.path.join(self.path, self.name + ".dtx"), "w", encoding="utf-8") as f:
+            f.write(XML_HEADER)
+            f.write('<Database xmlns="http://www.staubli.com/robotics/VAL3/Data/2" %s>\n  <Datas>\n' % XSI)
+
+            # Anschlüsse mit Link auf den physischen Ein-/Ausgang
+            for name, (link, type) in self.connections.items():
+                f.write('    <Data name="%s" access="private" xsi:type="array" type="%s" size="1">\n' % (name, type))
+                f.write('      <Value key="0" link="%s" />\n    </Data>\n' % link)
+
+            # Werkzeug
+            x, y, z, rx, ry, rz = Pose_2_Staubli(self.tool_pose)
+            f.write('    <Data name="tTool" access="private" xsi:type="array" type="tool" size="1">\n')
+            f.write(
+                '      <Value key="0" x="%s" y="%s" z="%s" rx="%s" ry="%s" rz="%s" fatherId="flange[0]" />\n    </Data>\n'
+                % (_number(x), _number(y), _number(z), _number(rx), _number(ry), _number(rz))
+            )
+
+            # Bewegungsbeschreibungen
+            f.write('    <Data name="mDesc" access="private" xsi:type="array" type="mdesc" size="%d">\n' % max(1, len(self.mdesc_index)))
+            for key, index in self.mdesc_index.items():
+                f.write('      <Value key="%d" %s />\n' % (index, " ".join('%s="%s"' % (k, _value(v)) for k, v in key)))
+            f.write("    </Data>\n")
+
+            # Punkte und Gelenkwerte aus den temporären Dateien übernehmen
+            for name, type, count, stream in (
+                ("pPoints", "pointRx", self.point_count, self._points),
+                ("jJoints", "jointRx", self.joint_count, self._joints),
+            ):
+                f.write('    <Data name="%s" access="private" xsi:type="array" type="%s" size="%d">\n' % (name, type, max(1, count)))
+                stream.seek(0)
+                shutil.copyfileobj(stream, f)
+                f.write("    </Data>\n")
+
+            f.write("  </Datas>\n</Database>\n")
+
+    def _write_stop(self):
+        with open(os.path.join(self.path, "stop.pgx"), "w", encoding="utf-8") as f:
+            f.write(XML_HEADER)
+            f.write('<Programs xmlns="http://www.staubli.com/robotics/VAL3/Program/2">\n')
+            f.write('  <Program name="stop">\n    <Code><![CDATA[\nbegin\nend\n]]></Code>\n  </Program>\n</Programs>\n')
+
+    def _write_project(self):
+        with open(os.path.join(self.path, self.name + ".pjx"), "w", encoding="utf-8") as f:
+            f.write(XML_HEADER)
+            f.write('<Project xmlns="http://www.staubli.com/robotics/VAL3/Project/3">\n')
+            f.write('  <Parameters version="s7.3" stackSize="5000" millimeterUnit="true" />\n')
+            f.write('  <Programs>\n    <Program file="start.pgx" />\n    <Program file="stop.pgx" />\n  </Programs>\n')
+            f.write('  <Database>\n    <Data file="%s.dtx" />\n  </Database>\n' % self.name)
+            f.write('  <Libraries />\n</Project>\n')
+
+
+class Val3RobotTee:
+    """
+    Leitet alle Aufrufe an den RoboDK-Roboter weiter und schreibt Bewegungen zusätzlich in den Val3Writer
+    Wird anstelle von rdk.Item('Staubli TX2-40') verwendet.
+    """
+
+    def __init__(self, robot, writer):
+        self._robot = robot
+        self._writer = writer
+        writer.set_tool(robot.PoseTool())
+        writer.set_reference(robot.PoseFrame())
+
+    def __getattr__(self, name):
+        return getattr(self._robot, name)
+
+    def setPoseFrame(self, frame):
+        result = self._robot.setPoseFrame(frame)
+        self._writer.set_reference(self._robot.PoseFrame())
+        return result
+
+    def setPoseTool(self, tool):
+        result = self._robot.setPoseTool(tool)
+        self._writer.set_tool(self._robot.PoseTool())
+        return result
+
+    def setSpeed(self, speed_linear, speed_joints=-1, accel_linear=-1, accel_joints=-1):
+        self._writer.set_speed(speed_linear, speed_joints, accel_linear, accel_joints)
+        return self._robot.setSpeed(speed_linear, speed_joints, accel_linear, accel_joints)
+
+    def MoveJ(self, target, blocking=True):
+        self._writer.move_joints(_resolve_target(target))
+        return self._robot.MoveJ(target, blocking)
+
+    def MoveL(self, target, blocking=True):
+        self._writer.move_linear(_resolve_target(target))
+        return self._robot.MoveL(target, blocking)
+
+    def Pause(self, time_ms=-1):
+        self._writer.pause(max(time_ms, 0))
+        return self._robot.Pause(time_ms)
+
+
+class Val3LinkTee:
+    """Leitet RunCode-Aufrufe der RTS-Klasse zusätzlich an den Val3Writer weiter"""
+
+    def __init__(self, rdk, writer):
+        self._rdk = rdk
+        self._writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self._rdk, name)
+
+    def RunCode(self, code, code_is_fcn_call=False):
+        self._writer.run_code(code)
+        return self._rdk.RunCode(code, code_is_fcn_call)
+
+
+def _resolve_target(target):
+    """RoboDK-Targets (Items) in Pose bzw. Gelenkwerte auflösen"""
+    if isinstance(target, (Mat, list, tuple)):
+        return target
+    if target.isJointTarget():
+        return target.Joints().list()
+    return target.Pose()
+
+
+def _number(value):
+    """Kompakte Zahlendarstellung für VAL3 (max. 6 Nachkommastellen)"""
+    text = "%.6f" % value
+    text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def _value(value):
+    return _number(value) if isinstance(value, (int, float)) else value